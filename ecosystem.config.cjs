@@ -1,3 +1,9 @@
+// Memory of the PDF service, worker processes included. The service sizes
+// its parse memory budget as what its idle processes leave of this
+// (about 330 MB with the default three workers). pm2 watches only the
+// uvicorn process itself, so max_memory_restart guards that one alone.
+const PDF_MEMORY_LIMIT_MB = 768;
+
 module.exports = {
   apps: [
     {
@@ -21,6 +27,9 @@ module.exports = {
       args: "app.main:app --host 127.0.0.1 --port 8080",
       cwd: "./pdf-service",
       interpreter: "none",
+      env: {
+        PDF_MEMORY_LIMIT_MB: String(PDF_MEMORY_LIMIT_MB),
+      },
       autorestart: true,
       max_memory_restart: "256M",
       log_date_format: "YYYY-MM-DD HH:mm:ss",
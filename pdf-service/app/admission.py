@@ -0,0 +1,59 @@
+"""Size-aware admission control for parse requests.
+
+The page count comes from the document's page tree (/Root → /Pages →
+/Count), read by the preflight (``preflight.read_structure``). That costs a
+few milliseconds even for long statements and does no layout work. Documents above the slow
+lane thresholds go to a separate worker pool, so small interactive uploads
+are never queued behind long business statements.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from . import settings
+
+FAST = "fast"
+SLOW = "slow"
+
+
+class AdmissionError(Exception):
+    """Request refused at admission; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class DocumentSize:
+    pages: int
+    size: int
+
+
+def choose_lane(doc: DocumentSize) -> str:
+    if doc.pages > settings.SLOW_LANE_PAGES or doc.size > settings.SLOW_LANE_BYTES:
+        return SLOW
+    return FAST
+
+
+def queue_limit(lane: str) -> int:
+    """Jobs allowed to wait in a lane before admission defers new ones."""
+    return settings.SLOW_LANE_MAX_QUEUE if lane == SLOW else settings.FAST_LANE_MAX_QUEUE
+
+
+def admit(doc: DocumentSize, queue_depth: dict[str, int]) -> str:
+    """Pick a lane for a document or raise AdmissionError.
+
+    ``queue_depth`` maps lane name → jobs currently waiting in it.
+    """
+    if doc.pages > settings.MAX_PAGES:
+        raise AdmissionError(
+            413, f"Statement too long: {doc.pages} pages (max {settings.MAX_PAGES})"
+        )
+    lane = choose_lane(doc)
+    if queue_depth.get(lane, 0) >= queue_limit(lane):
+        # Deferred: the caller should retry once the lane has drained
+        raise AdmissionError(503, f"The {lane} parse lane is full, retry later", retry_after=30)
+    return lane
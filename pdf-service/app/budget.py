@@ -0,0 +1,85 @@
+"""Global memory budget for concurrent parses.
+
+pdfplumber's memory grows with the pages it lays out and their chars. A
+few dense statements parsed at once can push a small host into the OOM
+killer, and pm2 then restarts the whole service. Each job is priced
+before it runs (``preflight.estimate_memory``). The lanes start a job
+only while the estimates of the jobs running in all lanes, plus this one,
+fit in the budget. A job that does not fit waits at the head of its
+queue, and a lane with such a job starts no later one.
+
+The budget is ``settings.MEMORY_BUDGET_MB`` when set. Otherwise it is
+what the service leaves of ``settings.MEMORY_LIMIT_MB`` once every worker
+process has started and imported the parsers (``left_over``); until then
+jobs run one at a time.
+Parsers release pages window by window (``parsers.pages.windowed``), so
+one long document costs no more than ``PAGES_IN_MEMORY`` pages of it.
+"""
+
+from typing import Callable, Optional
+
+from .metrics import metrics
+
+# A capacity no job fits in next to another: jobs run one at a time
+SERIAL = 1
+
+
+class MemoryBudget:
+    """Bytes of estimated parse memory shared by the lanes."""
+
+    def __init__(self, capacity: int) -> None:
+        # 0: no limit, reservations are only counted
+        self.capacity = capacity
+        self.reserved = 0
+        # Jobs holding a reservation
+        self.jobs = 0
+        self._listeners: list[Callable[[], None]] = []
+
+    def cost(self, estimate: int) -> int:
+        """What a job reserves: its estimate, at most the whole budget.
+
+        A job dearer than the budget still runs, alone.
+        """
+        return min(estimate, self.capacity) if self.capacity else estimate
+
+    def try_reserve(self, cost: int) -> bool:
+        if self.capacity and self.jobs and self.reserved + cost > self.capacity:
+            return False
+        self.reserved += cost
+        self.jobs += 1
+        self._report()
+        return True
+
+    def release(self, cost: int) -> None:
+        self.reserved -= cost
+        self.jobs -= 1
+        self._report()
+        self._notify()
+
+    def resize(self, capacity: int) -> None:
+        """Set a new capacity; held-back jobs that now fit start."""
+        self.capacity = capacity
+        metrics.set_gauge("budget.capacity_bytes", capacity)
+        self._notify()
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        """Call ``listener`` whenever memory is released (by any lane)."""
+        self._listeners.append(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def _report(self) -> None:
+        metrics.set_gauge("budget.reserved_bytes", self.reserved)
+
+
+def left_over(limit: int, rss: Optional[int]) -> int:
+    """Budget left of ``limit`` bytes by the idle service's ``rss``.
+
+    Without a measurement (off Linux), half the limit. With nothing left,
+    ``SERIAL``.
+    """
+    if rss is None:
+        return limit // 2
+    return max(limit - rss, SERIAL)
@@ -0,0 +1,181 @@
+"""Compiled batch categorization against a company's CategoryRule set.
+
+Mirrors ``applyCategorizationRules`` in src/server/helpers/categorize.ts.
+Rules are tried in descending priority. A rule applies when:
+- its lower-cased pattern occurs in the counterparty, the purpose, or
+  "counterparty purpose", depending on matchField;
+- its direction is unset or equals the transaction's;
+- it has at least one label part.
+
+All patterns are compiled into one Aho-Corasick automaton. Categorizing a
+transaction is then a single pass over its text, however many rules the
+company has.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict, deque
+from typing import Any, Iterable, Optional
+
+from .metrics import metrics
+from .parsers.records import Transaction
+
+COUNTERPARTY = "counterparty"
+PURPOSE = "purpose"
+ANY = "any"
+
+# Compiled rule sets kept per process, keyed by rules version
+_CACHE_SIZE = 64
+_compiled: "OrderedDict[str, RuleSet]" = OrderedDict()
+
+
+class _Automaton:
+    """Aho-Corasick keyword automaton with lazily completed transitions."""
+
+    def __init__(self, patterns: list[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (idx,)
+
+        # Breadth-first: failure links and inherited outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+        # Full transition table, filled on first use of (node, char)
+        self._delta: list[dict[str, int]] = [dict(g) for g in self._goto]
+
+    def _step(self, node: int, ch: str) -> int:
+        start = node
+        while node and ch not in self._goto[node]:
+            node = self._fail[node]
+        nxt = self._goto[node].get(ch, 0)
+        self._delta[start][ch] = nxt
+        return nxt
+
+    def matches(self, text: str) -> Iterable[tuple[int, int]]:
+        """Yield (end_index, pattern_index) for every occurrence."""
+        delta, out, node = self._delta, self._out, 0
+        for i, ch in enumerate(text):
+            nxt = delta[node].get(ch)
+            node = self._step(node, ch) if nxt is None else nxt
+            for idx in out[node]:
+                yield i, idx
+
+
+class RuleSet:
+    """A company's rules compiled for one-pass matching."""
+
+    def __init__(self, rules: list[dict[str, Any]]) -> None:
+        # Descending priority; ties keep the order the rules were sent in
+        ordered = sorted(rules, key=lambda r: -(r.get("priority") or 0))
+        self._rules: list[tuple[str, str, Optional[str], Optional[str]]] = []
+        patterns: dict[str, int] = {}
+        # pattern index → [(rank, field, direction)]
+        self._by_pattern: list[list[tuple[int, str, Optional[str]]]] = []
+        self._always: list[tuple[int, str, Optional[str]]] = []
+        self._lengths: list[int] = []
+
+        for rule in ordered:
+            parts = [rule.get(k) for k in ("expenseTypeName", "expenseArticleName", "directionName")]
+            parts = [p for p in parts if p]
+            if not parts:
+                continue
+            field = rule.get("matchField") or COUNTERPARTY
+            if field not in (COUNTERPARTY, PURPOSE):
+                field = ANY
+            direction = rule.get("direction") or None
+            rank = len(self._rules)
+            self._rules.append((rule.get("id"), " > ".join(parts), field, direction))
+
+            pattern = (rule.get("pattern") or "").lower()
+            if not pattern:
+                # "".includes("") is true in JS: an empty pattern matches everything
+                self._always.append((rank, field, direction))
+                continue
+            idx = patterns.get(pattern)
+            if idx is None:
+                idx = patterns[pattern] = len(self._by_pattern)
+                self._by_pattern.append([])
+                self._lengths.append(len(pattern))
+            self._by_pattern[idx].append((rank, field, direction))
+
+        self._automaton = _Automaton(list(patterns))
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def match(self, direction: str, counterparty: Optional[str], purpose: Optional[str]) -> Optional[dict[str, Any]]:
+        """Best rule for one transaction as {"rule_id", "label"}, or None."""
+        cp = (counterparty or "").lower()
+        text = f"{cp} {(purpose or '').lower()}"
+        cp_end = len(cp)
+        best = len(self._rules)
+
+        for rank, field, rule_dir in self._always:
+            if rank < best and (rule_dir is None or rule_dir == direction):
+                best = rank
+                break
+
+        for end, idx in self._automaton.matches(text):
+            start = end - self._lengths[idx] + 1
+            for rank, field, rule_dir in self._by_pattern[idx]:
+                if rank >= best:
+                    break
+                if rule_dir is not None and rule_dir != direction:
+                    continue
+                if field == COUNTERPARTY and end >= cp_end:
+                    continue
+                if field == PURPOSE and start <= cp_end:
+                    continue
+                best = rank
+                break
+
+        if best == len(self._rules):
+            return None
+        rule_id, label = self._rules[best][:2]
+        return {"rule_id": rule_id, "label": label}
+
+    def categorize(self, transactions: list[Transaction]) -> list[Optional[dict[str, Any]]]:
+        """Category assignment for every transaction, in order."""
+        return [self.match(tx.direction, tx.counterparty, tx.purpose) for tx in transactions]
+
+
+def rules_version(rules: list[dict[str, Any]]) -> str:
+    """Stable hash of a rule set, used when the caller sends no version."""
+    raw = json.dumps(rules, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def compile_rules(version: str, rules: list[dict[str, Any]]) -> RuleSet:
+    """Compiled rule set for a version, from this process's cache if possible."""
+    ruleset = _compiled.get(version)
+    if ruleset is not None:
+        _compiled.move_to_end(version)
+        metrics.incr("categorize.cache", result="hit")
+        return ruleset
+    metrics.incr("categorize.cache", result="miss")
+    ruleset = RuleSet(rules)
+    _compiled[version] = ruleset
+    if len(_compiled) > _CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return ruleset
@@ -0,0 +1,370 @@
+"""Offline bulk re-parse of stored statements.
+
+After a parser fix, the archive of stored statements has to be parsed
+again. Pushing each file through HTTP would go through admission and the
+lanes. This command parses files directly on every core, with the same
+parse jobs the service runs:
+
+    python -m app reparse ARCHIVE_DIR --out results.jsonl
+    python -m app reparse manifest.jsonl --out results.parquet --workers 8
+
+The input is a directory, walked recursively for .pdf/.txt/.csv/.xlsx, or
+a JSONL manifest of {"path": ..., "bank_code": ...} lines, with paths
+relative to the manifest. The bank comes from the manifest, then
+``--bank``, then a PARSERS-named parent directory (archive/sber/…). For
+PDFs it is finally suggested from the first page.
+
+Output is JSONL (one line per file) or Parquet (one row per transaction,
+written as part files into a directory; needs pyarrow). Every transaction
+carries the ``account_identifier`` of its account, so a statement of
+several accounts keeps its per-account attribution. Completed files
+are appended to ``<out>.checkpoint`` once their output is committed, so
+an interrupted run started again with the same arguments resumes where it
+stopped. A run killed between the two writes can repeat a file's JSONL
+line. Throughput and failures are reported per bank.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, TextIO
+
+from .admission import AdmissionError
+from .parsers import EXPORT_PARSERS, PARSERS, TABULAR_BANKS
+from .parsers.utils import open_pdf
+from .preflight import read_structure, suggest_bank
+from .worker import init_worker, parse_job
+
+EXTENSIONS = (".pdf", *EXPORT_PARSERS)
+# A file whose job took the worker pool down this many times is failed
+_MAX_CRASHES = 2
+# Seconds between progress lines
+_PROGRESS_EVERY = 10.0
+
+
+@dataclass
+class Item:
+    path: str
+    bank_code: Optional[str]
+    crashes: int = 0
+
+
+def _bank_from_dirs(path: str) -> Optional[str]:
+    for part in reversed(os.path.normpath(os.path.dirname(path)).split(os.sep)):
+        if part in PARSERS:
+            return part
+    return None
+
+
+def iter_items(source: str, bank_code: Optional[str] = None) -> Iterator[Item]:
+    """Files to parse from a directory or a JSONL manifest, in a stable order."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name.lower())[1] in EXTENSIONS:
+                    path = os.path.join(root, name)
+                    yield Item(path, bank_code or _bank_from_dirs(path))
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                path = os.path.join(base, entry["path"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise SystemExit(f"{source}:{n}: not a manifest entry: {e}")
+            yield Item(path, entry.get("bank_code") or bank_code or _bank_from_dirs(path))
+
+
+def reparse_file(path: str, bank_code: Optional[str]) -> tuple[str, dict[str, Any]]:
+    """Worker side: resolve the bank and run the service's parse job on a file."""
+    ext = os.path.splitext(path.lower())[1]
+    with open(path, "rb") as f:
+        data = f.read()
+    if ext == ".pdf":
+        try:
+            problem = read_structure(data).problem
+        except AdmissionError as e:
+            problem = e.detail
+        if problem:
+            # Scanned or locked: the same fast failure as /parse
+            raise ValueError(problem)
+        if bank_code is None:
+            with open_pdf(data) as pdf:
+                bank_code = suggest_bank(pdf.pages[0]) if pdf.pages else None
+    if bank_code is None and ext != ".txt":
+        raise ValueError("bank_code unknown and not recognized from the document")
+    if ext in (".csv", ".xlsx") and bank_code not in TABULAR_BANKS:
+        raise ValueError(f"No {ext[1:].upper()} export layout for bank_code '{bank_code}'")
+
+    result, _telemetry = parse_job(bank_code or "", data, ext=ext)
+    return bank_code or "1c", result
+
+
+def wire_rows(result: dict[str, Any]) -> list[dict[str, Any]]:
+    """A parse result's rows in wire format, each with its account_identifier.
+
+    A statement of several accounts (``sections.combine``) has no single
+    identifier; its "accounts" say how many rows, in order, are each one's.
+    """
+    rows = [tx.to_wire() for tx in result["transactions"]]
+    groups = result.get("accounts") or [
+        {"account_identifier": result.get("account_identifier"), "count": len(rows)}
+    ]
+    at = 0
+    for group in groups:
+        for row in rows[at:at + group["count"]]:
+            row["account_identifier"] = group["account_identifier"]
+        at += group["count"]
+    return rows
+
+
+class JsonlWriter:
+    def __init__(self, out: str) -> None:
+        self._f = open(out, "a", encoding="utf-8")
+
+    def write(self, record: dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def commit(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ParquetWriter:
+    """One row per transaction; every commit writes a new part file."""
+
+    def __init__(self, out: str) -> None:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs the pyarrow package")
+        os.makedirs(out, exist_ok=True)
+        self.out = out
+        self._rows: list[dict[str, Any]] = []
+        self._part = sum(1 for name in os.listdir(out) if name.endswith(".parquet"))
+
+    def write(self, record: dict[str, Any]) -> None:
+        for tx in record.get("transactions") or ():
+            self._rows.append({"path": record["path"], "bank_code": record["bank_code"], **tx})
+
+    def commit(self) -> None:
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.out, f"part-{self._part:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(self._rows), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._part += 1
+        self._rows = []
+
+    def close(self) -> None:
+        self.commit()
+
+
+class Checkpoint:
+    """Append-only record of the files whose output is committed."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.done: set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {json.loads(line)["path"] for line in f if line.strip()}
+        self._f = open(path, "a", encoding="utf-8")
+        self._pending: list[str] = []
+
+    def add(self, path: str, status: str) -> None:
+        self._pending.append(json.dumps({"path": path, "status": status}, ensure_ascii=False))
+
+    def commit(self) -> None:
+        for line in self._pending:
+            self._f.write(line + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = []
+
+    def close(self) -> None:
+        self._f.close()
+
+
+@dataclass
+class BankStats:
+    files: int = 0
+    failed: int = 0
+    transactions: int = 0
+    bytes: int = 0
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+class Report:
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.started = time.monotonic()
+        self.banks: dict[str, BankStats] = defaultdict(BankStats)
+        self._last = self.started
+
+    def add(self, bank_code: str, size: int, count: int, error: Optional[str]) -> None:
+        stats = self.banks[bank_code]
+        stats.files += 1
+        stats.bytes += size
+        stats.transactions += count
+        if error is not None:
+            stats.failed += 1
+            stats.errors[error[:100]] += 1
+
+    def _totals(self) -> tuple[int, int, int]:
+        stats = self.banks.values()
+        return sum(s.files for s in stats), sum(s.failed for s in stats), sum(s.transactions for s in stats)
+
+    def progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < _PROGRESS_EVERY:
+            return
+        self._last = now
+        files, failed, txs = self._totals()
+        elapsed = max(now - self.started, 1e-9)
+        print(f"{files} files ({failed} failed), {txs} transactions, "
+              f"{files / elapsed:.1f} files/s", file=self.stream)
+
+    def summary(self) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        cols = ["bank", "files", "failed", "transactions", "MB", "files/s"]
+        print(" | ".join(f"{c:>14}" for c in cols), file=self.stream)
+        for bank_code in sorted(self.banks):
+            s = self.banks[bank_code]
+            line = [bank_code, s.files, s.failed, s.transactions, f"{s.bytes / 2**20:.1f}",
+                    f"{s.files / elapsed:.1f}"]
+            print(" | ".join(f"{v:>14}" for v in line), file=self.stream)
+            for error, n in sorted(s.errors.items(), key=lambda e: -e[1]):
+                print(f"{'':>14}   {n} × {error}", file=self.stream)
+        files, failed, txs = self._totals()
+        print(f"{files} files, {failed} failed, {txs} transactions in {elapsed:.1f}s "
+              f"({files / elapsed:.1f} files/s, {txs / elapsed:.0f} transactions/s)", file=self.stream)
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
+
+
+def reparse(args: argparse.Namespace) -> int:
+    out = args.out
+    parquet = out.endswith(".parquet")
+    writer = ParquetWriter(out) if parquet else JsonlWriter(out)
+    checkpoint = Checkpoint(out.rstrip("/") + ".checkpoint")
+    report = Report(sys.stderr)
+
+    todo = (item for item in iter_items(args.source, args.bank) if item.path not in checkpoint.done)
+    retry: list[Item] = []
+    pending: dict[Future, Item] = {}
+    uncommitted = 0
+    pool = _new_pool(args.workers)
+
+    def finish(item: Item, bank_code: str, result: Optional[dict], error: Optional[str]) -> None:
+        nonlocal uncommitted
+        transactions = wire_rows(result) if result else []
+        record = {
+            "path": item.path,
+            "bank_code": bank_code,
+            "status": "failed" if error else "ok",
+            "error": error,
+            "account_identifier": result.get("account_identifier") if result else None,
+            "count": len(transactions),
+            "transactions": transactions,
+        }
+        if result and result.get("accounts"):
+            record["accounts"] = [
+                {"account_identifier": a["account_identifier"], "count": a["count"]}
+                for a in result["accounts"]
+            ]
+        writer.write(record)
+        checkpoint.add(item.path, "failed" if error else "ok")
+        report.add(bank_code, os.path.getsize(item.path) if os.path.exists(item.path) else 0,
+                   len(transactions), error)
+        uncommitted += 1
+        if uncommitted >= args.commit_every:
+            writer.commit()
+            checkpoint.commit()
+            uncommitted = 0
+
+    try:
+        while True:
+            while len(pending) < args.workers * 2:
+                item = retry.pop() if retry else next(todo, None)
+                if item is None:
+                    break
+                pending[pool.submit(reparse_file, item.path, item.bank_code)] = item
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    bank_code, result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    item.crashes += 1
+                    if item.crashes >= _MAX_CRASHES:
+                        finish(item, item.bank_code or "unknown", None, "worker crashed")
+                    else:
+                        retry.append(item)
+                except Exception as e:
+                    finish(item, item.bank_code or "unknown", None, f"{type(e).__name__}: {e}")
+                else:
+                    finish(item, bank_code, result, None)
+            if broken:
+                # Every job still on the dead pool is lost with it; only the
+                # ones that reported the crash count it
+                retry.extend(pending.values())
+                pending.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _new_pool(args.workers)
+            report.progress()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        writer.commit()
+        checkpoint.commit()
+        writer.close()
+        checkpoint.close()
+
+    report.progress(force=True)
+    report.summary()
+    return 1 if any(s.failed for s in report.banks.values()) else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app", description="FinManager PDF service tools")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("reparse", help="re-parse stored statements offline")
+    cmd.add_argument("source", help="directory of statements, or a JSONL manifest")
+    cmd.add_argument("--out", required=True, help="results: FILE.jsonl, or DIR.parquet for Parquet")
+    cmd.add_argument("--bank", choices=sorted(PARSERS), help="bank_code for files that do not name one")
+    cmd.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    cmd.add_argument("--commit-every", type=int, default=100,
+                     help="files between output flushes and checkpoints")
+
+    args = ap.parse_args(argv)
+    return reparse(args)
@@ -0,0 +1,98 @@
+"""Liveness and readiness of the service.
+
+Liveness only says the process answers. Readiness says whether it should
+get more work: it reports the load of each lane and the memory of the
+service, and turns not-ready (503) while the workers are still starting
+or once a threshold in settings (``READY_*``) is crossed. A load balancer
+or the Node side can then send uploads elsewhere, or refuse them early,
+before admission has to defer them or they time out in a queue.
+"""
+
+import os
+from typing import Any, Optional
+
+from . import settings
+from .admission import queue_limit
+from .budget import MemoryBudget
+from .metrics import metrics
+from .scheduler import FairScheduler
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes(pid: str) -> int:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * _PAGE_SIZE
+
+
+def _child_pids() -> set[str]:
+    pids: set[str] = set()
+    for task in os.listdir("/proc/self/task"):
+        with open(f"/proc/self/task/{task}/children") as f:
+            pids.update(f.read().split())
+    return pids
+
+
+def service_rss() -> Optional[int]:
+    """Resident memory of this process and its worker processes; None off Linux."""
+    try:
+        total = _rss_bytes("self")
+        children = _child_pids()
+    except OSError:
+        return None
+    for pid in children:
+        try:
+            total += _rss_bytes(pid)
+        except OSError:
+            pass  # exited meanwhile
+    return total
+
+
+def cache_hit_ratio() -> Optional[float]:
+    """Share of memo lookups served from cache since start, over all workers."""
+    hits = metrics.total("memo.lookups", result="hit")
+    lookups = hits + metrics.total("memo.lookups", result="miss")
+    return round(hits / lookups, 4) if lookups else None
+
+
+def readiness(lanes: dict[str, FairScheduler], budget: Optional[MemoryBudget] = None) -> dict[str, Any]:
+    """Load report; ``status`` is "not_ready" with ``reasons`` above a threshold."""
+    reasons: list[str] = []
+    report: dict[str, Any] = {"lanes": {}}
+    for name, lane in lanes.items():
+        limit = queue_limit(name)
+        depth = lane.queue_depth
+        report["lanes"][name] = {
+            "warm": lane.warm,
+            "workers": lane.workers,
+            "busy": lane.in_flight,
+            "utilization": round(lane.in_flight / lane.workers, 3) if lane.workers else None,
+            "queue_depth": depth,
+            "queue_limit": limit,
+            "pages_in_flight": lane.pages,
+        }
+        if not lane.warm:
+            reasons.append(f"{name} lane warming up")
+        if settings.READY_QUEUE_SHARE and depth >= settings.READY_QUEUE_SHARE * limit:
+            reasons.append(f"{name} lane queue at {depth}/{limit}")
+
+    pages = sum(lane.pages for lane in lanes.values())
+    report["pages_in_flight"] = pages
+    if settings.READY_MAX_PAGES and pages > settings.READY_MAX_PAGES:
+        reasons.append(f"{pages} pages in flight (max {settings.READY_MAX_PAGES})")
+
+    if budget is not None:
+        report["memory_budget"] = {
+            "capacity_mb": round(budget.capacity / 2**20, 1) if budget.capacity else None,
+            "reserved_mb": round(budget.reserved / 2**20, 1),
+            "jobs": budget.jobs,
+        }
+
+    rss = service_rss()
+    report["rss_mb"] = round(rss / 2**20, 1) if rss is not None else None
+    if settings.READY_MAX_RSS_MB and rss is not None and rss > settings.READY_MAX_RSS_MB * 2**20:
+        reasons.append(f"RSS {rss / 2**20:.0f} MB (max {settings.READY_MAX_RSS_MB} MB)")
+
+    report["cache_hit_ratio"] = cache_hit_ratio()
+    metrics.set_gauge("health.ready", 0 if reasons else 1)
+    return {"status": "not_ready" if reasons else "ready", "reasons": reasons, **report}
@@ -1,11 +1,103 @@
 """PDF parsing microservice for FinManager."""
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
 
-from .parsers import PARSERS
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 
-app = FastAPI(title="FinManager PDF Service", version="1.0.0")
+from . import settings, tracing
+from .admission import FAST, SLOW, AdmissionError, DocumentSize, admit
+from .budget import SERIAL, MemoryBudget, left_over
+from .categorize import rules_version as hash_rules
+from .health import readiness, service_rss
+from .metrics import metrics
+from .parsers import EXPORT_PARSERS, PARSERS, TABULAR_BANKS
+from .parsers.pages import DateWindow
+from .parsers.sections import combine
+from .preflight import estimate_memory, inspect_document, read_structure
+from .responses import json_response
+from .scheduler import FairScheduler
+from .shadow import ShadowRunner
+from .singleflight import SingleFlight
+from .spool import spooled, sweep
+from .tracing import TraceParent
+from .worker import parse_job
+
+# uvicorn configures only its own loggers; the app's warnings go to stderr
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger(__name__)
+
+# Estimated parse memory of the running jobs, shared by both lanes; sized
+# once the workers have started unless PDF_MEMORY_BUDGET_MB is set
+budget = MemoryBudget(SERIAL if settings.MEMORY_BUDGET_MB is None else settings.MEMORY_BUDGET_MB * 2**20)
+lanes = {
+    FAST: FairScheduler(FAST, settings.WORKERS, settings.TENANT_CONCURRENCY, budget),
+    SLOW: FairScheduler(SLOW, settings.SLOW_WORKERS, settings.SLOW_TENANT_CONCURRENCY, budget),
+}
+# Requests that get a root span, Server-Timing and traceparent headers
+_TRACED_PATHS = ("/parse", "/inspect")
+# Largest upload /parse and /inspect accept (10MB)
+_MAX_UPLOAD = 10 * 1024 * 1024
+# Identical uploads (same bytes + bank_code) share one in-flight parse
+inflight = SingleFlight("parse")
+shadow = ShadowRunner(settings.SHADOW_SAMPLE, settings.SHADOW_MAX_PENDING)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Spool files of a previous process that did not exit cleanly
+    sweep()
+    # Readiness waits for this; liveness and requests do not
+    warming = asyncio.ensure_future(_warm_up())
+    yield
+    warming.cancel()
+    for lane in lanes.values():
+        lane.shutdown()
+    shadow.shutdown()
+
+
+async def _warm_up() -> None:
+    """Start every worker, then size the memory budget from what is left."""
+    await asyncio.gather(*(lane.warm_up() for lane in lanes.values()))
+    if settings.MEMORY_BUDGET_MB is not None:
+        return
+    rss = service_rss()
+    budget.resize(left_over(settings.MEMORY_LIMIT_MB * 2**20, rss))
+    if budget.capacity == SERIAL:
+        log.warning("Idle service RSS %.0f MB leaves no parse memory in PDF_MEMORY_LIMIT_MB=%d; "
+                    "parsing one document at a time", rss / 2**20, settings.MEMORY_LIMIT_MB)
+
+
+app = FastAPI(title="FinManager PDF Service", version="1.0.0", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span of a parse request, continuing the caller's trace if it sent one."""
+    if request.url.path not in _TRACED_PATHS:
+        return await call_next(request)
+    request_id = request.headers.get("x-request-id")
+    with tracing.trace(
+        f"{request.method} {request.url.path}",
+        TraceParent.parse(request.headers.get("traceparent")),
+        kind=tracing.SERVER,
+        **{"http.route": request.url.path, "request.id": request_id},
+    ) as root:
+        response = await call_next(request)
+        root.set(**{"http.status_code": response.status_code})
+        response.headers["Server-Timing"] = tracing.server_timing(root)
+        response.headers["traceparent"] = root.context().header()
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+    tracing.export(root.sink)
+    return response
 
 
 @app.get("/health")
@@ -17,53 +109,277 @@ async def health():
     }
 
 
+@app.get("/health/live")
+async def health_live():
+    """The process is up and its event loop answers."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Lane load, pages in flight, cache hit ratio and RSS; 503 when not ready."""
+    report = readiness(lanes, budget)
+    if report["status"] != "ready":
+        return json_response(report, status_code=503, headers={"Retry-After": "5"})
+    return report
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+
+@app.get("/shadow")
+async def get_shadow():
+    """Aggregated primary vs candidate comparisons from shadow runs."""
+    return shadow.snapshot()
+
+
+def _read_rules(rules: Optional[str], rules_version: Optional[str]):
+    """Decode the optional CategoryRule set sent with a parse request."""
+    if not rules:
+        return None, None
+    try:
+        parsed = json.loads(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"rules is not valid JSON: {e}")
+    if not isinstance(parsed, list) or not all(isinstance(r, dict) for r in parsed):
+        raise HTTPException(status_code=400, detail="rules must be a JSON array of objects")
+    return rules_version or hash_rules(parsed), parsed
+
+
+def _read_window(date_from: Optional[str], date_to: Optional[str]) -> Optional[DateWindow]:
+    """Decode the optional ISO date window; None when neither bound is set."""
+    try:
+        window = DateWindow(
+            date.fromisoformat(date_from) if date_from else None,
+            date.fromisoformat(date_to) if date_to else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date_from/date_to: {e}")
+    if window.date_from and window.date_to and window.date_from > window.date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    return window or None
+
+
+def _account_groups(accounts: list[dict], transactions: list[dict]) -> list[dict]:
+    """Split the wire rows into the per-account groups of a combined result."""
+    groups = []
+    at = 0
+    for account in accounts:
+        count = account["count"]
+        group = {
+            "account_identifier": account["account_identifier"],
+            "transactions": transactions[at:at + count],
+            "count": count,
+        }
+        if account.get("validation") is not None:
+            group["validation"] = account["validation"]
+        groups.append(group)
+        at += count
+    return groups
+
+
+async def _run_parse(
+    pdf_bytes: bytes,
+    bank_code: str,
+    tenant_id: Optional[str],
+    rules_version: Optional[str] = None,
+    rules: Optional[list] = None,
+    ext: str = ".pdf",
+    window: Optional[DateWindow] = None,
+):
+    """Admit a document to a lane and parse it in a worker process."""
+    started = time.monotonic()
+    try:
+        with tracing.span("admission", bytes=len(pdf_bytes)) as span:
+            # Exports have no pages; their size alone picks the lane
+            if ext == ".pdf":
+                # Reads the xref, page tree and sample content streams: off
+                # the event loop, so a large upload does not stall other
+                # requests (including /health/ready) meanwhile
+                structure = await asyncio.to_thread(read_structure, pdf_bytes)
+                if structure.problem:
+                    # Scanned or locked: fail before any worker time is spent
+                    raise AdmissionError(422, structure.problem)
+                doc = structure.size
+                memory = estimate_memory(doc, structure.chars_per_page)
+            else:
+                doc = DocumentSize(0, len(pdf_bytes))
+                memory = estimate_memory(doc)
+            lane = admit(doc, {name: sched.queue_depth for name, sched in lanes.items()})
+            if span is not None:
+                span.set(pages=doc.pages, lane=lane, memory=memory)
+    except AdmissionError as e:
+        metrics.incr("admission.rejected", status=e.status_code)
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    metrics.incr("admission.admitted", lane=lane)
+
+    try:
+        root = tracing.current()
+        context = root.context() if root else None
+        # Sections of a multi-account document run as jobs of their own,
+        # side by side in the tenant's slot when the lane has the workers
+        split = lanes[lane].workers > 1
+        with spooled(pdf_bytes) as data:
+            result, telemetry = await lanes[lane].submit(
+                tenant_id, parse_job, bank_code, data, rules_version, rules, ext, window, context, None, split,
+                pages=doc.pages,
+                memory=memory,
+            )
+            telemetries = [telemetry]
+            if isinstance(result, dict) and "sections" in result:
+                document = object()
+                done = await asyncio.gather(*(
+                    lanes[lane].submit(
+                        tenant_id, parse_job, bank_code, data, rules_version, rules, ext, window, context, section,
+                        pages=section.pages,
+                        memory=memory,
+                        group=document,
+                    )
+                    for section in result["sections"]
+                ))
+                result = combine([part for part, _ in done])
+                telemetries += [telemetry for _, telemetry in done]
+    except Exception as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Failed to parse {'PDF' if ext == '.pdf' else 'export'}: {str(e)}",
+        )
+    for telemetry in telemetries:
+        tracing.adopt(telemetry.pop("spans", ()))
+        metrics.merge(telemetry)
+    metrics.observe("lane.latency_seconds", time.monotonic() - started, lane=lane)
+    metrics.observe("lane.pages", doc.pages, lane=lane)
+    if ext == ".pdf":
+        # Background only: the response does not wait for it
+        shadow.maybe_run(lanes[lane], bank_code, pdf_bytes, window, memory)
+    return result
+
+
+@app.post("/inspect")
+def inspect_pdf(file: UploadFile = File(...), bank_code: Optional[str] = Form(None)):
+    """Preflight a PDF without parsing it.
+
+    Returns page count, encryption status, whether a text layer exists,
+    the suggested bank_code and the estimated parse time. Only the
+    document structure and the first page's text are read.
+    """
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    if bank_code is not None and bank_code not in PARSERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported bank_code: '{bank_code}'. Supported: {list(PARSERS.keys())}",
+        )
+    # Checked before reading: the declared size when the upload has one,
+    # and no more than one byte past the limit either way
+    if file.size is not None and file.size > _MAX_UPLOAD:
+        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
+    pdf_bytes = file.file.read(_MAX_UPLOAD + 1)
+    if len(pdf_bytes) == 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+    if len(pdf_bytes) > _MAX_UPLOAD:
+        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
+
+    try:
+        report = inspect_document(pdf_bytes, bank_code)
+    except AdmissionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    metrics.incr("preflight.inspected", parseable=str(report["parseable"]).lower())
+    return report
+
+
 @app.post("/parse")
 async def parse_pdf(
+    request: Request,
     file: UploadFile = File(...),
     bank_code: str = Form(...),
+    tenant_id: Optional[str] = Form(None),
+    rules: Optional[str] = Form(None),
+    rules_version: Optional[str] = Form(None),
+    date_from: Optional[str] = Form(None),
+    date_to: Optional[str] = Form(None),
 ):
-    """Parse a bank PDF statement and return extracted transactions."""
+    """Parse a bank statement and return extracted transactions.
+
+    Accepts the bank's PDF, or its 1C (.txt), CSV or XLSX export. With
+    ``date_from``/``date_to`` (ISO dates, inclusive) only rows inside the
+    window are returned, and PDF pages outside it are not parsed.
+    A statement of several accounts returns its rows grouped under
+    "accounts", one {account_identifier, transactions} group per account.
+    """
     if bank_code not in PARSERS:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported bank_code: '{bank_code}'. Supported: {list(PARSERS.keys())}",
         )
 
-    if not file.filename or not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="File must be a PDF")
+    ext = os.path.splitext((file.filename or "").lower())[1]
+    if ext != ".pdf" and ext not in EXPORT_PARSERS:
+        raise HTTPException(
+            status_code=400, detail="File must be a PDF, or a 1C (.txt), CSV or XLSX export"
+        )
+    if ext in (".csv", ".xlsx") and bank_code not in TABULAR_BANKS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No {ext[1:].upper()} export layout for bank_code '{bank_code}'. "
+                   f"Supported: {list(TABULAR_BANKS)}",
+        )
 
     pdf_bytes = await file.read()
     if len(pdf_bytes) == 0:
         raise HTTPException(status_code=400, detail="Empty file")
 
-    if len(pdf_bytes) > 10 * 1024 * 1024:  # 10MB limit
+    if len(pdf_bytes) > _MAX_UPLOAD:
         raise HTTPException(status_code=400, detail="File too large (max 10MB)")
 
-    parser = PARSERS[bank_code]
+    rules_version, rule_set = _read_rules(rules, rules_version)
+    window = _read_window(date_from, date_to)
 
-    try:
-        result = parser(pdf_bytes)
-    except Exception as e:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Failed to parse PDF: {str(e)}",
-        )
+    key = (hashlib.sha256(pdf_bytes).digest(), bank_code, ext, rules_version, window)
+    result, coalesced = await inflight.do(
+        key,
+        lambda: _run_parse(pdf_bytes, bank_code, tenant_id, rules_version, rule_set, ext, window),
+    )
+    root = tracing.current()
+    if root is not None:
+        # A coalesced request's stages are in the trace of the one it joined
+        root.set(bank_code=bank_code, coalesced=coalesced)
 
-    # Parsers return dict with "transactions" and "account_identifier"
-    if isinstance(result, dict):
-        transactions = result.get("transactions", [])
-        account_identifier = result.get("account_identifier")
-    else:
-        # Backward compatibility
-        transactions = result
-        account_identifier = None
-
-    return JSONResponse(
-        content={
+    with tracing.span("serialize"):
+        # Parsers return dict with "transactions" (records, converted to the
+        # wire format here) and "account_identifier"
+        if isinstance(result, dict):
+            transactions = [tx.to_wire() for tx in result.get("transactions", [])]
+            account_identifier = result.get("account_identifier")
+        else:
+            # Backward compatibility
+            transactions = result
+            account_identifier = None
+
+        body = {
             "bank_code": bank_code,
             "file_name": file.filename,
             "transactions": transactions,
             "count": len(transactions),
             "account_identifier": account_identifier,
         }
-    )
+        if isinstance(result, dict) and result.get("accounts"):
+            # Several accounts: their rows are grouped instead of listed at
+            # the top level; "categories" still follow the rows in order
+            body["accounts"] = _account_groups(result["accounts"], body.pop("transactions"))
+        if window is not None:
+            body["pages_skipped"] = result.get("pages_skipped", 0) if isinstance(result, dict) else 0
+        if isinstance(result, dict) and result.get("validation") is not None:
+            body["validation"] = result["validation"]
+        if rule_set is not None:
+            body["categories"] = result.get("categories") if isinstance(result, dict) else None
+            body["rules_version"] = rules_version
+
+        response = json_response(
+            body,
+            accept_encoding=request.headers.get("accept-encoding"),
+        )
+    return response
@@ -0,0 +1,129 @@
+"""In-process metrics registry for the PDF service.
+
+Counters, gauges and observation summaries keyed by name + labels.
+Exposed as JSON via ``GET /metrics``. Worker processes keep their own
+registry and ship it back with each job via ``drain()``/``merge()``.
+"""
+
+import threading
+from collections import deque
+from typing import Any
+
+# Number of recent observations kept per summary for percentile estimates
+_SAMPLE_WINDOW = 1024
+
+
+def _key(name: str, labels: dict[str, Any]) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class _Summary:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def snapshot(self) -> dict[str, float]:
+        out = {"count": self.count, "sum": round(self.total, 6), "max": round(self.max, 6)}
+        if self.samples:
+            ordered = sorted(self.samples)
+            out["p50"] = round(_percentile(ordered, 0.50), 6)
+            out["p95"] = round(_percentile(ordered, 0.95), 6)
+            out["p99"] = round(_percentile(ordered, 0.99), 6)
+        return out
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and summaries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, _Summary] = {}
+
+    def incr(self, name: str, value: float = 1, /, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, /, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, /, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary()
+            summary.add(value)
+
+    def drain(self) -> dict[str, Any]:
+        """Return counters and raw observations recorded since the last drain."""
+        with self._lock:
+            delta = {
+                "counters": self._counters,
+                "observations": {k: list(s.samples) for k, s in self._summaries.items()},
+            }
+            self._counters = {}
+            self._summaries = {}
+        return delta
+
+    def merge(self, delta: dict[str, Any]) -> None:
+        """Fold a ``drain()`` result from another process into this registry."""
+        with self._lock:
+            for key, value in delta.get("counters", {}).items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in delta.get("observations", {}).items():
+                summary = self._summaries.get(key)
+                if summary is None:
+                    summary = self._summaries[key] = _Summary()
+                for value in values:
+                    summary.add(value)
+
+    def counter(self, name: str, /, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def total(self, name: str, /, **labels: Any) -> float:
+        """Sum of the counters named ``name`` that carry all of ``labels``."""
+        wanted = {f"{k}={v}" for k, v in labels.items()}
+        total = 0.0
+        with self._lock:
+            for key, value in self._counters.items():
+                if key == name and not wanted:
+                    total += value
+                elif key.startswith(name + "{") and wanted <= set(key[len(name) + 1:-1].split(",")):
+                    total += value
+        return total
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: s.snapshot() for k, s in self._summaries.items()},
+            }
+
+
+metrics = Metrics()
@@ -1,7 +1,11 @@
-from .sber import parse_sber
+from typing import Any, Callable
+
+from .sber import parse_sber, sber_sections
 from .tbank import parse_tbank
 from .tbank_deposit import parse_tbank_deposit
 from .ozon import parse_ozon
+from .onec import parse_onec
+from .tabular import BANKS as TABULAR_BANKS, parse_csv, parse_xlsx
 
 PARSERS = {
     "sber": parse_sber,
@@ -9,3 +13,21 @@ PARSERS = {
     "tbank_deposit": parse_tbank_deposit,
     "ozon": parse_ozon,
 }
+
+# Finders of account sections, for parsers that take a ``section`` (see
+# parsers.sections). Called as finder(data).
+SECTIONS = {
+    "sber": sber_sections,
+}
+
+# Candidate versions of PARSERS entries, same signature, run in shadow on
+# sampled live traffic (see app.shadow) until promoted. E.g.
+#   CANDIDATES["sber"] = parse_sber_v2
+CANDIDATES: dict[str, Callable[..., dict[str, Any]]] = {}
+
+# Statement exports, keyed by file extension. Called as parser(data, bank_code).
+EXPORT_PARSERS = {
+    ".txt": parse_onec,
+    ".csv": parse_csv,
+    ".xlsx": parse_xlsx,
+}
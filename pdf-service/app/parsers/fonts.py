@@ -0,0 +1,136 @@
+"""Fonts shared across the documents a worker process parses.
+
+Statements from one bank embed the same fonts, yet pdfminer builds each
+font again for every document: it parses the embedded ToUnicode CMap,
+the widths and the font program's encoding. It also rebuilds them for
+every page when the fonts are direct objects of the page resources,
+since its cache is keyed by object number within one document.
+
+``CachingResourceManager`` keys fonts by a fingerprint of their
+definition instead: the font dictionary with references resolved and
+the raw bytes of the streams it uses (font program, CMap). Building a
+font reads nothing else, so equal fingerprints give equal fonts. The
+fingerprint is taken without decompressing anything. Fonts are kept in a
+process-wide LRU of ``settings.FONT_CACHE_SIZE`` entries, detached from
+the document they came from. Type3 fonts draw glyphs with the document's
+own content streams and are not shared. Predefined CMaps (Identity-H…)
+are already cached process-wide by pdfminer's CMapDB.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from pdfminer.pdffont import PDFFont
+from pdfminer.pdfinterp import PDFResourceManager
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral
+
+from .. import settings
+from ..metrics import metrics
+
+# Deeper nesting than any font dictionary has: a reference loop
+_MAX_DEPTH = 12
+
+_fonts: OrderedDict[bytes, PDFFont] = OrderedDict()
+# /inspect opens documents in the server's thread pool
+_lock = threading.Lock()
+
+
+def _feed(h: Any, value: Any, depth: int = 0) -> None:
+    """Hash ``value`` into ``h``, following references."""
+    if depth > _MAX_DEPTH:
+        raise ValueError("font definition nested too deep")
+    if isinstance(value, PDFObjRef):
+        _feed(h, value.resolve(), depth + 1)
+    elif isinstance(value, PDFStream):
+        h.update(b"S")
+        _feed(h, value.attrs, depth + 1)
+        if value.rawdata is not None:
+            h.update(b"R%d:" % len(value.rawdata))
+            h.update(value.rawdata)
+        else:
+            h.update(b"D%d:" % len(value.data or b""))
+            h.update(value.data or b"")
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for key in sorted(value, key=str):
+            h.update(str(key).encode() + b"=")
+            _feed(h, value[key], depth + 1)
+        h.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[")
+        for item in value:
+            _feed(h, item, depth + 1)
+        h.update(b"]")
+    elif isinstance(value, PSLiteral):
+        h.update(b"/" + str(value.name).encode())
+    elif isinstance(value, bytes):
+        h.update(b"b%d:" % len(value) + value)
+    else:
+        h.update(repr(value).encode())
+
+
+def fingerprint(spec: Any) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, spec)
+    return h.digest()
+
+
+def _detach(value: Any) -> Any:
+    """``value`` without references into its document."""
+    if isinstance(value, (PDFObjRef, PDFStream)):
+        return None
+    if isinstance(value, dict):
+        return {k: _detach(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_detach(v) for v in value]
+    return value
+
+
+class CachingResourceManager(PDFResourceManager):
+    """A resource manager that takes fonts from the process-wide cache."""
+
+    def get_font(self, objid: object, spec: Any) -> PDFFont:
+        if objid and objid in self._cached_fonts:
+            return self._cached_fonts[objid]
+        key = self._key(spec)
+        if key is None:
+            return super().get_font(objid, spec)
+        with _lock:
+            font = _fonts.get(key)
+            if font is not None:
+                _fonts.move_to_end(key)
+        metrics.incr("font_cache.lookups", result="hit" if font is not None else "miss")
+        if font is None:
+            # objid None: built without pdfminer's per-document caching
+            font = super().get_font(None, spec)
+            for name, value in vars(font).items():
+                setattr(font, name, _detach(value))
+            with _lock:
+                _fonts[key] = font
+                while len(_fonts) > settings.FONT_CACHE_SIZE:
+                    _fonts.popitem(last=False)
+                metrics.set_gauge("font_cache.size", len(_fonts))
+        if objid:
+            self._cached_fonts[objid] = font
+        return font
+
+    @staticmethod
+    def _key(spec: Any) -> Optional[bytes]:
+        if not isinstance(spec, dict):
+            return None
+        subtype = spec.get("Subtype")
+        if isinstance(subtype, PSLiteral) and subtype.name == "Type3":
+            return None
+        try:
+            return fingerprint(spec)
+        except Exception:
+            # An unreadable definition fails, or not, as pdfminer decides
+            return None
+
+
+def clear() -> None:
+    with _lock:
+        _fonts.clear()
@@ -0,0 +1,117 @@
+"""Table header classification shared by the table-based parsers.
+
+Each bank describes its header cells as an ordered keyword table. The
+first rule whose keywords occur in a cell decides that cell's field.
+``HeaderClassifier`` compiles every rule's keywords into one regex and
+caches the resulting column mapping by the normalized header tuple. A
+statement repeats the same header on every page, so after the first page
+the mapping is a single dict lookup.
+
+``TableHeaders`` tracks the header within one document. A continuation
+table that starts straight with data rows, as when a page break splits
+a table, inherits the last mapping if it has the same number of columns.
+Without this it would be skipped.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from ..metrics import metrics
+from .memo import memoize
+
+Row = list[Optional[str]]
+Mapping = dict[str, int]
+
+# How a rule treats a field that is already mapped:
+ALWAYS = "always"  # map the cell again (the later column wins)
+CLAIM = "claim"  # the cell is consumed but the first column is kept
+UNSET = "unset"  # the rule only applies while the field is unmapped
+
+
+@dataclass(frozen=True)
+class HeaderRule:
+    field: str
+    keywords: tuple[str, ...]
+    when_mapped: str = ALWAYS
+    # Match the whole cell rather than a substring of it
+    exact: bool = False
+
+
+def _compile(rule: HeaderRule) -> re.Pattern[str]:
+    alternation = "|".join(re.escape(k) for k in rule.keywords)
+    return re.compile(f"^(?:{alternation})$" if rule.exact else alternation)
+
+
+def _normalize_cell(cell: Optional[str]) -> str:
+    return cell.strip().lower().replace("\n", " ") if cell else ""
+
+
+class HeaderClassifier:
+    """Row → column mapping for one bank's table layout."""
+
+    def __init__(
+        self,
+        name: str,
+        rules: Iterable[HeaderRule],
+        required: Iterable[tuple[str, ...]],
+    ) -> None:
+        self.name = name
+        self.rules = tuple(rules)
+        # Every group must have at least one of its fields mapped
+        self.required = tuple(required)
+        self._patterns = [_compile(rule) for rule in self.rules]
+        self._cached = memoize(f"{name}.header", maxsize=256)(self._classify)
+
+    def classify(self, row: Optional[Row]) -> Optional[Mapping]:
+        """Column mapping of a header row, or None if it is not one.
+
+        The mapping is shared between calls: callers must not modify it.
+        """
+        if not row:
+            return None
+        return self._cached(tuple(_normalize_cell(cell) for cell in row))
+
+    def _classify(self, cells: tuple[str, ...]) -> Optional[Mapping]:
+        mapping: Mapping = {}
+        for i, cell in enumerate(cells):
+            if not cell:
+                continue
+            for rule, pattern in zip(self.rules, self._patterns):
+                mapped = rule.field in mapping
+                if mapped and rule.when_mapped == UNSET:
+                    continue
+                if pattern.search(cell):
+                    if not (mapped and rule.when_mapped == CLAIM):
+                        mapping[rule.field] = i
+                    break
+
+        for group in self.required:
+            if not any(field in mapping for field in group):
+                return None
+        return mapping
+
+    def document(self) -> "TableHeaders":
+        return TableHeaders(self)
+
+
+class TableHeaders:
+    """Header state of one document's tables."""
+
+    def __init__(self, classifier: HeaderClassifier) -> None:
+        self.classifier = classifier
+        self.last: Optional[Mapping] = None
+        self._width = 0
+
+    def split(self, table: list[Row]) -> tuple[Optional[Mapping], list[Row]]:
+        """(mapping, data rows) of a table; (None, []) if it holds no transactions."""
+        if not table:
+            return None, []
+        header = self.classifier.classify(table[0])
+        if header is not None:
+            self.last, self._width = header, len(table[0])
+            return header, table[1:]
+        if self.last is not None and len(table[0]) == self._width:
+            metrics.incr("headers.inherited", parser=self.classifier.name)
+            return self.last, table
+        return None, []
@@ -0,0 +1,85 @@
+"""Bounded, process-wide memoization for text derivations.
+
+Statements repeat the same counterparties and purposes across thousands of
+rows and documents, e.g. salary transfers, rent or the same supermarket.
+``@memoize`` caches a derivation by its input string (LRU), so each distinct
+text goes through the regex chain once per worker process. String results
+are interned, so repeated values in large result sets share one object.
+
+Hit/miss counts are kept locally and published as metrics by
+``flush_stats()``. Incrementing the shared registry on every call would
+cost about as much as the regexes being saved.
+"""
+
+import sys
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, TypeVar
+
+from ..metrics import metrics
+
+T = TypeVar("T")
+
+DEFAULT_MAXSIZE = 4096
+
+_caches: list["_Memo"] = []
+
+
+class _Memo:
+    __slots__ = ("name", "maxsize", "data", "hits", "misses")
+
+    def __init__(self, name: str, maxsize: int) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+def memoize(name: str, maxsize: int = DEFAULT_MAXSIZE) -> Callable[[Callable[[str], T]], Callable[[str], T]]:
+    """Cache a one-argument text derivation under ``name`` (the metric label)."""
+
+    def decorate(fn: Callable[[str], T]) -> Callable[[str], T]:
+        memo = _Memo(name, maxsize)
+        _caches.append(memo)
+        data = memo.data
+        missing = object()
+
+        @wraps(fn)
+        def cached(text: str) -> T:
+            value = data.get(text, missing)
+            if value is not missing:
+                data.move_to_end(text)
+                memo.hits += 1
+                return value
+            memo.misses += 1
+            value = fn(text)
+            if type(value) is str:
+                value = sys.intern(value)
+            data[text] = value
+            if len(data) > memo.maxsize:
+                data.popitem(last=False)
+            return value
+
+        cached.cache = memo  # type: ignore[attr-defined]
+        return cached
+
+    return decorate
+
+
+def flush_stats() -> None:
+    """Publish hit/miss counts accumulated since the last flush."""
+    for memo in _caches:
+        if memo.hits:
+            metrics.incr("memo.lookups", memo.hits, fn=memo.name, result="hit")
+        if memo.misses:
+            metrics.incr("memo.lookups", memo.misses, fn=memo.name, result="miss")
+        memo.hits = memo.misses = 0
+        metrics.set_gauge("memo.size", len(memo.data), fn=memo.name)
+
+
+def clear() -> None:
+    """Empty every cache (benchmarks and tests)."""
+    for memo in _caches:
+        memo.data.clear()
+        memo.hits = memo.misses = 0
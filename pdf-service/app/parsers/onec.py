@@ -0,0 +1,185 @@
+"""1C ClientBankExchange statement parser.
+
+Sber Business, T-Business and most other business banks export statements
+in the 1C exchange format. It is plain key=value text, usually in
+Windows-1251 ("Кодировка=Windows") or CP866 ("Кодировка=DOS"):
+
+    1CClientBankExchange
+    РасчСчет=40702810000000000001
+    СекцияДокумент=Платежное поручение
+    Дата=05.02.2026
+    Сумма=1500.00
+    ПлательщикСчет=40702810000000000001
+    Получатель1=ООО «Ромашка»
+    НазначениеПлатежа=Оплата по счёту 12
+    ДатаСписано=05.02.2026
+    КонецДокумента
+    КонецФайла
+
+The file is read line by line through an incremental decoder. Only one
+document section is held at a time, however large the export.
+"""
+
+import io
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Iterator, Optional, Union
+
+from .records import Transaction
+from .utils import clean_text, parse_date
+
+SIGNATURE = b"1CClientBankExchange"
+
+# Bytes sniffed to pick the encoding
+_SNIFF_BYTES = 4096
+_ENCODING_KEY = "Кодировка"
+
+
+def detect_encoding(head: bytes) -> str:
+    """Encoding of an export from its first few KB."""
+    if head.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    if _ENCODING_KEY.encode("cp866") in head:
+        return "cp866"
+    if _ENCODING_KEY.encode("utf-8") in head:
+        return "utf-8"
+    return "cp1251"
+
+
+def _lines(source: Union[bytes, IO[bytes]]) -> Iterator[str]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:_SNIFF_BYTES])
+        stream: IO[bytes] = io.BytesIO(source)
+    else:
+        stream = source if hasattr(source, "peek") else io.BufferedReader(source)  # type: ignore[arg-type]
+        head = stream.peek(_SNIFF_BYTES)[:_SNIFF_BYTES]  # type: ignore[attr-defined]
+    encoding = detect_encoding(head)
+    text = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline=None)
+    try:
+        for line in text:
+            yield line.rstrip("\n")
+    finally:
+        text.detach()
+
+
+def _amount(raw: Optional[str]) -> Optional[Decimal]:
+    if not raw:
+        return None
+    try:
+        return Decimal(raw.strip().replace(",", ".").replace(" ", ""))
+    except InvalidOperation:
+        return None
+
+
+def _party(doc: dict[str, str], side: str) -> Optional[str]:
+    # "Плательщик1" holds the bare name; "Плательщик" is often "ИНН 7700000000 ООО …"
+    name = doc.get(f"{side}1") or doc.get(side)
+    if name and name.upper().startswith("ИНН"):
+        parts = name.split(None, 2)
+        name = parts[2] if len(parts) == 3 else None
+    return clean_text(name)
+
+
+def _purpose(doc: dict[str, str]) -> Optional[str]:
+    # Older format versions split the purpose over НазначениеПлатежа1…6
+    purpose = doc.get("НазначениеПлатежа") or " ".join(
+        doc[k] for k in (f"НазначениеПлатежа{i}" for i in range(1, 7)) if doc.get(k)
+    )
+    return clean_text(purpose)
+
+
+def _to_transaction(doc: dict[str, str], own_accounts: set[str]) -> Optional[Transaction]:
+    amount = _amount(doc.get("Сумма"))
+    if not amount:
+        return None
+
+    payer_account = doc.get("ПлательщикСчет") or doc.get("ПлательщикРасчСчет")
+    payee_account = doc.get("ПолучательСчет") or doc.get("ПолучательРасчСчет")
+    # Which side is ours decides the direction. Banks often fill both
+    # ДатаСписано and ДатаПоступило, so the dates only decide it for
+    # documents that name none of the statement's accounts.
+    if payer_account and payer_account in own_accounts:
+        direction = "expense"
+    elif payee_account and payee_account in own_accounts:
+        direction = "income"
+    elif doc.get("ДатаСписано"):
+        direction = "expense"
+    elif doc.get("ДатаПоступило"):
+        direction = "income"
+    else:
+        return None
+    if direction == "expense":
+        other, posted = "Получатель", doc.get("ДатаСписано")
+    else:
+        other, posted = "Плательщик", doc.get("ДатаПоступило")
+
+    dt = parse_date(posted) or parse_date(doc.get("Дата"))
+    if not dt:
+        return None
+
+    return Transaction(
+        date=dt,
+        time=None,
+        amount=amount,
+        direction=direction,
+        counterparty=_party(doc, other),
+        purpose=_purpose(doc),
+    )
+
+
+class _Export:
+    """Streaming reader; ``account_identifier`` is known once the header is read."""
+
+    def __init__(self, source: Union[bytes, IO[bytes]]) -> None:
+        self.source = source
+        self.account_identifier: Optional[str] = None
+
+    def __iter__(self) -> Iterator[Transaction]:
+        own_accounts: set[str] = set()
+        doc: Optional[dict[str, str]] = None
+        lines = _lines(self.source)
+
+        first = next(lines, "").strip()
+        if first != SIGNATURE.decode():
+            raise ValueError("Not a 1C ClientBankExchange file")
+
+        for line in lines:
+            key, sep, value = line.partition("=")
+            key = key.strip()
+            if not sep:
+                if key == "КонецДокумента" and doc is not None:
+                    tx = _to_transaction(doc, own_accounts)
+                    if tx:
+                        yield tx
+                    doc = None
+                elif key == "КонецФайла":
+                    break
+                continue
+
+            value = value.strip()
+            if key == "СекцияДокумент":
+                doc = {}
+            elif doc is not None:
+                doc[key] = value
+            elif key == "РасчСчет" and value:
+                own_accounts.add(value)
+                if self.account_identifier is None:
+                    self.account_identifier = value
+
+
+def iter_onec(source: Union[bytes, IO[bytes]]) -> _Export:
+    """Iterate transactions of an export without holding the whole file."""
+    return _Export(source)
+
+
+def parse_onec(source: Union[bytes, IO[bytes]], bank_code: Optional[str] = None) -> dict[str, Any]:
+    """Parse a 1C ClientBankExchange export and return transactions + account identifier.
+
+    The format is the same for every bank, so ``bank_code`` is accepted
+    only for a uniform registry signature.
+    """
+    export = iter_onec(source)
+    transactions = list(export)
+    return {
+        "transactions": transactions,
+        "account_identifier": export.account_identifier,
+    }
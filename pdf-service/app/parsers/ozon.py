@@ -7,66 +7,47 @@ Amount format: "+1 234,56" / "-1 234,56".
 """
 
 import re
-import pdfplumber
-from io import BytesIO
 from typing import Any, Optional
 
-from .utils import parse_date, clean_text
+from .. import tracing
+from .memo import memoize
+from .pages import DateWindow, select_pages, windowed
+from .prefilter import prefiltered
+from .records import Transaction
+from .tables import TableStrategy
+from .utils import parse_date, clean_text, PdfSource, open_pdf
 
 NBSP = "\u00a0"
 
+_AMT_RE = re.compile(r"([+-])\s*([\d\s]+(?:[.,]\d{2})?)")
+_CP_RE = re.compile(r"Получатель:\s*([^\.]+)")
+_ORG_RE = re.compile(r'(ООО|АО|ИП|ПАО)\s*"?«?([^"»]+?)»?"?')
+_TIME_RE = re.compile(r"\d{2}:\d{2}(?::\d{2})?")
+_DATE_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}")
 
-def parse_ozon(pdf_bytes: bytes) -> dict[str, Any]:
-    """Parse an Ozon Bank PDF statement and return transactions + account identifier."""
+
+def parse_ozon(pdf_bytes: PdfSource, window: Optional[DateWindow] = None) -> dict[str, Any]:
+    """Parse an Ozon Bank PDF statement and return transactions + account identifier.
+
+    With a date window, only the pages that can hold rows inside it are
+    parsed (see ``pages.select_pages``); rows are filtered by the caller.
+    """
     account_id = None
-    transactions: list[dict[str, Any]] = []
-
-    _amt_re = re.compile(r"([+-])\s*([\d\s]+(?:[.,]\d{2})?)")
-    _cp_re = re.compile(r"Получатель:\s*([^\.]+)")
-    _org_re = re.compile(r'(ООО|АО|ИП|ПАО)\s*"?«?([^"»]+?)»?"?')
-
-    def _split_dt(dt_cell: str) -> tuple[str, Optional[str]]:
-        s = (dt_cell or "").replace("\n", " ").replace(NBSP, " ").strip()
-        m = re.search(r"(\d{2}\.\d{2}\.\d{4}).*?(\d{2}:\d{2}(?::\d{2})?)", s)
-        if m:
-            return m.group(1), m.group(2)
-        d = re.search(r"\d{2}\.\d{2}\.\d{4}", s)
-        return (d.group(0) if d else ""), None
-
-    def _parse_amount(a: str) -> tuple[Optional[str], Optional[float]]:
-        txt = (a or "").replace(NBSP, " ")
-        m = _amt_re.search(txt)
-        if not m:
-            return None, None
-        sign = m.group(1)
-        val = float(m.group(2).replace(" ", "").replace(",", "."))
-        return sign, val
-
-    def _counterparty(purpose: str) -> Optional[str]:
-        m = _cp_re.search(purpose or "")
-        if m:
-            return m.group(1).strip().strip('"""„').strip() or None
-        m2 = _org_re.search(purpose or "")
-        if m2:
-            return (m2.group(1) + " " + m2.group(2)).strip() or None
-        return None
-
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+    transactions: list[Transaction] = []
+
+    with open_pdf(pdf_bytes) as pdf:
         # Extract account number from text
-        for page in pdf.pages[:3]:
+        for page in tracing.pages(pdf.pages[:3], "ozon.account"):
             text = page.extract_text() or ""
             if not account_id:
                 account_id = _extract_account_number(text)
 
         # Parse transactions from tables
-        for page in pdf.pages:
-            tables = page.extract_tables(
-                table_settings={"vertical_strategy": "lines", "horizontal_strategy": "lines"}
-            )
-            if not tables:
-                tables = page.extract_tables(
-                    table_settings={"vertical_strategy": "text", "horizontal_strategy": "text"}
-                )
+        selection = select_pages(pdf.pages, window, "ozon")
+        strategy = TableStrategy("ozon", is_data=_has_ozon_table)
+        pages = pdf.pages[selection.start:selection.stop]
+        for page in tracing.pages(prefiltered(windowed(pages), "ozon"), "ozon", selection.start):
+            tables = strategy.extract(page)
             if not tables:
                 continue
 
@@ -97,22 +78,62 @@ def parse_ozon(pdf_bytes: bytes) -> dict[str, Any]:
                     if not dt:
                         continue
 
-                    transactions.append({
-                        "date": dt.isoformat(),
-                        "time": time_str,
-                        "amount": str(amount),
-                        "direction": "income" if sign == "+" else "expense",
-                        "counterparty": _counterparty(purpose),
-                        "purpose": clean_text(purpose),
-                        "balance": None,
-                    })
+                    transactions.append(Transaction(
+                        date=dt,
+                        time=time_str,
+                        amount=amount,
+                        direction="income" if sign == "+" else "expense",
+                        counterparty=_counterparty(purpose),
+                        purpose=clean_text(purpose),
+                    ))
 
     return {
         "transactions": transactions,
         "account_identifier": account_id,
+        "pages_skipped": selection.skipped,
     }
 
 
+def _split_dt(dt_cell: str) -> tuple[str, Optional[str]]:
+    s = (dt_cell or "").replace("\n", " ").replace(NBSP, " ").strip()
+    d = _DATE_RE.search(s)
+    if not d:
+        return "", None
+    # The first time after the first date; searched separately because a
+    # "date.*?time" pattern rescans the rest of the cell from every date
+    t = _TIME_RE.search(s, d.end())
+    return d.group(0), (t.group(0) if t else None)
+
+
+def _parse_amount(a: str) -> tuple[Optional[str], Optional[float]]:
+    txt = (a or "").replace(NBSP, " ")
+    m = _AMT_RE.search(txt)
+    if not m:
+        return None, None
+    sign = m.group(1)
+    val = float(m.group(2).replace(" ", "").replace(",", "."))
+    return sign, val
+
+
+@memoize("ozon.counterparty")
+def _counterparty(purpose: str) -> Optional[str]:
+    m = _CP_RE.search(purpose or "")
+    if m:
+        return m.group(1).strip().strip('"""„').strip() or None
+    m2 = _ORG_RE.search(purpose or "")
+    if m2:
+        return (m2.group(1) + " " + m2.group(2)).strip() or None
+    return None
+
+
+def _has_ozon_table(tables: list[list[list[Optional[str]]]]) -> bool:
+    """True if any table starts with the Ozon "Дата операции" header."""
+    for tbl in tables:
+        if tbl and tbl[0] and "Дата операции" in (tbl[0][0] or "").replace(NBSP, " "):
+            return True
+    return False
+
+
 def _extract_account_number(text: str) -> Optional[str]:
     """Extract Ozon Bank account number from page text."""
     # Standard 20-digit account number
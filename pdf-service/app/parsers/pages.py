@@ -0,0 +1,206 @@
+"""Page selection for date-window parsing.
+
+Statements list operations in date order: ascending for most banks,
+descending for some card statements. Given a ``DateWindow``, the page range
+that can hold rows inside it is found by bisection. Each probe costs one
+``extract_text``, much less than table extraction. Pages before the range
+are never parsed, and parsing stops once the range is passed.
+
+Row dates are read from lines that start with a DD.MM.YYYY date (after an
+optional row number). Header and footer dates such as "Дата формирования
+05.04.2026" or a statement period do not count. When the order cannot be
+established (no dated rows, or the same date throughout), every page is
+parsed.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Iterable, Iterator, Optional, TypeVar
+
+from .. import settings
+from ..metrics import metrics
+
+T = TypeVar("T")
+
+_ROW_DATE_RE = re.compile(r"^\s*(?:\d{1,6}\s+)?(\d{2})\.(\d{2})\.(\d{4})\b", re.M)
+
+# Pages parsed past the end of the range: the last row of a page can
+# continue on the next one
+_TRAILING_PAGES = 1
+
+
+@dataclass(frozen=True)
+class DateWindow:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def __bool__(self) -> bool:
+        return self.date_from is not None or self.date_to is not None
+
+    def contains(self, d: date) -> bool:
+        if self.date_from is not None and d < self.date_from:
+            return False
+        if self.date_to is not None and d > self.date_to:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class PageSelection:
+    """Contiguous range of page indices to parse: [start, stop)."""
+
+    start: int
+    stop: int
+    total: int
+
+    def __contains__(self, index: int) -> bool:
+        return self.start <= index < self.stop
+
+    @property
+    def skipped(self) -> int:
+        return self.total - (self.stop - self.start)
+
+    @classmethod
+    def everything(cls, total: int) -> "PageSelection":
+        return cls(0, total, total)
+
+    def shifted(self, offset: int) -> "PageSelection":
+        """The same range, for pages selected from a slice starting at ``offset``."""
+        return PageSelection(self.start + offset, self.stop + offset, self.total) if offset else self
+
+
+def row_dates(page: Any) -> Optional[tuple[date, date]]:
+    """(earliest, latest) row date on a page, or None if it has no dated rows."""
+    found = []
+    for d, m, y in _ROW_DATE_RE.findall(page.extract_text() or ""):
+        try:
+            found.append(date(int(y), int(m), int(d)))
+        except ValueError:
+            continue
+    if not found:
+        return None
+    return min(found), max(found)
+
+
+class _Probe:
+    """Memoized row dates per page index."""
+
+    def __init__(self, pages: list[Any]) -> None:
+        self.pages = pages
+        self._dates: dict[int, Optional[tuple[date, date]]] = {}
+
+    def __call__(self, index: int) -> Optional[tuple[date, date]]:
+        if index not in self._dates:
+            self._dates[index] = row_dates(self.pages[index])
+        return self._dates[index]
+
+    @property
+    def probed(self) -> int:
+        return len(self._dates)
+
+    def nearest(self, index: int, lo: int, hi: int) -> Optional[int]:
+        """Closest dated page to ``index`` within [lo, hi], searching forward first."""
+        for i in range(index, hi + 1):
+            if self(i) is not None:
+                return i
+        for i in range(index - 1, lo - 1, -1):
+            if self(i) is not None:
+                return i
+        return None
+
+
+def _first_true(probe: _Probe, lo: int, hi: int, pred) -> int:
+    """Smallest dated index in [lo, hi] where a monotone predicate holds (hi + 1 if none)."""
+    answer = hi + 1
+    while lo <= hi:
+        mid = probe.nearest((lo + hi) // 2, lo, hi)
+        if mid is None:
+            break
+        if pred(probe(mid)):
+            answer, hi = mid, mid - 1
+        else:
+            lo = mid + 1
+    return answer
+
+
+def select_pages(pages: list[Any], window: Optional[DateWindow], parser: str) -> PageSelection:
+    """Pages of a document that can contain rows inside ``window``."""
+    total = len(pages)
+    if not window or total < 3:
+        return PageSelection.everything(total)
+
+    probe = _Probe(pages)
+    first = probe.nearest(0, 0, total - 1)
+    last = probe.nearest(total - 1, 0, total - 1) if first is not None else None
+    if first is None or last is None or first == last:
+        return PageSelection.everything(total)
+    head, tail = probe(first), probe(last)
+    if head[0] < tail[1]:
+        ascending = True
+    elif head[1] > tail[0]:
+        ascending = False
+    else:
+        return PageSelection.everything(total)
+
+    lo, hi = 0, total - 1
+    date_from, date_to = window.date_from, window.date_to
+    if ascending:
+        # First page that reaches the window; first page entirely after it
+        if date_from is not None:
+            lo = _first_true(probe, first, last, lambda d: d[1] >= date_from)
+        if date_to is not None:
+            hi = _first_true(probe, max(lo, first), last, lambda d: d[0] > date_to) - 1
+    else:
+        if date_to is not None:
+            lo = _first_true(probe, first, last, lambda d: d[0] <= date_to)
+        if date_from is not None:
+            hi = _first_true(probe, max(lo, first), last, lambda d: d[1] < date_from) - 1
+
+    if lo == first:
+        # Undated pages before the first row (cover, summary) stay in
+        lo = 0
+    if lo > hi:
+        # No page holds rows inside the window
+        selection = PageSelection(lo, lo, total)
+    else:
+        selection = PageSelection(lo, min(total, hi + 1 + _TRAILING_PAGES), total)
+
+    metrics.incr("page_window.probed", probe.probed, parser=parser)
+    metrics.incr("page_window.skipped", selection.skipped, parser=parser)
+    return selection
+
+
+def release(page: Any) -> None:
+    """Drop a pdfplumber page's parsed layout, chars and text map.
+
+    pdfplumber 0.11's ``close`` keeps the text map cache, which holds the
+    page's chars too.
+    """
+    page.close()
+    textmap = getattr(page, "get_textmap", None)
+    if textmap is not None and hasattr(textmap, "cache_clear"):
+        textmap.cache_clear()
+
+
+def windowed(pages: Iterable[T], size: Optional[int] = None) -> Iterator[T]:
+    """Iterate pages, releasing each window of ``size`` once the loop is past it.
+
+    pdfplumber keeps every page it has laid out, several MB each for a
+    dense statement. Released window by window, a parse holds at most
+    ``size`` pages (``settings.PAGES_IN_MEMORY``) whatever the length of
+    the document. A page read again after release is laid out again.
+    """
+    size = size or settings.PAGES_IN_MEMORY
+    held: list[T] = []
+    try:
+        for page in pages:
+            if len(held) >= size:
+                for done in held:
+                    release(done)
+                held.clear()
+            held.append(page)
+            yield page
+    finally:
+        for done in held:
+            release(done)
@@ -0,0 +1,118 @@
+"""Page content dropped before table and text extraction.
+
+Two kinds of page objects cost extraction time and only produce text the
+parsers throw away afterwards:
+
+- duplicate chars: some PDFs draw every glyph twice, slightly offset, to
+  simulate bold. Table detection and text layout see each one, and
+  extract_text can print each letter twice;
+- trailing non-transaction regions: Sber's signature, certificate and QR
+  blocks, T-Bank's closing letter. Everything from the top of the first
+  line matching the bank's ``TRAILERS`` pattern down is cropped away.
+  These blocks follow the last row, so no row is lost.
+
+pdfplumber's own ``Page.dedupe_chars`` restores the char order with
+``list.index``, quadratic in the page's chars; duplicates are found here
+on a grid instead, in one pass. The objects removed are
+counted per page, as ``prefilter.removed{parser,kind}`` summaries.
+``PDF_PREFILTER=0`` turns the stage off.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from math import floor
+from typing import Any, Iterable, Iterator, Optional
+
+from .. import settings
+from ..metrics import metrics
+
+# Chars of the same text, font and size closer than this (points) in both
+# directions are one glyph drawn twice
+_TOLERANCE = 1.0
+
+# Start of a bank's trailing blocks, matched against the page's chars
+# without whitespace (word spacing is often positioning, not space glyphs)
+TRAILERS = {
+    "sber": re.compile(
+        r"СВЕДЕНИЯОСЕРТИФИКАТЕ|Проверитьподпись|Дляпроверкиподлинности|"
+        r"отсканируйтеQR|Проверкаквалифицированной",
+        re.I,
+    ),
+    "tbank": re.compile(r"Суважением,?Руководитель", re.I),
+    "tbank_deposit": re.compile(r"Суважением,?Руководитель", re.I),
+}
+
+
+def _unique_chars(chars: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Chars without the duplicates of an earlier one, in order."""
+    kept: list[dict[str, Any]] = []
+    # Kept chars by glyph and cell of 2 * _TOLERANCE points: the chars
+    # within _TOLERANCE of a position lie in at most 2 x 2 cells
+    grid: dict[tuple, list[dict[str, Any]]] = {}
+    size = 2 * _TOLERANCE
+    for char in chars:
+        x0, top = char["x0"], char["doctop"]
+        glyph = (char["text"], char["fontname"], char["size"], char["upright"])
+        duplicate = False
+        for cx in {floor((x0 - _TOLERANCE) / size), floor((x0 + _TOLERANCE) / size)}:
+            for cy in {floor((top - _TOLERANCE) / size), floor((top + _TOLERANCE) / size)}:
+                for other in grid.get((glyph, cx, cy), ()):
+                    if abs(other["x0"] - x0) <= _TOLERANCE and abs(other["doctop"] - top) <= _TOLERANCE:
+                        duplicate = True
+        if not duplicate:
+            kept.append(char)
+            grid.setdefault((glyph, floor(x0 / size), floor(top / size)), []).append(char)
+    return kept
+
+
+def _trailer_top(chars: list[dict[str, Any]], pattern: Optional[re.Pattern[str]]) -> Optional[float]:
+    """Top of the highest match of ``pattern`` in the page's chars."""
+    if pattern is None:
+        return None
+    chars = [c for c in chars if not c["text"].isspace()]
+    texts = [c["text"] for c in chars]
+    text = "".join(texts)
+    matches = list(pattern.finditer(text))
+    if not matches:
+        return None
+    # Char index of each match start (a ligature char holds several letters)
+    ends = list(accumulate(len(t) for t in texts))
+    return min(chars[bisect_right(ends, m.start())]["top"] for m in matches)
+
+
+def prefilter(page: Any, parser: str) -> Any:
+    """``page`` without duplicate chars and the bank's trailing blocks."""
+    if not settings.PREFILTER:
+        return page
+    objects = page.objects
+    chars = objects.get("char", [])
+    unique = _unique_chars(chars)
+    cut = _trailer_top(unique, TRAILERS.get(parser))
+
+    duplicates = len(chars) - len(unique)
+    cropped = 0
+    if cut is not None:
+        cropped = sum(1 for c in unique if c["top"] >= cut) + sum(
+            1 for kind, objs in objects.items() if kind != "char" for o in objs if o["top"] >= cut
+        )
+    metrics.observe("prefilter.removed", duplicates, parser=parser, kind="duplicate")
+    metrics.observe("prefilter.removed", cropped, parser=parser, kind="trailer")
+    if not duplicates and not cropped:
+        return page
+
+    keep = {id(c) for c in unique} if duplicates else None
+    bottom = cut if cut is not None else float("inf")
+
+    def test(obj: dict[str, Any]) -> bool:
+        if obj["top"] >= bottom:
+            return False
+        return keep is None or obj["object_type"] != "char" or id(obj) in keep
+
+    return page.filter(test)
+
+
+def prefiltered(pages: Iterable[Any], parser: str) -> Iterator[Any]:
+    """Iterate pages through ``prefilter``."""
+    for page in pages:
+        yield prefilter(page, parser)
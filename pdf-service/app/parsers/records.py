@@ -0,0 +1,62 @@
+"""Compact in-memory transaction record shared by all parsers.
+
+Parsers keep values in their native types: dates as ``date``, amounts as
+the ``Decimal`` or ``float`` they parsed. ``main`` converts them to the
+/parse wire format (strings) once, at the edge. A slots record takes about
+a fifth of the memory of the equivalent 7-key dict.
+
+Rows cross the worker → parent process boundary as a ``TransactionBatch``.
+The batch pickles column by column, with amounts as their decimal strings
+and dates as ordinals. Pickling Decimal objects one by one would cost more
+than the compact rows save. On the parent side the amounts are therefore
+``str``, and ``to_wire`` output is the same either way.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Optional, Union
+
+Amount = Union[Decimal, float, str]
+
+
+@dataclass(slots=True)
+class Transaction:
+    date: date
+    time: Optional[str]
+    amount: Amount
+    direction: str
+    counterparty: Optional[str]
+    purpose: Optional[str]
+    balance: Optional[Amount] = None
+
+    def to_wire(self) -> dict[str, Any]:
+        """The /parse response shape: ISO date, amounts as strings."""
+        return {
+            "date": self.date.isoformat(),
+            "time": self.time,
+            "amount": str(self.amount),
+            "direction": self.direction,
+            "counterparty": self.counterparty,
+            "purpose": self.purpose,
+            "balance": str(self.balance) if self.balance is not None else None,
+        }
+
+
+class TransactionBatch(list):
+    """A list of records that pickles as columns."""
+
+    def __reduce__(self) -> tuple:
+        return _from_columns, (
+            [tx.date.toordinal() for tx in self],
+            [tx.time for tx in self],
+            [str(tx.amount) for tx in self],
+            [tx.direction for tx in self],
+            [tx.counterparty for tx in self],
+            [tx.purpose for tx in self],
+            [str(tx.balance) if tx.balance is not None else None for tx in self],
+        )
+
+
+def _from_columns(ordinals: list[int], *columns: list[Any]) -> TransactionBatch:
+    return TransactionBatch(map(Transaction, map(date.fromordinal, ordinals), *columns))
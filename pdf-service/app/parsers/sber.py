@@ -6,17 +6,30 @@ Handles both:
 """
 
 import re
-import pdfplumber
-from io import BytesIO
 from typing import Any, Optional
 
-from .utils import normalize_amount, parse_date, parse_time, clean_text
+from .. import tracing
+from .headers import CLAIM, HeaderClassifier, HeaderRule
+from .memo import memoize
+from .pages import DateWindow, PageSelection, select_pages, windowed
+from .prefilter import prefiltered
+from .records import Transaction
+from .sections import AccountSection, find_sections
+from .utils import normalize_amount, parse_date, parse_time, clean_text, PdfSource, open_pdf
+from .validation import choose
 
 # --- Constants for text-based personal statement parser ---
 NBSP = "\u00a0"
 _SP = rf"[ {NBSP}]"
-_NUM = rf"(?:\d|{_SP})+"
-_DEC = rf"{_NUM}(?:[.,]\s*\d(?:\s*\d)?)?"""
+# Digit groups start with a digit and are possessive, like every run of
+# spaces in the header pattern: no two repetitions can trade the same
+# characters, so a line that does not match fails without the cubic
+# backtracking a long run of spaces or "1 1 1 …" used to cause
+_NUM = rf"\d(?:\d|{_SP})*+"
+_DEC = rf"{_NUM}(?:[.,]\s*\d(?:\s*\d)?)?"
+# The lazy category still retries the amount from every space in the line.
+# Real header lines are well under this length; longer ones are not parsed
+_MAX_HEADER_LEN = 300
 
 # Line starting with "DD.MM.YYYY HH:MM" marks a new transaction block
 _DATE_HEAD_RE = re.compile(rf"^(\d{{2}}\.\d{{2}}\.\d{{4}}){_SP}+(\d{{2}}:\d{{2}})\b")
@@ -24,11 +37,11 @@ _DATE_HEAD_RE = re.compile(rf"^(\d{{2}}\.\d{{2}}\.\d{{4}}){_SP}+(\d{{2}}:\d{{2}}
 # Full header line: date time code category [sign]amount [balance]
 _HEADER_PARSE_RE = re.compile(
     rf"""^(?P<date>\d{{2}}\.\d{{2}}\.\d{{4}}){_SP}+
-    (?P<time>\d{{2}}:\d{{2}}){_SP}+
-    (?:(?P<code>\d+){_SP}+)?
-    (?P<category>.+?)\s+
-    (?P<sign>[+\-\u2212\u2013]?)\s*(?P<amount>{_DEC})
-    (?:\s+(?P<balance>{_DEC}))?\s*$""",
+    (?P<time>\d{{2}}:\d{{2}}){_SP}++
+    (?:(?P<code>\d+){_SP}++)?
+    (?P<category>.+?)\s++
+    (?P<sign>[+\-\u2212\u2013]?)\s*+(?P<amount>{_DEC})
+    (?:\s++(?P<balance>{_DEC}))?\s*$""",
     re.X,
 )
 
@@ -60,32 +73,55 @@ _REMOVE_DATES_TIMES_RE = re.compile(
 )
 
 
-def parse_sber(pdf_bytes: bytes) -> dict[str, Any]:
+def parse_sber(
+    pdf_bytes: PdfSource,
+    window: Optional[DateWindow] = None,
+    section: Optional[AccountSection] = None,
+) -> dict[str, Any]:
     """Parse a Sber PDF statement and return transactions + account identifier.
 
     Tries table-based extraction first (business statements).
     Falls back to text-based line parsing (personal statements).
+    With a date window, only the pages that can hold rows inside it are
+    parsed (see ``pages.select_pages``); rows are filtered by the caller.
+    With a ``section`` (see ``sber_sections``), only its pages are parsed,
+    as a statement of its account.
     """
-    transactions: list[dict[str, Any]] = []
-    account_id = None
-
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        # Extract account number from text on first pages
-        for page in pdf.pages[:3]:
-            text = page.extract_text() or ""
-            if not account_id:
-                account_id = _extract_account_number(text)
+    transactions: list[Transaction] = []
+    account_id = section.account if section else None
+
+    with open_pdf(pdf_bytes) as pdf:
+        offset, end = (section.start, section.stop) if section else (0, len(pdf.pages))
+        selection = select_pages(pdf.pages[offset:end], window, "sber").shifted(offset)
+        headers = HEADERS.document()
+
+        # Extract account number from text on first pages. Those the window
+        # skips are only read, not prefiltered or parsed (an empty window at
+        # the start skips the whole section)
+        head = offset + 3
+        before = selection.start if selection.stop > offset else end
+        if not account_id and before > offset:
+            skipped = pdf.pages[offset:min(head, before)]
+            for page in tracing.pages(windowed(skipped), "sber.account", offset):
+                account_id = _extract_account_number(page.extract_text() or "")
+                if account_id:
+                    break
+
+        for i, page in enumerate(
+            tracing.pages(prefiltered(windowed(pdf.pages[selection.start:selection.stop]), "sber"), "sber", selection.start),
+            selection.start,
+        ):
+            # ... and on the first pages inside it
+            if not account_id and i < head:
+                account_id = _extract_account_number(page.extract_text() or "")
 
             tables = page.extract_tables()
             for table in tables:
-                if not table or len(table) < 2:
-                    continue
-
-                header = _normalize_header(table[0])
+                header, rows = headers.split(table)
                 if not header:
                     continue
 
-                for row in table[1:]:
+                for row in rows:
                     if not row or len(row) < len(header):
                         continue
 
@@ -93,32 +129,15 @@ def parse_sber(pdf_bytes: bytes) -> dict[str, Any]:
                     if tx:
                         transactions.append(tx)
 
-        # Process remaining pages (tables only)
-        for page in pdf.pages[3:]:
-            tables = page.extract_tables()
-            for table in tables:
-                if not table or len(table) < 2:
-                    continue
-
-                header = _normalize_header(table[0])
-                if not header:
-                    continue
-
-                for row in table[1:]:
-                    if not row or len(row) < len(header):
-                        continue
-
-                    tx = _parse_row(header, row)
-                    if tx:
-                        transactions.append(tx)
-
-    # Fallback: if table extraction found nothing, try text-based parsing
-    if not transactions:
-        transactions = _parse_text_based(pdf_bytes)
+    # Text-based fallback if the tables gave no rows, or rows that fail
+    # validation (see validation.choose)
+    transactions, report = choose("sber", transactions, lambda: _parse_text_based(pdf_bytes, selection))
 
     return {
         "transactions": transactions,
         "account_identifier": account_id,
+        "pages_skipped": selection.skipped,
+        "validation": report.to_dict() if report else None,
     }
 
 
@@ -137,6 +156,12 @@ def _fix_decimals(txt: str) -> str:
     return re.sub(r"([.,])\s*(\d)\s+(\d)", r"\1\2\3", txt)
 
 
+def _match_header(head: str) -> Optional[re.Match[str]]:
+    if len(head) > _MAX_HEADER_LEN:
+        return None
+    return _HEADER_PARSE_RE.match(head)
+
+
 def _to_float(s: Optional[str]) -> Optional[float]:
     if not s:
         return None
@@ -147,15 +172,20 @@ def _to_float(s: Optional[str]) -> Optional[float]:
         return None
 
 
+_AUTH_CODE_RE = re.compile(r"^\s*\d{4,6}\s+")
+_CERT_HASH_RE = re.compile(r"\*?\s*[0-9A-Fa-f]{16,}.*$")
+
+
+@memoize("sber.clean_purpose")
 def _clean_purpose(text: str) -> str:
     t = _REMOVE_BITS_RE.sub("", text)
     t = _REMOVE_DATES_TIMES_RE.sub("", t)
     t = _BALANCE_LABELS_RE.sub("", t)
     t = _FOOTER_BOILERPLATE_RE.sub("", t)
     # Strip leading auth codes (6-digit numbers) left after date removal
-    t = re.sub(r"^\s*\d{4,6}\s+", "", t)
+    t = _AUTH_CODE_RE.sub("", t)
     # Strip certificate hashes and trailing junk
-    t = re.sub(r"\*?\s*[0-9A-Fa-f]{16,}.*$", "", t)
+    t = _CERT_HASH_RE.sub("", t)
     return _norm(t)
 
 
@@ -164,18 +194,22 @@ _CP_PAT = re.compile(
     r"(?:(?:\.\s*)?(?:операц|по счету|по сч[её]ту)\b|$)",
     re.I,
 )
+_CP_ACCOUNT_TAIL_RE = re.compile(r"\s*по\s+сч[её]ту\s*\*+\d+.*$", re.I)
+_CP_OPERATION_TAIL_RE = re.compile(r"\s*операц.*$", re.I)
+_SPACE_DOT_RE = re.compile(r"\s+\.")
 
 
+@memoize("sber.counterparty")
 def _counterparty_sber(text: str) -> Optional[str]:
     t = _norm(text)
     m = _CP_PAT.search(t)
     if not m:
         return None
     name = m.group(1)
-    name = re.sub(r"\s*по\s+сч[её]ту\s*\*+\d+.*$", "", name, flags=re.I)
-    name = re.sub(r"\s*операц.*$", "", name, flags=re.I)
+    name = _CP_ACCOUNT_TAIL_RE.sub("", name)
+    name = _CP_OPERATION_TAIL_RE.sub("", name)
     name = name.strip(" .,\u00a0")
-    name = re.sub(r"\s+\.", ".", name)
+    name = _SPACE_DOT_RE.sub(".", name)
     return name if name else None
 
 
@@ -196,11 +230,13 @@ def _infer_direction(sign: str, category: str, body_text: str) -> str:
     return "expense"
 
 
-def _parse_text_based(pdf_bytes: bytes) -> list[dict[str, Any]]:
+def _parse_text_based(pdf_bytes: PdfSource, selection: Optional[PageSelection] = None) -> list[Transaction]:
     """Parse Sber personal statement using text extraction + regex."""
     lines: list[str] = []
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
+    with open_pdf(pdf_bytes) as pdf:
+        first = 0 if selection is None else selection.start
+        pages = pdf.pages if selection is None else pdf.pages[first:selection.stop]
+        for page in tracing.pages(prefiltered(windowed(pages), "sber"), "sber.text", first):
             txt = page.extract_text() or ""
             for line in txt.splitlines():
                 line = _norm(line)
@@ -221,10 +257,10 @@ def _parse_text_based(pdf_bytes: bytes) -> list[dict[str, Any]]:
     if cur:
         blocks.append(cur)
 
-    transactions: list[dict[str, Any]] = []
+    transactions: list[Transaction] = []
     for blk in blocks:
         head = _fix_decimals(blk[0])
-        m = _HEADER_PARSE_RE.match(head)
+        m = _match_header(head)
         if not m:
             continue
 
@@ -254,21 +290,41 @@ def _parse_text_based(pdf_bytes: bytes) -> list[dict[str, Any]]:
         if not dt:
             continue
 
-        transactions.append({
-            "date": dt.isoformat(),
-            "time": time_str,
-            "amount": str(value),
-            "direction": direction,
-            "counterparty": counterparty,
-            "purpose": purpose if purpose else category,
-            "balance": str(balance_val) if balance_val is not None else None,
-        })
+        transactions.append(Transaction(
+            date=dt,
+            time=time_str,
+            amount=value,
+            direction=direction,
+            counterparty=counterparty,
+            purpose=purpose if purpose else category,
+            balance=balance_val,
+        ))
 
     return transactions
 
 
 # ========== Table-based parser helpers (business statements) ==========
 
+# Account a business statement page header is for: "Выписка по счёту
+# 40702…", "Выписка операций по лицевому счету 40702…", "р/с 40702…"
+_SECTION_ACCOUNT_RE = re.compile(
+    r"(?:сч[её]ту|сч[её]т|р/с)\s*(?:№\s*)?:?\s*(40\d{18})\b",
+    re.I,
+)
+# First header cell of the operations table: the page header ends there
+_SECTION_STOP_RE = re.compile(r"Дата\s+(?:операции|проводки)", re.I)
+
+
+def sber_sections(pdf_bytes: PdfSource) -> list[AccountSection]:
+    """Account sections of a (multi-account) business statement."""
+    with open_pdf(pdf_bytes) as pdf:
+        with tracing.span("sections", pages=len(pdf.pages)) as span:
+            found = find_sections(pdf, _SECTION_ACCOUNT_RE, _SECTION_STOP_RE)
+            if span is not None:
+                span.set(sections=len(found))
+    return found
+
+
 def _extract_account_number(text: str) -> str | None:
     """Extract Sber account number (20 digits starting with 408...) from page text."""
     # Look for 20-digit account number (standard Russian bank account format)
@@ -288,57 +344,28 @@ def _extract_account_number(text: str) -> str | None:
     return None
 
 
-def _normalize_header(row: list[str | None]) -> dict[str, int] | None:
-    """Map column names to indices. Returns None if not a transaction header."""
-    if not row:
-        return None
-
-    mapping: dict[str, int] = {}
-    for i, cell in enumerate(row):
-        if not cell:
-            continue
-        cell_lower = cell.strip().lower().replace('\n', ' ')
-
-        if any(k in cell_lower for k in ['дата операц', 'дата опер']):
-            if 'date' not in mapping:
-                mapping['date'] = i
-        elif 'списан' in cell_lower or 'дата списан' in cell_lower:
-            mapping['date_posted'] = i
-        elif any(k in cell_lower for k in ['контрагент', 'получатель', 'плательщик', 'корреспондент']):
-            mapping['counterparty'] = i
-        elif any(k in cell_lower for k in ['назначение', 'основание']):
-            mapping['purpose'] = i
-        elif any(k in cell_lower for k in ['дебет', 'расход', 'списание']):
-            mapping['debit'] = i
-        elif any(k in cell_lower for k in ['кредит', 'приход', 'зачисление']):
-            mapping['credit'] = i
-        elif 'остаток' in cell_lower or 'баланс' in cell_lower:
-            mapping['balance'] = i
-        elif 'сумма' in cell_lower:
-            mapping['amount'] = i
-        elif 'категория' in cell_lower:
-            if 'purpose' not in mapping:
-                mapping['purpose'] = i
-        elif 'операция' in cell_lower or 'описание' in cell_lower:
-            if 'purpose' not in mapping:
-                mapping['purpose'] = i
-        elif 'инн' in cell_lower:
-            mapping['inn'] = i
-        elif 'дата' in cell_lower:
-            if 'date' not in mapping:
-                mapping['date'] = i
-
+HEADERS = HeaderClassifier(
+    "sber",
+    [
+        HeaderRule("date", ("дата операц", "дата опер"), CLAIM),
+        HeaderRule("date_posted", ("списан",)),
+        HeaderRule("counterparty", ("контрагент", "получатель", "плательщик", "корреспондент")),
+        HeaderRule("purpose", ("назначение", "основание")),
+        HeaderRule("debit", ("дебет", "расход", "списание")),
+        HeaderRule("credit", ("кредит", "приход", "зачисление")),
+        HeaderRule("balance", ("остаток", "баланс")),
+        HeaderRule("amount", ("сумма",)),
+        HeaderRule("purpose", ("категория", "операция", "описание"), CLAIM),
+        HeaderRule("inn", ("инн",)),
+        HeaderRule("date", ("дата",), CLAIM),
+    ],
     # Must have at least date and some amount column
-    if 'date' not in mapping:
-        return None
-    if 'debit' not in mapping and 'credit' not in mapping and 'amount' not in mapping:
-        return None
-
-    return mapping
+    required=[("date",), ("debit", "credit", "amount")],
+)
 
 
-def _parse_row(header: dict[str, int], row: list[str | None]) -> dict[str, Any] | None:
-    """Parse a single table row into a transaction dict."""
+def _parse_row(header: dict[str, int], row: list[str | None]) -> Transaction | None:
+    """Parse a single table row into a transaction record."""
     date_raw = row[header['date']] if 'date' in header else None
     dt = parse_date(date_raw)
     if not dt:
@@ -383,12 +410,12 @@ def _parse_row(header: dict[str, int], row: list[str | None]) -> dict[str, Any]
 
     time_str = parse_time(date_raw)
 
-    return {
-        "date": dt.isoformat(),
-        "time": time_str,
-        "amount": str(amount),
-        "direction": direction,
-        "counterparty": counterparty,
-        "purpose": purpose,
-        "balance": str(balance) if balance is not None else None,
-    }
+    return Transaction(
+        date=dt,
+        time=time_str,
+        amount=amount,
+        direction=direction,
+        counterparty=counterparty,
+        purpose=purpose,
+        balance=balance,
+    )
@@ -0,0 +1,133 @@
+"""Account sections of multi-account statements.
+
+A business statement export can bundle several accounts into one PDF,
+each starting on a page whose header names its account. Only the header
+of each page is read: a text device stops interpreting the page's content
+stream at the table header (or after ``_HEADER_CHARS`` characters), so
+finding the sections costs a small share of one ``extract_text`` per
+page. Counterparty accounts in the rows below are never seen.
+
+Each section is parsed on its own, as a statement of its pages; the
+service runs them as separate jobs (see app.worker.parse_job), and
+``combine`` joins their results in document order.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter
+
+from .records import TransactionBatch
+
+# Header text read per page when no table header stops it earlier
+_HEADER_CHARS = 600
+
+
+@dataclass(frozen=True)
+class AccountSection:
+    """Pages [start, stop) of one account; ``account`` None if not named."""
+
+    account: Optional[str]
+    start: int
+    stop: int
+
+    @property
+    def pages(self) -> int:
+        return self.stop - self.start
+
+
+class _HeaderRead(Exception):
+    pass
+
+
+class _HeaderDevice(PDFTextDevice):
+    """Collects a page's text in content order until ``stop`` matches."""
+
+    def __init__(self, rsrcmgr: Any, stop: re.Pattern[str], limit: int) -> None:
+        super().__init__(rsrcmgr)
+        self.stop = stop
+        self.limit = limit
+        self.parts: list[str] = []
+        self.length = 0
+
+    def render_string(self, textstate: Any, seq: Any, ncs: Any, graphicstate: Any) -> None:
+        super().render_string(textstate, seq, ncs, graphicstate)
+        # Strings are positioned apart: keep words apart
+        self.parts.append(" ")
+        self.length += 1
+        if self.length >= self.limit or self.stop.search(self.text):
+            raise _HeaderRead
+
+    def render_char(self, matrix: Any, font: Any, fontsize: float, scaling: float, rise: float,
+                    cid: int, ncs: Any, graphicstate: Any) -> float:
+        try:
+            self.parts.append(font.to_unichr(cid))
+            self.length += 1
+        except PDFUnicodeNotDefined:
+            pass
+        return font.char_width(cid) * fontsize * scaling
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def header_text(pdf: Any, page: Any, stop: re.Pattern[str], limit: int = _HEADER_CHARS) -> str:
+    """Text of a pdfplumber page up to ``stop`` (excluded) or ``limit`` chars."""
+    device = _HeaderDevice(pdf.rsrcmgr, stop, limit)
+    try:
+        PDFPageInterpreter(pdf.rsrcmgr, device).process_page(page.page_obj)
+    except _HeaderRead:
+        pass
+    return stop.split(device.text, 1)[0]
+
+
+def find_sections(pdf: Any, account: re.Pattern[str], stop: re.Pattern[str]) -> list[AccountSection]:
+    """Split a document where a page header names a new account.
+
+    ``account``'s first group is the account number. Pages whose header
+    names none continue the current section; pages before the first named
+    account belong to the first section.
+    """
+    total = len(pdf.pages)
+    sections: list[AccountSection] = []
+    current: Optional[str] = None
+    start = 0
+    for i, page in enumerate(pdf.pages):
+        m = account.search(header_text(pdf, page, stop))
+        if m is None or m.group(1) == current:
+            continue
+        if current is not None:
+            sections.append(AccountSection(current, start, i))
+            start = i
+        current = m.group(1)
+    sections.append(AccountSection(current, start, total))
+    return sections
+
+
+def combine(parts: list[dict[str, Any]]) -> dict[str, Any]:
+    """One result from the parse job results of a document's sections.
+
+    Transactions (and categories) are concatenated in document order;
+    "accounts" says how many of them belong to each section's account.
+    The document as a whole has no single ``account_identifier``.
+    """
+    result: dict[str, Any] = {
+        "transactions": TransactionBatch(tx for part in parts for tx in part["transactions"]),
+        "account_identifier": None,
+        "pages_skipped": sum(part.get("pages_skipped", 0) for part in parts),
+        "accounts": [
+            {
+                "account_identifier": part.get("account_identifier"),
+                "count": len(part["transactions"]),
+                "validation": part.get("validation"),
+            }
+            for part in parts
+        ],
+    }
+    if all("categories" in part for part in parts):
+        result["categories"] = [c for part in parts for c in part["categories"]]
+    return result
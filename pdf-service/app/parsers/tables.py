@@ -0,0 +1,122 @@
+"""Per-document table-extraction strategy selection.
+
+A statement is laid out the same way on every page, so the pdfplumber table
+settings that work on its first data page work on the rest of it too.
+``TableStrategy`` probes the candidate settings once, locks the winner for
+the document and only re-probes when a page stops producing rows although
+its text still holds dated lines. Cover and summary pages therefore cost a
+single extraction once the strategy is locked.
+"""
+
+import re
+from typing import Any, Callable, Optional
+
+from ..metrics import metrics
+
+Table = list[list[Optional[str]]]
+
+LINES: dict[str, Any] = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+TEXT: dict[str, Any] = {"vertical_strategy": "text", "horizontal_strategy": "text"}
+# Ruled tables whose borders are drawn as slightly misaligned segments
+LINES_LOOSE: dict[str, Any] = {
+    **LINES,
+    "snap_tolerance": 6,
+    "join_tolerance": 6,
+    "intersection_tolerance": 6,
+}
+
+# Probe order: the historical lines → text fallback. The tuned settings are
+# only tried when both fail on a page whose text holds transaction dates.
+CANDIDATES: tuple[tuple[str, dict[str, Any]], ...] = (
+    ("lines", LINES),
+    ("text", TEXT),
+)
+FALLBACKS: tuple[tuple[str, dict[str, Any]], ...] = (
+    ("lines_loose", LINES_LOOSE),
+)
+# Re-probes after the lock are a layout change, not the norm: stop paying
+# for them once a document has used up this many
+MAX_REPROBES = 3
+
+_DATE_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}")
+
+
+def has_dated_text(page: Any) -> bool:
+    """True if the page's character stream contains a DD.MM.YYYY date.
+
+    Joins the raw chars instead of running layout-aware ``extract_text``,
+    which is enough to tell a statement page from a cover or summary page.
+    """
+    return bool(_DATE_RE.search("".join(c["text"] for c in page.chars)))
+
+
+class TableStrategy:
+    """Chooses table settings once per document and reuses them per page.
+
+    ``is_data`` decides whether the tables extracted from a page contain
+    transaction rows; it defaults to "any table at all". ``has_data`` is the
+    cheap text-level check that gates re-probes and fallback settings.
+    """
+
+    def __init__(
+        self,
+        parser: str,
+        is_data: Callable[[list[Table]], bool] = bool,
+        candidates: tuple[tuple[str, dict[str, Any]], ...] = CANDIDATES,
+        fallbacks: tuple[tuple[str, dict[str, Any]], ...] = FALLBACKS,
+        has_data: Callable[[Any], bool] = has_dated_text,
+        max_reprobes: int = MAX_REPROBES,
+    ) -> None:
+        self.parser = parser
+        self.current: Optional[str] = None
+        self.reprobes = 0
+        self._is_data = is_data
+        self._has_data = has_data
+        self._candidates = candidates
+        self._fallbacks = fallbacks
+        self._max_reprobes = max_reprobes
+        self._settings = dict(candidates + fallbacks)
+
+    def extract(self, page: Any) -> list[Table]:
+        """Extract tables from a page with the document's chosen settings."""
+        if self.current is None:
+            return self._probe(page) or []
+
+        tables = page.extract_tables(table_settings=self._settings[self.current])
+        if self._is_data(tables):
+            return tables
+
+        # The locked strategy stopped producing rows. Only a page that still
+        # holds dated lines means the layout changed; anything else is a
+        # cover, summary or signature page and not worth more extractions.
+        if self.reprobes >= self._max_reprobes or not self._has_data(page):
+            return tables
+        self.reprobes += 1
+        metrics.incr("table_strategy.reprobe", parser=self.parser)
+        found = self._probe(page, skip=self.current, known_data=True)
+        return found if found is not None else tables
+
+    def _probe(
+        self, page: Any, skip: Optional[str] = None, known_data: bool = False,
+    ) -> Optional[list[Table]]:
+        metrics.incr("table_strategy.probe", parser=self.parser)
+        found = self._try(page, self._candidates, skip)
+        if found is None and self._fallbacks and (known_data or self._has_data(page)):
+            found = self._try(page, self._fallbacks, skip)
+        return found
+
+    def _try(
+        self, page: Any, candidates: tuple[tuple[str, dict[str, Any]], ...],
+        skip: Optional[str],
+    ) -> Optional[list[Table]]:
+        for name, settings in candidates:
+            if name == skip:
+                continue
+            tables = page.extract_tables(table_settings=settings)
+            if self._is_data(tables):
+                if self.current is not None:
+                    metrics.incr("table_strategy.switch", parser=self.parser, strategy=name)
+                self.current = name
+                metrics.incr("table_strategy.selected", parser=self.parser, strategy=name)
+                return tables
+        return None
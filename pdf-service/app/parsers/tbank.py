@@ -6,32 +6,52 @@ Typical columns: Дата операции, Дата платежа, Номер
 Alternative format: Дата, Операция, Сумма, Остаток.
 
 Falls back to text-based row parsing (like ZFBirdy bot) if header-based
-extraction returns 0 transactions.
+extraction returns 0 transactions, or rows that fail post-parse validation.
 """
 
 import re
-import pdfplumber
-from io import BytesIO
 from typing import Any, Optional
 
-from .utils import normalize_amount, parse_date, parse_time, clean_text
+from .. import tracing
+from .headers import UNSET, HeaderClassifier, HeaderRule
+from .memo import memoize
+from .pages import DateWindow, PageSelection, select_pages, windowed
+from .prefilter import prefiltered
+from .records import Transaction
+from .tables import TableStrategy
+from .utils import normalize_amount, parse_date, parse_time, clean_text, PdfSource, open_pdf
+from .validation import choose
 
 NBSP = "\u00a0"
 _DATE_RE = re.compile(r"\b(\d{2}\.\d{2}\.\d{4})\b")
 _TIME_RE = re.compile(r"\b(\d{2}:\d{2})(?::(\d{2}))?\b")
-_AMOUNT_RE = re.compile(r"([+-])\s*([\d\s]+(?:[.,]\s*\d(?:\s*\d)?)?)\s*₽")
+# Possessive, digit-first amount: backtracking over a long run of spaces
+# and digits with no ₽ after it would otherwise be cubic
+_AMOUNT_RE = re.compile(r"([+-])\s*+(\d[\d\s]*+(?:[.,]\s*\d(?:\s*\d)?)?)\s*₽")
 _SERVICE_RE = re.compile(
     r"^(Пополнения:|Расходы:|Итого|Исходящий остаток|С уважением|Руководитель)", re.I
 )
 
 
-def parse_tbank(pdf_bytes: bytes) -> dict[str, Any]:
-    """Parse a T-Bank card/checking PDF statement."""
-    transactions: list[dict[str, Any]] = []
+def parse_tbank(pdf_bytes: PdfSource, window: Optional[DateWindow] = None) -> dict[str, Any]:
+    """Parse a T-Bank card/checking PDF statement.
+
+    With a date window, only the pages that can hold rows inside it are
+    parsed (see ``pages.select_pages``); rows are filtered by the caller.
+    """
+    transactions: list[Transaction] = []
     card_code = None
 
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
+    with open_pdf(pdf_bytes) as pdf:
+        selection = select_pages(pdf.pages, window, "tbank")
+        headers = HEADERS.document()
+        if selection.start or not selection.stop:
+            # The card code is printed on the first page, outside the window
+            # (or the window is empty)
+            for page in tracing.pages(windowed(pdf.pages[:1]), "tbank.account"):
+                card_code = _extract_card_code(page.extract_text() or "")
+        pages = pdf.pages[selection.start:selection.stop]
+        for page in tracing.pages(prefiltered(windowed(pages), "tbank"), "tbank", selection.start):
             # Extract card code from text
             if not card_code:
                 text = page.extract_text() or ""
@@ -39,14 +59,11 @@ def parse_tbank(pdf_bytes: bytes) -> dict[str, Any]:
 
             tables = page.extract_tables()
             for table in tables:
-                if not table or len(table) < 2:
-                    continue
-
-                header = _normalize_header(table[0])
+                header, rows = headers.split(table)
                 if not header:
                     continue
 
-                for row in table[1:]:
+                for row in rows:
                     if not row or len(row) < len(header):
                         continue
 
@@ -60,13 +77,15 @@ def parse_tbank(pdf_bytes: bytes) -> dict[str, Any]:
                     if tx:
                         transactions.append(tx)
 
-    # Fallback: text-based parsing if header-based found nothing
-    if not transactions:
-        transactions = _parse_text_based(pdf_bytes)
+    # Text-based fallback if the tables gave no rows, or rows that fail
+    # validation (see validation.choose)
+    transactions, report = choose("tbank", transactions, lambda: _parse_text_based(pdf_bytes, selection))
 
     return {
         "transactions": transactions,
         "account_identifier": card_code,
+        "pages_skipped": selection.skipped,
+        "validation": report.to_dict() if report else None,
     }
 
 
@@ -91,21 +110,32 @@ def _parse_amount_tbank(txt: str) -> tuple[Optional[str], Optional[float]]:
     return sign, val
 
 
+_PURPOSE_DATE_RE = re.compile(r"\b\d{2}\.\d{2}\.\d{4}\b")
+_PURPOSE_TIME_RE = re.compile(r"\b\d{2}:\d{2}(?::\d{2})?\b")
+_CARD_NUMBER_RE = re.compile(r"\bНомер карты\b\s*\d{3,}", re.I)
+_PHONE_RE = re.compile(r"по\s+номеру\s+телефона\s*(\+?\d[\d\s\-]{6,})", re.I)
+_CONTRACT_RE = re.compile(r"договор\s+(\d+)", re.I)
+_ACCOUNT_RE = re.compile(r"сч[её]т\s+(\d+)", re.I)
+_WS_RE = re.compile(r"\s+")
+
+
+@memoize("tbank.clean_purpose")
 def _clean_purpose_tbank(s: str) -> str:
-    s = re.sub(r"\b\d{2}\.\d{2}\.\d{4}\b", "", s)
-    s = re.sub(r"\b\d{2}:\d{2}(?::\d{2})?\b", "", s)
-    s = re.sub(r"\bНомер карты\b\s*\d{3,}", "", s, flags=re.I)
+    s = _PURPOSE_DATE_RE.sub("", s)
+    s = _PURPOSE_TIME_RE.sub("", s)
+    s = _CARD_NUMBER_RE.sub("", s)
     return _norm(s)
 
 
+@memoize("tbank.counterparty")
 def _counterparty_from_desc(purpose: str) -> Optional[str]:
-    m = re.search(r"по\s+номеру\s+телефона\s*(\+?\d[\d\s\-]{6,})", purpose, flags=re.I)
+    m = _PHONE_RE.search(purpose)
     if m:
-        return re.sub(r"\s+", "", m.group(1))
-    m = re.search(r"договор\s+(\d+)", purpose, flags=re.I)
+        return _WS_RE.sub("", m.group(1))
+    m = _CONTRACT_RE.search(purpose)
     if m:
         return f"Договор {m.group(1)}"
-    m = re.search(r"сч[её]т\s+(\d+)", purpose, flags=re.I)
+    m = _ACCOUNT_RE.search(purpose)
     if m:
         return f"Счёт {m.group(1)}"
     if "Проценты на остаток" in purpose:
@@ -113,43 +143,47 @@ def _counterparty_from_desc(purpose: str) -> Optional[str]:
     return None
 
 
-def _parse_text_based(pdf_bytes: bytes) -> list[dict[str, Any]]:
+def _parse_text_based(pdf_bytes: PdfSource, selection: Optional[PageSelection] = None) -> list[Transaction]:
     """Parse T-Bank statement by joining table cells into text lines
     and extracting date + amount with ₽ sign via regex."""
     all_tables: list[list[list[str]]] = []
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables(
-                table_settings={"vertical_strategy": "lines", "horizontal_strategy": "lines"}
-            )
-            if not tables:
-                tables = page.extract_tables(
-                    table_settings={"vertical_strategy": "text", "horizontal_strategy": "text"}
-                )
-            for t in (tables or []):
+    with open_pdf(pdf_bytes) as pdf:
+        strategy = TableStrategy("tbank_text", is_data=_has_dated_rows)
+        first = 0 if selection is None else selection.start
+        pages = pdf.pages if selection is None else pdf.pages[first:selection.stop]
+        for page in tracing.pages(prefiltered(windowed(pages), "tbank"), "tbank.text", first):
+            tables = strategy.extract(page)
+            for t in tables:
                 all_tables.append(t)
 
     ops = _parse_tables_to_ops(all_tables)
-    transactions: list[dict[str, Any]] = []
+    transactions: list[Transaction] = []
 
     for date_ru, time_str, sign, amount, purpose in ops:
         dt = parse_date(date_ru)
         if not dt:
             continue
         counterparty = _counterparty_from_desc(purpose)
-        transactions.append({
-            "date": dt.isoformat(),
-            "time": time_str,
-            "amount": str(amount),
-            "direction": "income" if sign == "+" else "expense",
-            "counterparty": counterparty,
-            "purpose": purpose if purpose else None,
-            "balance": None,
-        })
+        transactions.append(Transaction(
+            date=dt,
+            time=time_str,
+            amount=amount,
+            direction="income" if sign == "+" else "expense",
+            counterparty=counterparty,
+            purpose=purpose if purpose else None,
+        ))
 
     return transactions
 
 
+def _has_dated_rows(tables: list[list[list[str]]]) -> bool:
+    """True if any table row contains a DD.MM.YYYY date."""
+    return any(
+        _DATE_RE.search(" ".join(c or "" for c in row))
+        for t in tables for row in t
+    )
+
+
 def _parse_tables_to_ops(
     all_tables: list[list[list[str]]],
 ) -> list[tuple[str, str, str, float, str]]:
@@ -211,49 +245,28 @@ def _extract_card_code(text: str) -> str | None:
     return None
 
 
-def _normalize_header(row: list[str | None]) -> dict[str, int] | None:
-    """Map column names to indices."""
-    if not row:
-        return None
-
-    mapping: dict[str, int] = {}
-    for i, cell in enumerate(row):
-        if not cell:
-            continue
-        cell_lower = cell.strip().lower().replace('\n', ' ')
-
-        if 'дата операц' in cell_lower or (cell_lower == 'дата' and 'date' not in mapping):
-            mapping['date'] = i
-        elif 'дата платеж' in cell_lower or 'дата списан' in cell_lower:
-            mapping['date_posted'] = i
-        elif 'сумма операц' in cell_lower or ('сумма' in cell_lower and 'amount' not in mapping):
-            mapping['amount'] = i
-        elif 'сумма платеж' in cell_lower:
-            mapping['payment_amount'] = i
-        elif 'описание' in cell_lower or 'операция' in cell_lower or 'назначение' in cell_lower:
-            mapping['description'] = i
-        elif 'категория' in cell_lower:
-            mapping['category'] = i
-        elif 'остаток' in cell_lower:
-            mapping['balance'] = i
-        elif 'статус' in cell_lower:
-            mapping['status'] = i
-        elif 'номер карты' in cell_lower or 'карта' in cell_lower:
-            mapping['card_number'] = i
-        elif 'mcc' in cell_lower:
-            mapping['mcc'] = i
-        elif 'кэшбэк' in cell_lower or 'cashback' in cell_lower:
-            mapping['cashback'] = i
-
-    if 'date' not in mapping:
-        return None
-    if 'amount' not in mapping and 'payment_amount' not in mapping:
-        return None
-
-    return mapping
+HEADERS = HeaderClassifier(
+    "tbank",
+    [
+        HeaderRule("date", ("дата операц",)),
+        HeaderRule("date", ("дата",), UNSET, exact=True),
+        HeaderRule("date_posted", ("дата платеж", "дата списан")),
+        HeaderRule("amount", ("сумма операц",)),
+        HeaderRule("amount", ("сумма",), UNSET),
+        HeaderRule("payment_amount", ("сумма платеж",)),
+        HeaderRule("description", ("описание", "операция", "назначение")),
+        HeaderRule("category", ("категория",)),
+        HeaderRule("balance", ("остаток",)),
+        HeaderRule("status", ("статус",)),
+        HeaderRule("card_number", ("номер карты", "карта")),
+        HeaderRule("mcc", ("mcc",)),
+        HeaderRule("cashback", ("кэшбэк", "cashback")),
+    ],
+    required=[("date",), ("amount", "payment_amount")],
+)
 
 
-def _parse_row(header: dict[str, int], row: list[str | None]) -> dict[str, Any] | None:
+def _parse_row(header: dict[str, int], row: list[str | None]) -> Transaction | None:
     """Parse a single table row."""
     date_raw = row[header['date']] if 'date' in header else None
     dt = parse_date(date_raw)
@@ -289,12 +302,12 @@ def _parse_row(header: dict[str, int], row: list[str | None]) -> dict[str, Any]
     counterparty = description
     purpose = category
 
-    return {
-        "date": dt.isoformat(),
-        "time": time_str,
-        "amount": str(amount),
-        "direction": direction,
-        "counterparty": counterparty,
-        "purpose": purpose,
-        "balance": str(balance) if balance is not None else None,
-    }
+    return Transaction(
+        date=dt,
+        time=time_str,
+        amount=amount,
+        direction=direction,
+        counterparty=counterparty,
+        purpose=purpose,
+        balance=balance,
+    )
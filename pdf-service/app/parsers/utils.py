@@ -3,7 +3,33 @@
 import re
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
-from typing import Optional
+from io import BytesIO
+from typing import IO, Optional, Union
+
+import pdfplumber
+
+from .. import settings
+from .fonts import CachingResourceManager
+from .memo import memoize
+
+# A document in memory, or a seekable read-only stream over it (a spool
+# file map in the workers)
+PdfSource = Union[bytes, IO[bytes]]
+
+_WS_RE = re.compile(r'\s+')
+
+
+def open_pdf(source: PdfSource) -> pdfplumber.PDF:
+    """Open a statement PDF; the caller keeps ownership of a stream.
+
+    Its fonts come from the process-wide cache (see parsers.fonts).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    pdf = pdfplumber.open(source)
+    if settings.FONT_CACHE_SIZE:
+        pdf.rsrcmgr = CachingResourceManager()
+    return pdf
 
 
 def normalize_amount(raw: Optional[str]) -> Optional[Decimal]:
@@ -91,7 +117,12 @@ def clean_text(raw: Optional[str]) -> Optional[str]:
     """Normalize whitespace in text."""
     if not raw:
         return None
-    s = re.sub(r'\s+', ' ', raw.strip())
+    return _clean_text(raw)
+
+
+@memoize("clean_text")
+def _clean_text(raw: str) -> Optional[str]:
+    s = _WS_RE.sub(' ', raw.strip())
     return s if s else None
 
 
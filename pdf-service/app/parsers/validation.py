@@ -0,0 +1,170 @@
+"""Post-parse validation of a statement's rows.
+
+The rows are loaded into one pandas frame and checked column-wise, with no
+per-row Python code:
+
+- balance chain: where rows carry the balance after the operation, each
+  balance must follow from the previous one and the signed amounts in
+  between. Statements list rows either oldest or newest first, so both
+  orders are tried and the better one kept. A break means a row was missed
+  or misread (a gap).
+- duplicates: rows identical in every field.
+- date order: dates going against the statement's order.
+
+The result is a confidence score in [0, 1]. A parser keeps its primary
+(table) rows when they score well, and tries its text fallback when they
+score below ``settings.VALIDATION_FALLBACK_BELOW`` (see ``choose``).
+
+pandas is optional: without it, or with ``PDF_VALIDATION=0``, ``validate``
+returns None and parsers fall back only when the tables gave no rows. It is
+imported on the first ``validate`` call, so only the worker processes load
+it; the API process imports this module through the parsers but never
+validates.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+
+from .. import settings
+from ..metrics import metrics
+from .records import Transaction
+
+# Bound by _load_pandas on first use
+np = pd = None
+_pandas_available: Optional[bool] = None
+
+# Score weights; a check with nothing to check is left out
+_WEIGHTS = {"balance": 0.6, "order": 0.25, "duplicates": 0.15}
+# A check scores 1 - _PENALTY * (share of rows failing it), at least 0:
+# problems on a fifth of the rows zero it
+_PENALTY = 5
+
+
+@dataclass(frozen=True)
+class Validation:
+    rows: int
+    # Consecutive pairs of rows with a balance, and how many reconcile
+    balance_pairs: int
+    balance_ok: int
+    gaps: int
+    duplicates: int
+    out_of_order: int
+    # "ascending" (oldest first), "descending" or None when undecided
+    order: Optional[str]
+    score: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _load_pandas() -> bool:
+    global np, pd, _pandas_available
+    if _pandas_available is None:
+        try:
+            import numpy as np
+            import pandas as pd
+        except ImportError:  # optional dependency
+            _pandas_available = False
+        else:
+            _pandas_available = True
+    return _pandas_available
+
+
+def preload() -> None:
+    """Import pandas now rather than in the first job (worker initializer)."""
+    if settings.VALIDATION:
+        _load_pandas()
+
+
+def _kopecks(values: "pd.Series") -> "np.ndarray":
+    """Decimal/float/str amounts → whole kopecks, as floats (NaN where missing)."""
+    return (pd.to_numeric(values.astype(str), errors="coerce") * 100).round().to_numpy()
+
+
+def validate(transactions: list[Transaction]) -> Optional[Validation]:
+    """Check the rows of one statement, in document order."""
+    if not settings.VALIDATION or not _load_pandas():
+        return None
+    n = len(transactions)
+    if not n:
+        return Validation(0, 0, 0, 0, 0, 0, None, 0.0)
+
+    frame = pd.DataFrame.from_records(
+        [(tx.date.toordinal(), tx.time, tx.amount, tx.direction, tx.counterparty, tx.purpose, tx.balance)
+         for tx in transactions],
+        columns=["date", "time", "amount", "direction", "counterparty", "purpose", "balance"],
+    )
+    amount = _kopecks(frame["amount"])
+    signed = np.where(frame["direction"].to_numpy() == "income", amount, -amount)
+    balance = _kopecks(frame["balance"])
+
+    # Balance chain. Oldest first, balance - (running sum of amounts) is the
+    # opening balance on every row; newest first, balance + (running sum of
+    # the amounts before the row) is the closing balance. Compare it between
+    # consecutive rows that have a balance.
+    # Share of failing rows per check
+    failing: dict[str, float] = {}
+    running = np.nancumsum(signed)
+    has_balance = ~np.isnan(balance)
+    pairs = ok = 0
+    order = None
+    if has_balance.sum() >= 2:
+        ascending = np.abs(np.diff((balance - running)[has_balance])) < 0.5
+        descending = np.abs(np.diff((balance + running - signed)[has_balance])) < 0.5
+        pairs = len(ascending)
+        if ascending.sum() >= descending.sum():
+            ok, order = int(ascending.sum()), "ascending"
+        else:
+            ok, order = int(descending.sum()), "descending"
+        failing["balance"] = (pairs - ok) / pairs
+
+    steps = np.diff(frame["date"].to_numpy())
+    back, forward = int((steps < 0).sum()), int((steps > 0).sum())
+    if order is None and (back or forward):
+        order = "ascending" if forward >= back else "descending"
+    out_of_order = back if order == "ascending" else forward if order == "descending" else 0
+    if n > 1:
+        failing["order"] = out_of_order / (n - 1)
+
+    duplicates = int(frame.astype(str).duplicated().sum())
+    failing["duplicates"] = duplicates / n
+
+    weight = sum(_WEIGHTS[k] for k in failing)
+    score = sum(_WEIGHTS[k] * max(0.0, 1 - _PENALTY * v) for k, v in failing.items()) / weight
+    return Validation(
+        rows=n,
+        balance_pairs=pairs,
+        balance_ok=ok,
+        gaps=pairs - ok,
+        duplicates=duplicates,
+        out_of_order=out_of_order,
+        order=order,
+        score=round(score, 4),
+    )
+
+
+def choose(
+    parser: str,
+    primary: list[Transaction],
+    fallback: Callable[[], list[Transaction]],
+) -> tuple[list[Transaction], Optional[Validation]]:
+    """The primary rows, unless they are empty or score low.
+
+    Then the fallback runs and its rows are kept if they score better.
+    Without validation, only empty primary rows trigger the fallback.
+    """
+    report = validate(primary) if primary else None
+    if primary and (report is None or report.score >= settings.VALIDATION_FALLBACK_BELOW):
+        outcome = "accepted"
+    else:
+        alternative = fallback()
+        alt_report = validate(alternative)
+        if not primary or (alt_report is not None and alt_report.score > report.score):
+            primary, report = alternative, alt_report
+            outcome = "fallback"
+        else:
+            outcome = "fallback_rejected"
+    metrics.incr("validation.outcome", parser=parser, outcome=outcome)
+    if report is not None:
+        metrics.observe("validation.score", report.score, parser=parser)
+    return primary, report
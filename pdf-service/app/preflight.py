@@ -0,0 +1,288 @@
+"""Preflight inspection of uploaded PDFs.
+
+Scanned statements carry only page images. Every table and text strategy
+in the parsers would run over them before returning zero rows. The
+preflight reads only the document structure: the trailer, the page tree
+and the font resources of a few sample pages. It decides up front whether
+a document can be parsed at all.
+
+``read_structure`` is cheap enough to run on every /parse request. It
+also counts the chars the sample pages show, so ``estimate_memory`` can
+price a parse before it starts. ``inspect_document`` adds the first
+page's text to suggest a bank, plus a parse cost estimate, for the
+/inspect endpoint.
+"""
+
+import re
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Optional
+
+import pdfplumber
+from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1, stream_value
+from pdfminer.psparser import LIT
+
+from . import settings
+from .admission import AdmissionError, DocumentSize, choose_lane
+
+# Sampled pages: first, middle and last
+SAMPLE_PAGES = 3
+# Form XObjects nested deeper than this are not searched for fonts
+_MAX_FORM_DEPTH = 3
+
+# Page tree nodes deeper than this are not followed
+_MAX_TREE_DEPTH = 32
+
+_FORM = LIT("Form")
+_PAGE = LIT("Page")
+_PAGES = LIT("Pages")
+_TYPE0 = LIT("Type0")
+
+# Strings in a content stream: (literal) or <hex>, escapes in literals kept.
+# Possessive, so an unterminated string cannot make the scan backtrack.
+_LITERAL_RE = re.compile(rb"\((?:\\.|[^\\()])*+\)", re.S)
+_HEX_RE = re.compile(rb"(?<!<)<([0-9A-Fa-f\s]*+)>")
+
+# Top share of the first page searched for the bank name first: rows below
+# it often name other banks as counterparties
+_HEADER_SHARE = 0.2
+
+# Checked in order; the deposit layout carries the T-Bank name too, so it
+# comes first
+BANK_MARKERS: list[tuple[str, re.Pattern[str]]] = [
+    ("tbank_deposit", re.compile(r"выписка\s+по\s+вкладу", re.I)),
+    ("tbank", re.compile(r"т-?банк|тинькофф", re.I)),
+    ("ozon", re.compile(r"озон\s*банк|ozon\s*bank", re.I)),
+    ("sber", re.compile(r"сбербанк|сбер\s*бизнес", re.I)),
+]
+
+# Parse seconds per page on one core, measured on the bench.fixtures
+# statements; the text fallbacks take about twice as long
+SECONDS_PER_PAGE = {
+    "sber": 0.3,
+    "tbank": 0.25,
+    "tbank_deposit": 0.2,
+    "ozon": 0.25,
+}
+
+
+# Parse memory model, measured on the bench.fixtures statements with
+# PAGES_IN_MEMORY from 1 to 16 pages (see estimate_memory)
+_PARSE_BASE = 16 * 2**20
+_BYTES_PER_CHAR = 2048
+_BYTES_PER_FILE_BYTE = 8
+# Chars per page assumed when the sample pages could not be counted
+_DEFAULT_CHARS_PER_PAGE = 4000
+
+
+@dataclass(frozen=True)
+class Structure:
+    size: DocumentSize
+    encrypted: bool
+    password_required: bool
+    text_layer: bool
+    sampled_pages: int
+    # Chars shown per sampled page with a text layer, on average; 0 if unknown
+    chars_per_page: int = 0
+
+    @property
+    def problem(self) -> Optional[str]:
+        """Why the document cannot be parsed, or None."""
+        if self.password_required:
+            return "PDF is password-protected"
+        if self.size.pages and not self.text_layer:
+            return "PDF has no text layer (scanned image?); OCR is not supported"
+        return None
+
+
+def _has_fonts(resources: Any, depth: int = 0) -> bool:
+    resources = resolve1(resources)
+    if not isinstance(resources, dict):
+        return False
+    if resolve1(resources.get("Font")):
+        return True
+    if depth >= _MAX_FORM_DEPTH:
+        return False
+    # Some generators draw the whole page from a form XObject
+    xobjects = resolve1(resources.get("XObject"))
+    if isinstance(xobjects, dict):
+        for ref in xobjects.values():
+            xobj = resolve1(ref)
+            attrs = getattr(xobj, "attrs", None)
+            if attrs and attrs.get("Subtype") is _FORM and _has_fonts(attrs.get("Resources"), depth + 1):
+                return True
+    return False
+
+
+def _sample_indices(count: int) -> set[int]:
+    if count <= SAMPLE_PAGES:
+        return set(range(count))
+    return {round(i * (count - 1) / (SAMPLE_PAGES - 1)) for i in range(SAMPLE_PAGES)}
+
+
+def _page_at(doc: PDFDocument, index: int) -> Optional[PDFPage]:
+    """Page ``index``, found by descending the page tree by each node's /Count.
+
+    Walking all pages to reach the last costs a few ms per hundred pages;
+    the descent reads only the nodes on the way. None if the tree is
+    malformed.
+    """
+    ref: Any = doc.catalog.get("Pages")
+    inherited: dict[Any, Any] = {}
+    for _ in range(_MAX_TREE_DEPTH):
+        node = resolve1(ref)
+        if not isinstance(node, dict):
+            return None
+        inherited.update((k, v) for k, v in node.items() if k in PDFPage.INHERITABLE_ATTRS)
+        if node.get("Type") is _PAGE:
+            return PDFPage(doc, getattr(ref, "objid", None), {**inherited, **node}, None)
+        kids = resolve1(node.get("Kids")) or []
+        if resolve1(node.get("Count")) == len(kids) and index < len(kids):
+            # Only leaves below: no need to read the kids before this one
+            ref = kids[index]
+            continue
+        for kid in kids:
+            kid_node = resolve1(kid)
+            pages = resolve1(kid_node.get("Count", 1)) if isinstance(kid_node, dict) and (
+                kid_node.get("Type") is _PAGES) else 1
+            if not isinstance(pages, int):
+                return None
+            if index < pages:
+                ref = kid
+                break
+            index -= pages
+        else:
+            return None
+    return None
+
+
+def _count_chars(page: PDFPage) -> int:
+    """Chars a page shows, counted from the strings in its content streams.
+
+    Form XObjects the page draws are counted too. Codes of Type0
+    (composite) fonts usually take two bytes; a page that mixes them with
+    simple fonts is counted at one byte per char.
+    """
+    resources = resolve1(page.resources)
+    resources = resources if isinstance(resources, dict) else {}
+    fonts = resolve1(resources.get("Font"))
+    subtypes = [resolve1(f).get("Subtype") for f in fonts.values()] if isinstance(fonts, dict) else []
+    code_bytes = 2 if subtypes and all(t is _TYPE0 for t in subtypes) else 1
+
+    streams = list(page.contents)
+    xobjects = resolve1(resources.get("XObject"))
+    if isinstance(xobjects, dict):
+        for ref in xobjects.values():
+            xobj = resolve1(ref)
+            attrs = getattr(xobj, "attrs", None)
+            if attrs and attrs.get("Subtype") is _FORM:
+                streams.append(xobj)
+
+    total = 0
+    for stream in streams:
+        data = stream_value(stream).get_data()
+        for m in _LITERAL_RE.finditer(data):
+            # Less the parentheses and one byte per escape
+            total += len(m.group()) - 2 - m.group().count(b"\\")
+        for m in _HEX_RE.finditer(data):
+            total += len(m.group(1).translate(None, b" \t\r\n\f")) // 2
+    return total // code_bytes
+
+
+def read_structure(pdf_bytes: bytes) -> Structure:
+    """Page count, encryption, text-layer presence and text density, without any layout work."""
+    size = len(pdf_bytes)
+    try:
+        doc = PDFDocument(PDFParser(BytesIO(pdf_bytes)))
+    except PDFPasswordIncorrect:
+        return Structure(DocumentSize(0, size), True, True, False, 0)
+    except Exception as e:
+        raise AdmissionError(400, f"Not a readable PDF: {e}")
+
+    try:
+        count = resolve1(resolve1(doc.catalog["Pages"]).get("Count", 0))
+        count = count if isinstance(count, int) else 0
+        wanted = sorted(_sample_indices(count))
+        pages = [_page_at(doc, i) for i in wanted]
+        if None in pages:
+            # Malformed page tree: walk it in order, as pdfminer does
+            pages = [page for i, page in enumerate(PDFPage.create_pages(doc)) if i in wanted]
+        text_layer = False
+        chars: list[int] = []
+        for page in pages:
+            if _has_fonts(page.resources):
+                text_layer = True
+                try:
+                    chars.append(_count_chars(page))
+                except Exception:
+                    pass  # a filter pdfminer cannot decode: density unknown
+        sampled = len(pages)
+    except Exception as e:
+        raise AdmissionError(400, f"Not a readable PDF: {e}")
+
+    return Structure(
+        DocumentSize(count, size), doc.encryption is not None, False, text_layer, sampled,
+        sum(chars) // len(chars) if chars else 0,
+    )
+
+
+def _match_bank(text: str) -> Optional[str]:
+    for bank_code, marker in BANK_MARKERS:
+        if marker.search(text):
+            return bank_code
+    return None
+
+
+def suggest_bank(first_page: Any) -> Optional[str]:
+    """PARSERS key for a statement from its first page (a pdfplumber page)."""
+    header = first_page.crop((0, 0, first_page.width, first_page.height * _HEADER_SHARE))
+    return _match_bank(header.extract_text() or "") or _match_bank(first_page.extract_text() or "")
+
+
+def estimate_seconds(pages: int, bank_code: Optional[str]) -> float:
+    per_page = SECONDS_PER_PAGE.get(bank_code or "", max(SECONDS_PER_PAGE.values()))
+    return round(pages * per_page, 1)
+
+
+def estimate_memory(size: DocumentSize, chars_per_page: int = 0) -> int:
+    """Peak parse memory of a document in a worker, in bytes.
+
+    pdfplumber holds the chars of the pages it has laid out, about
+    ``_BYTES_PER_CHAR`` each, for at most ``settings.PAGES_IN_MEMORY``
+    pages at a time (``parsers.pages.windowed``). The document and its rows
+    take about ``_BYTES_PER_FILE_BYTE`` times the file size.
+    """
+    window = min(size.pages, settings.PAGES_IN_MEMORY)
+    chars = chars_per_page or _DEFAULT_CHARS_PER_PAGE
+    return _PARSE_BASE + _BYTES_PER_FILE_BYTE * size.size + window * chars * _BYTES_PER_CHAR
+
+
+def inspect_document(pdf_bytes: bytes, bank_code: Optional[str] = None) -> dict[str, Any]:
+    """Structure, suggested bank and parse cost estimate of a PDF.
+
+    Reads the first page's text layer only; ``bank_code``, when given,
+    overrides the suggestion for the cost estimate.
+    """
+    structure = read_structure(pdf_bytes)
+    suggested = None
+    if structure.problem is None and structure.size.pages:
+        with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+            suggested = suggest_bank(pdf.pages[0])
+
+    pages = structure.size.pages
+    return {
+        "pages": pages,
+        "size": structure.size.size,
+        "encrypted": structure.encrypted,
+        "password_required": structure.password_required,
+        "text_layer": structure.text_layer,
+        "parseable": structure.problem is None,
+        "problem": structure.problem,
+        "suggested_bank": suggested,
+        "estimated_seconds": estimate_seconds(pages, bank_code or suggested),
+        "estimated_memory_mb": round(estimate_memory(structure.size, structure.chars_per_page) / 2**20, 1),
+        "lane": choose_lane(structure.size),
+    }
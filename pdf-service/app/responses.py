@@ -0,0 +1,84 @@
+"""JSON serialization and content-encoding negotiation for parse responses.
+
+Bodies are serialized with orjson and compressed with zstd or gzip when
+the client accepts it and the body is above ``COMPRESS_MIN_BYTES``.
+zstd is used only if the optional ``zstandard`` package is installed.
+"""
+
+import gzip
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import Response
+
+from . import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick "zstd" or "gzip" from an Accept-Encoding header, or None for identity.
+
+    The coding with the highest q-value wins; server preference (zstd over
+    gzip) only breaks ties.
+    """
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    # Listed in server preference order so max() keeps the first on ties
+    available = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+    best = max(available, key=lambda coding: accepted.get(coding, wildcard))
+    if accepted.get(best, wildcard) > 0:
+        return best
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+
+def json_response(
+    content: Any,
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """Serialize ``content`` with orjson and compress it if negotiated."""
+    body = orjson.dumps(content)
+    out_headers = {"Vary": "Accept-Encoding", **(headers or {})}
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding and len(body) >= settings.COMPRESS_MIN_BYTES:
+        body = compress(body, encoding)
+        out_headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        headers=out_headers,
+        media_type="application/json",
+    )
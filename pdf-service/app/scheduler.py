@@ -0,0 +1,241 @@
+"""Tenant-fair scheduling of parse jobs onto a worker process pool.
+
+Each tenant (company) has its own FIFO queue. Free workers take jobs from
+the tenants in round-robin order, and no tenant may hold more than
+``tenant_cap`` workers at once. A company uploading a stack of long
+statements therefore cannot starve other tenants' small uploads. Jobs
+submitted with the same ``group`` (the sections of one document) share a
+single slot of the cap: they run side by side on workers no other
+tenant's job is waiting for. With a
+``MemoryBudget`` shared by the lanes, a job also waits until its estimated
+parse memory fits in the budget (see app.budget).
+
+Background jobs (shadow runs, see app.shadow) have the lowest priority:
+one starts only when no tenant job is waiting, and never takes the last
+free worker of a lane that has more than one.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Hashable, Optional
+
+from . import tracing
+from .budget import MemoryBudget
+from .metrics import metrics
+from .worker import init_worker, ping
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+# Tenant label of background jobs, in metrics
+BACKGROUND = "background"
+
+
+class _Job:
+    __slots__ = ("tenant", "fn", "args", "future", "enqueued", "span", "cost", "deferred", "group")
+
+    def __init__(self, tenant: str, fn: Callable[..., Any], args: tuple, future: asyncio.Future,
+                 cost: int = 0, group: Optional[Hashable] = None) -> None:
+        self.tenant = tenant
+        # Jobs of one group hold one tenant slot between them
+        self.group = group if group is not None else self
+        self.fn = fn
+        self.args = args
+        self.future = future
+        # Bytes reserved in the memory budget while the job runs
+        self.cost = cost
+        # Held back at least once for lack of budget
+        self.deferred = False
+        self.enqueued = time.monotonic()
+        # Span of the traced request that submitted the job, if any
+        self.span = tracing.current() if tenant != BACKGROUND else None
+
+
+class FairScheduler:
+    """Round-robin across tenants with a per-tenant concurrency cap."""
+
+    def __init__(self, name: str, workers: int, tenant_cap: int, budget: Optional[MemoryBudget] = None) -> None:
+        self.name = name
+        self.workers = workers
+        self.tenant_cap = tenant_cap
+        self.in_flight = 0
+        self.budget = budget
+        if budget is not None:
+            # Memory freed by any lane may let a held-back job start here
+            budget.subscribe(self._dispatch)
+        # Pages of the submitted jobs not finished yet, queued ones included
+        self.pages = 0
+        # Every worker process has been started and has imported the parsers
+        self.warm = False
+        self._executor = self._new_executor()
+        # Tenants with pending jobs, in round-robin order
+        self._queues: OrderedDict[str, deque[_Job]] = OrderedDict()
+        self._background: deque[_Job] = deque()
+        # Tenant slots held, and the running jobs of each group holding one
+        self._running: dict[str, int] = {}
+        self._groups: dict[Hashable, int] = {}
+        self._reported: set[str] = set()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def submit(self, tenant: Optional[str], fn: Callable[..., Any], *args: Any, pages: int = 0,
+                     memory: int = 0, background: bool = False, group: Optional[Hashable] = None) -> Any:
+        """Queue ``fn(*args)`` for a tenant and wait for its result.
+
+        ``pages`` is the job's document size, counted in ``self.pages``
+        until the job ends. ``memory`` is its estimated parse memory in
+        bytes, reserved in the budget while it runs. A ``background`` job
+        belongs to no tenant and runs only when the lane has spare room.
+        Jobs of one ``group`` count once against the tenant's cap.
+        """
+        cost = self.budget.cost(memory) if self.budget is not None else 0
+        job = _Job(BACKGROUND if background else tenant or DEFAULT_TENANT, fn, args,
+                   asyncio.get_running_loop().create_future(), cost, group)
+        if background:
+            self._background.append(job)
+        else:
+            self._queues.setdefault(job.tenant, deque()).append(job)
+        self.pages += pages
+        self._dispatch()
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            self._discard(job)
+            raise
+        finally:
+            self.pages -= pages
+
+    async def warm_up(self) -> None:
+        """Start every worker process ahead of the first job."""
+        try:
+            # Submitted together, so the pool cannot reuse an idle worker
+            await asyncio.gather(*(
+                asyncio.wrap_future(self._executor.submit(ping)) for _ in range(self.workers)
+            ))
+        except Exception as e:
+            # The pool is replaced on the next job; do not hold readiness
+            log.warning("Warming up the %s lane failed: %s", self.name, e)
+        self.warm = True
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _next_job(self) -> Optional[_Job]:
+        # Jobs within their tenant's cap first; then jobs of a group that
+        # already holds a slot, on the workers left over
+        for joining in (False, True):
+            for tenant in list(self._queues):
+                head = self._queues[tenant][0]
+                if (self._running.get(tenant, 0) >= self.tenant_cap) != joining:
+                    continue
+                if joining and head.group not in self._groups:
+                    continue
+                if self.budget is not None and not self.budget.try_reserve(head.cost):
+                    # Later jobs would overtake it for as long as they fit:
+                    # start none until memory is released
+                    if not head.deferred:
+                        head.deferred = True
+                        metrics.incr("budget.deferred", lane=self.name)
+                    return None
+                queue = self._queues.pop(tenant)
+                job = queue.popleft()
+                if queue:
+                    # Back of the ring: the other tenants go first next time
+                    self._queues[tenant] = queue
+                return job
+        return self._next_background()
+
+    def _next_background(self) -> Optional[_Job]:
+        # Tenant jobs held back by their cap wait too: they go first
+        if not self._background or self._queues:
+            return None
+        if self.workers > 1 and self.in_flight >= self.workers - 1:
+            return None
+        if self.budget is not None and not self.budget.try_reserve(self._background[0].cost):
+            return None
+        return self._background.popleft()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.workers:
+            job = self._next_job()
+            if job is None:
+                break
+            self._start(job)
+        self._report()
+
+    def _start(self, job: _Job) -> None:
+        waited = time.monotonic() - job.enqueued
+        metrics.observe("scheduler.queue_wait_seconds", waited, lane=self.name, tenant=job.tenant)
+        tracing.record("queue", job.span, waited, lane=self.name, tenant=job.tenant)
+        self.in_flight += 1
+        if job.group not in self._groups:
+            self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+        self._groups[job.group] = self._groups.get(job.group, 0) + 1
+        try:
+            running = asyncio.wrap_future(self._executor.submit(job.fn, *job.args))
+        except BrokenProcessPool:
+            self._executor = self._new_executor()
+            running = asyncio.wrap_future(self._executor.submit(job.fn, *job.args))
+        executor = self._executor
+        running.add_done_callback(lambda f: self._finish(job, f, executor))
+
+    def _finish(self, job: _Job, done: asyncio.Future, executor: ProcessPoolExecutor) -> None:
+        self.in_flight -= 1
+        self._groups[job.group] -= 1
+        if not self._groups[job.group]:
+            del self._groups[job.group]
+            self._running[job.tenant] -= 1
+            if not self._running[job.tenant]:
+                del self._running[job.tenant]
+
+        if done.cancelled():
+            exc: Optional[BaseException] = asyncio.CancelledError()
+        else:
+            exc = done.exception()
+        if isinstance(exc, BrokenProcessPool) and executor is self._executor:
+            # A worker died (OOM kill, segfault): replace the pool for later jobs
+            metrics.incr("scheduler.pool_restarts", lane=self.name)
+            self._executor = self._new_executor()
+
+        if not job.future.done():
+            if exc is not None:
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(done.result())
+        if self.budget is not None:
+            self.budget.release(job.cost)
+        self._dispatch()
+
+    def _discard(self, job: _Job) -> None:
+        """Drop a job whose caller went away before it started."""
+        if job in self._background:
+            self._background.remove(job)
+            return
+        queue = self._queues.get(job.tenant)
+        if queue and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self._queues[job.tenant]
+            self._report()
+
+    def _report(self) -> None:
+        metrics.set_gauge("scheduler.in_flight", self.in_flight, lane=self.name)
+        metrics.set_gauge("scheduler.queue_depth", self.queue_depth, lane=self.name)
+        for tenant in self._reported | set(self._queues):
+            depth = len(self._queues.get(tenant, ()))
+            metrics.set_gauge("scheduler.tenant_queue_depth", depth, lane=self.name, tenant=tenant)
+        self._reported = set(self._queues)
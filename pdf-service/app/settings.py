@@ -0,0 +1,89 @@
+"""Runtime configuration for the PDF service, read from the environment."""
+
+import os
+import tempfile
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = _int("PDF_COMPRESS_MIN_BYTES", 1024)
+GZIP_LEVEL = _int("PDF_GZIP_LEVEL", 5)
+ZSTD_LEVEL = _int("PDF_ZSTD_LEVEL", 3)
+
+# Memory the deployment allows the service, worker processes included
+# (ecosystem.config.cjs passes it as PDF_MEMORY_LIMIT_MB). Idle, the API
+# process takes about 60 MB and each worker about 90 MB, pandas included.
+MEMORY_LIMIT_MB = _int("PDF_MEMORY_LIMIT_MB", 768)
+
+# Fast lane: parse worker processes and how many of them one tenant may hold
+WORKERS = _int("PDF_WORKERS", 2)
+TENANT_CONCURRENCY = _int("PDF_TENANT_CONCURRENCY", 1)
+FAST_LANE_MAX_QUEUE = _int("PDF_FAST_LANE_MAX_QUEUE", 100)
+
+# Slow lane: documents above either threshold get their own worker budget
+SLOW_LANE_PAGES = _int("PDF_SLOW_LANE_PAGES", 30)
+SLOW_LANE_BYTES = _int("PDF_SLOW_LANE_BYTES", 2 * 1024 * 1024)
+SLOW_WORKERS = _int("PDF_SLOW_WORKERS", 1)
+SLOW_TENANT_CONCURRENCY = _int("PDF_SLOW_TENANT_CONCURRENCY", 1)
+SLOW_LANE_MAX_QUEUE = _int("PDF_SLOW_LANE_MAX_QUEUE", 20)
+
+# Documents longer than this are rejected before any parsing
+MAX_PAGES = _int("PDF_MAX_PAGES", 500)
+
+# Parsers keep the layout of at most this many pages in memory at once
+# (parsers.pages.windowed)
+PAGES_IN_MEMORY = _int("PDF_PAGES_IN_MEMORY", 8)
+# Estimated parse memory (preflight.estimate_memory) of the jobs running in
+# all lanes together; a job that does not fit waits in its queue. 0: no limit.
+# Unset: what is left of MEMORY_LIMIT_MB once the lanes' workers have
+# started, measured then (see app.budget).
+MEMORY_BUDGET_MB = (
+    int(os.environ["PDF_MEMORY_BUDGET_MB"]) if os.environ.get("PDF_MEMORY_BUDGET_MB") else None
+)
+
+# Documents of at least this size reach the workers through a spool file
+# on tmpfs instead of being pickled through the pool's pipe
+SPOOL_DIR = os.environ.get("PDF_SPOOL_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+SPOOL_MIN_BYTES = _int("PDF_SPOOL_MIN_BYTES", 64 * 1024)
+
+# Shadow runs of candidate parsers: share of eligible parses sampled, and
+# jobs allowed to wait before new samples are dropped
+SHADOW_SAMPLE = _float("PDF_SHADOW_SAMPLE", 0.05)
+SHADOW_MAX_PENDING = _int("PDF_SHADOW_MAX_PENDING", 4)
+
+# Span log of traced requests: a file path, "-" for stdout, empty for none
+TRACE_LOG = os.environ.get("PDF_TRACE_LOG", "")
+TRACE_SERVICE_NAME = os.environ.get("PDF_TRACE_SERVICE_NAME", "pdf-service")
+
+# Readiness (GET /health/ready) turns not-ready when a lane's queue reaches
+# this share of its admission limit, when the pages of admitted documents
+# not yet parsed exceed READY_MAX_PAGES, or when the service's RSS, workers
+# included, exceeds READY_MAX_RSS_MB. 0 disables a check. The RSS check is
+# off by default: the memory budget already keeps parses inside
+# MEMORY_LIMIT_MB, and an idle service is well above any per-process limit.
+READY_QUEUE_SHARE = _float("PDF_READY_QUEUE_SHARE", 0.8)
+READY_MAX_PAGES = _int("PDF_READY_MAX_PAGES", 1500)
+READY_MAX_RSS_MB = _int("PDF_READY_MAX_RSS_MB", 0)
+
+# Fonts each worker process keeps across documents (app.parsers.fonts).
+# 0 turns the cache off.
+FONT_CACHE_SIZE = _int("PDF_FONT_CACHE_SIZE", 128)
+
+# Duplicate chars and trailing signature/QR blocks are dropped from each
+# page before extraction (app.parsers.prefilter). PDF_PREFILTER=0 turns it off.
+PREFILTER = _int("PDF_PREFILTER", 1)
+
+# Post-parse validation (app.parsers.validation, needs pandas): rows scoring
+# below VALIDATION_FALLBACK_BELOW make the parser try its text fallback.
+# PDF_VALIDATION=0 turns it off.
+VALIDATION = _int("PDF_VALIDATION", 1)
+VALIDATION_FALLBACK_BELOW = _float("PDF_VALIDATION_FALLBACK_BELOW", 0.5)
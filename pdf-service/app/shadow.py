@@ -0,0 +1,225 @@
+"""Shadow runs of candidate parser versions on live traffic.
+
+A candidate registered in ``parsers.CANDIDATES`` under a PARSERS key runs
+in the background on a sample (``PDF_SHADOW_SAMPLE``) of successful PDF
+parses for that bank. Its output never reaches a response.
+
+Each shadow job runs the primary and the candidate one after the other in
+the same worker process. The two latencies are therefore measured under
+the same load. Jobs go through the parse's lane as background jobs (see
+app.scheduler): they wait for tenant jobs, and the parse's memory
+estimate is reserved in the budget while they run.
+
+Memo caches are cleared before each run and the order alternates between
+jobs, so neither side gets the other's warm caches. The rows are compared
+as multisets of wire records; rows at the same position are also
+compared field by field. Only counts are kept, never row contents.
+Per-bank aggregates are served at ``GET /shadow``, and latency deltas go
+to ``/metrics``.
+
+Shadow work is best effort. Requests beyond ``PDF_SHADOW_MAX_PENDING``
+waiting jobs are dropped, and a failure is counted, never raised.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Optional
+
+from .metrics import metrics
+from .parsers import CANDIDATES, PARSERS, memo
+from .parsers.pages import DateWindow
+from .scheduler import FairScheduler
+
+log = logging.getLogger(__name__)
+
+FIELDS = ("date", "time", "amount", "direction", "counterparty", "purpose", "balance")
+_DATE, _AMOUNT = FIELDS.index("date"), FIELDS.index("amount")
+# Mismatches kept for GET /shadow (bank, field names and counts only)
+_RECENT = 20
+
+
+# Shadow jobs run in this process so far
+_jobs = 0
+
+
+def _timed(parser, data: bytes, window: Optional[DateWindow]) -> tuple[float, list[dict], Optional[str]]:
+    memo.clear()
+    started = time.perf_counter()
+    result = parser(data, window=window)
+    elapsed = time.perf_counter() - started
+    rows = result.get("transactions", []) if isinstance(result, dict) else result
+    if window:
+        rows = [tx for tx in rows if window.contains(tx.date)]
+    account = result.get("account_identifier") if isinstance(result, dict) else None
+    return elapsed, [tx.to_wire() for tx in rows], account
+
+
+def diff_rows(primary: list[dict], candidate: list[dict]) -> dict[str, Any]:
+    """Row counts of a primary/candidate comparison.
+
+    Rows only one side produced are paired up by (date, amount) where
+    possible. ``fields`` counts which fields differ within those pairs:
+    the same transaction read differently.
+    """
+    left = Counter(tuple(row.get(f) for f in FIELDS) for row in primary)
+    right = Counter(tuple(row.get(f) for f in FIELDS) for row in candidate)
+    unmatched: dict[tuple, list[tuple]] = {}
+    for row in (right - left).elements():
+        unmatched.setdefault((row[_DATE], row[_AMOUNT]), []).append(row)
+    fields: Counter[str] = Counter()
+    for row in (left - right).elements():
+        pair = unmatched.get((row[_DATE], row[_AMOUNT]))
+        if pair:
+            other = pair.pop()
+            fields.update(f for f, a, b in zip(FIELDS, row, other) if a != b)
+    return {
+        "equal": sum((left & right).values()),
+        "missing": sum((left - right).values()),
+        "extra": sum((right - left).values()),
+        "fields": dict(fields),
+    }
+
+
+def shadow_job(bank_code: str, data: bytes, window: Optional[DateWindow]) -> dict[str, Any]:
+    """Run primary and candidate on one document; returns timings and the diff."""
+    global _jobs
+    _jobs += 1
+    try:
+        # Alternate which goes first, so warm-up costs fall on both sides
+        if _jobs % 2:
+            primary_s, primary, primary_account = _timed(PARSERS[bank_code], data, window)
+            candidate_s, candidate, candidate_account = _timed(CANDIDATES[bank_code], data, window)
+        else:
+            candidate_s, candidate, candidate_account = _timed(CANDIDATES[bank_code], data, window)
+            primary_s, primary, primary_account = _timed(PARSERS[bank_code], data, window)
+    finally:
+        # Parser metrics of shadow runs would double-count live traffic
+        memo.flush_stats()
+        metrics.drain()
+    diff = diff_rows(primary, candidate)
+    diff.update(
+        primary_seconds=primary_s,
+        candidate_seconds=candidate_s,
+        primary_rows=len(primary),
+        candidate_rows=len(candidate),
+        account_match=primary_account == candidate_account,
+    )
+    return diff
+
+
+class _BankStats:
+    __slots__ = ("runs", "identical", "failed", "primary_seconds", "candidate_seconds",
+                 "primary_rows", "candidate_rows", "missing", "extra", "fields", "account_mismatch")
+
+    def __init__(self) -> None:
+        self.runs = self.identical = self.failed = self.account_mismatch = 0
+        self.primary_seconds = self.candidate_seconds = 0.0
+        self.primary_rows = self.candidate_rows = self.missing = self.extra = 0
+        self.fields: Counter[str] = Counter()
+
+    def snapshot(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "runs": self.runs,
+            "failed": self.failed,
+            "identical": self.identical,
+            "account_mismatch": self.account_mismatch,
+            "rows": {
+                "primary": self.primary_rows,
+                "candidate": self.candidate_rows,
+                "missing": self.missing,
+                "extra": self.extra,
+            },
+            "field_mismatch": dict(self.fields),
+        }
+        if self.runs:
+            out["primary_seconds_mean"] = round(self.primary_seconds / self.runs, 4)
+            out["candidate_seconds_mean"] = round(self.candidate_seconds / self.runs, 4)
+        if self.candidate_seconds:
+            out["speedup"] = round(self.primary_seconds / self.candidate_seconds, 3)
+        return out
+
+
+class ShadowRunner:
+    """Samples parses into background shadow jobs and aggregates their results."""
+
+    def __init__(self, sample: float, max_pending: int) -> None:
+        self.sample = sample
+        self.max_pending = max_pending
+        self.pending = 0
+        self._stats: dict[str, _BankStats] = {}
+        self._recent: deque[dict[str, Any]] = deque(maxlen=_RECENT)
+        self._tasks: set[asyncio.Task] = set()
+
+    def maybe_run(self, lane: FairScheduler, bank_code: str, data: bytes, window: Optional[DateWindow],
+                  memory: int = 0) -> None:
+        """Queue a shadow job for a parse if the bank has a candidate and it is sampled.
+
+        ``lane`` is the parse's lane and ``memory`` its estimated parse memory.
+        """
+        if bank_code not in CANDIDATES or random.random() >= self.sample:
+            return
+        if self.pending >= self.max_pending:
+            metrics.incr("shadow.dropped", bank=bank_code)
+            return
+        self.pending += 1
+        task = asyncio.ensure_future(self._run(lane, bank_code, data, window, memory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, lane: FairScheduler, bank_code: str, data: bytes, window: Optional[DateWindow],
+                   memory: int) -> None:
+        stats = self._stats.setdefault(bank_code, _BankStats())
+        try:
+            diff = await lane.submit(None, shadow_job, bank_code, data, window, memory=memory, background=True)
+        except Exception as e:
+            stats.failed += 1
+            metrics.incr("shadow.failed", bank=bank_code)
+            log.warning("Shadow run for %s failed: %s", bank_code, e)
+            return
+        finally:
+            self.pending -= 1
+        self._record(bank_code, stats, diff)
+
+    def _record(self, bank_code: str, stats: _BankStats, diff: dict[str, Any]) -> None:
+        identical = not diff["missing"] and not diff["extra"] and diff["account_match"]
+        stats.runs += 1
+        stats.identical += identical
+        stats.account_mismatch += not diff["account_match"]
+        stats.primary_seconds += diff["primary_seconds"]
+        stats.candidate_seconds += diff["candidate_seconds"]
+        stats.primary_rows += diff["primary_rows"]
+        stats.candidate_rows += diff["candidate_rows"]
+        stats.missing += diff["missing"]
+        stats.extra += diff["extra"]
+        stats.fields.update(diff["fields"])
+
+        metrics.incr("shadow.runs", bank=bank_code, identical=str(identical).lower())
+        metrics.observe(
+            "shadow.latency_delta_seconds",
+            diff["candidate_seconds"] - diff["primary_seconds"],
+            bank=bank_code,
+        )
+        if not identical:
+            self._recent.append({
+                "bank": bank_code,
+                "missing": diff["missing"],
+                "extra": diff["extra"],
+                "fields": diff["fields"],
+                "account_match": diff["account_match"],
+            })
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "sample": self.sample,
+            "candidates": sorted(CANDIDATES),
+            "pending": self.pending,
+            "banks": {bank: s.snapshot() for bank, s in sorted(self._stats.items())},
+            "recent_mismatches": list(self._recent),
+        }
+
+    def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,40 @@
+"""Coalescing of identical in-flight requests.
+
+Double-clicks, client retries and Node retrying a slow upload all send the
+same PDF again while the first parse is still running. ``SingleFlight``
+runs one shared task per key; every concurrent caller with that key awaits
+the same task and receives its result (or exception). The task is shielded,
+so a caller that goes away does not cancel the work for the others.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from .metrics import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Run ``fn`` once per key at a time; returns (result, coalesced)."""
+        task = self._calls.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            metrics.incr("singleflight.coalesced", name=self.name)
+        return await asyncio.shield(task), coalesced
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def __len__(self) -> int:
+        return len(self._calls)
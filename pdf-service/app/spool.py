@@ -0,0 +1,115 @@
+"""Hand-off of uploaded documents to worker processes through spool files.
+
+Passing ``bytes`` to a worker pickles the whole document through the pool's
+pipe. The parent then writes one copy and the child reads another. Instead
+the parent writes the document once to a file on tmpfs (/dev/shm) and sends
+only its path. The worker maps the file read-only, so pdfminer's reads are
+served from the shared page cache and the worker never holds its own copy.
+
+The parent owns every spool file. It unlinks the file when the job ends,
+whether the job succeeded, failed or lost its worker. An open map stays
+valid after the unlink. Files left by a parent that died are removed by
+``sweep`` at the next start: their names carry the owner's pid.
+"""
+
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterator, Union
+
+from . import settings
+from .metrics import metrics
+
+_PREFIX = "pdfsvc-"
+
+
+@dataclass(frozen=True)
+class Spooled:
+    """Picklable handle to a spooled document."""
+
+    path: str
+    size: int
+
+
+@contextmanager
+def spooled(data: bytes) -> Iterator[Union[bytes, Spooled]]:
+    """Spool ``data`` for the duration of a job; small documents pass through as bytes."""
+    if len(data) < settings.SPOOL_MIN_BYTES:
+        yield data
+        return
+    try:
+        fd, path = tempfile.mkstemp(prefix=f"{_PREFIX}{os.getpid()}-", dir=settings.SPOOL_DIR)
+    except OSError:
+        metrics.incr("spool.fallback")
+        yield data
+        return
+    try:
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except OSError:
+            # tmpfs full: hand this document over the pipe instead
+            metrics.incr("spool.fallback")
+            yield data
+            return
+        metrics.incr("spool.bytes", len(data))
+        yield Spooled(path, len(data))
+    finally:
+        _unlink(path)
+
+
+@contextmanager
+def attach(data: Union[bytes, Spooled], mapped: bool = True) -> Iterator[Union[bytes, IO[bytes], mmap.mmap]]:
+    """Open a spooled document read-only in a worker; bytes pass through.
+
+    ``mapped`` gives a read-only map, for pdfminer's random access.
+    Otherwise a buffered file is returned: the export readers stream front
+    to back and need ``peek``.
+    """
+    if not isinstance(data, Spooled):
+        yield data
+        return
+    with open(data.path, "rb") as f:
+        if not mapped or data.size == 0:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep() -> int:
+    """Remove spool files whose owning process is gone; returns how many."""
+    removed = 0
+    try:
+        names = os.listdir(settings.SPOOL_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith(_PREFIX):
+            continue
+        pid = name[len(_PREFIX):].split("-", 1)[0]
+        if pid.isdigit() and not _alive(int(pid)):
+            _unlink(os.path.join(settings.SPOOL_DIR, name))
+            removed += 1
+    if removed:
+        metrics.incr("spool.swept", removed)
+    return removed
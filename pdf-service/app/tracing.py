@@ -0,0 +1,250 @@
+"""Request-scoped tracing of parse requests.
+
+A request carrying a W3C ``traceparent`` header continues that trace. A
+request without one starts a new trace, and an ``X-Request-ID`` is kept as
+an attribute. Stages are recorded as spans under the request's root span:
+admission, queue wait, the worker's parse with one span per page, and
+response serialization. Worker processes have no live connection to the
+request. They rebuild the context from the ``TraceParent`` passed to the
+job and return their spans with the job's metrics.
+
+Tracing costs nothing outside a traced request: without a current span,
+``span`` and ``pages`` do nothing, so the CLI, shadow runs and benchmarks
+are not traced.
+
+Finished traces are written as OTLP/JSON lines (one ``resourceSpans``
+document per request) to ``PDF_TRACE_LOG``, a file or "-" for stdout.
+An OpenTelemetry Collector reads that file with its otlpjsonfile
+receiver. Stage durations are also returned in a ``Server-Timing`` header,
+so the caller can stitch the service's part into its own trace.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional, TypeVar
+
+from . import settings
+
+T = TypeVar("T")
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# Stages summarized in Server-Timing, in order
+TIMED_STAGES = ("admission", "queue", "parse", "serialize")
+
+
+@dataclass(frozen=True)
+class TraceParent:
+    """The part of a span another process needs to continue its trace."""
+
+    trace_id: str
+    span_id: str
+
+    @classmethod
+    def parse(cls, header: Optional[str]) -> Optional["TraceParent"]:
+        m = _TRACEPARENT_RE.match((header or "").strip().lower())
+        if not m or m.group(1) == "0" * 32 or m.group(2) == "0" * 16:
+            return None
+        return cls(m.group(1), m.group(2))
+
+    def header(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns",
+                 "attributes", "sink")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sink: list[dict],
+                 kind: int = INTERNAL, attributes: Optional[dict[str, Any]] = None) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        # Finished spans of the whole trace in this process, as OTLP dicts
+        self.sink = sink
+
+    def context(self) -> TraceParent:
+        return TraceParent(self.trace_id, self.span_id)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.end_ns = time.time_ns()
+        self.sink.append(_otlp_span(
+            self.name, self.trace_id, self.span_id, self.parent_id, self.kind,
+            self.start_ns, self.end_ns, self.attributes,
+        ))
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, parent: Optional[TraceParent], kind: int = INTERNAL, **attributes: Any) -> Iterator[Span]:
+    """Root span of this process's part of a trace; a new trace without ``parent``."""
+    root = Span(
+        name,
+        parent.trace_id if parent else os.urandom(16).hex(),
+        parent.span_id if parent else None,
+        [],
+        kind,
+        attributes,
+    )
+    token = _current.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.set(error=type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        root.finish()
+
+
+@contextmanager
+def resume(parent: Optional[TraceParent], name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """``trace`` in a worker; does nothing for an untraced job."""
+    if parent is None:
+        yield None
+        return
+    with trace(name, parent, **attributes) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child of the current span; does nothing outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent.span_id, parent.sink, attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set(error=type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def record(name: str, parent: Optional[Span], duration: float, **attributes: Any) -> None:
+    """Add a span under ``parent`` that ended now and lasted ``duration`` seconds."""
+    if parent is None:
+        return
+    end = time.time_ns()
+    parent.sink.append(_otlp_span(
+        name, parent.trace_id, os.urandom(8).hex(), parent.span_id, INTERNAL,
+        end - int(duration * 1e9), end, attributes,
+    ))
+
+
+def adopt(spans: Iterable[dict]) -> None:
+    """Add spans finished in a worker to the current trace."""
+    root = _current.get()
+    if root is not None:
+        root.sink.extend(spans)
+
+
+def pages(items: Iterable[T], parser: str, start: int = 0) -> Iterator[T]:
+    """Iterate pages, each iteration of the caller's loop in a "page" span."""
+    parent = _current.get()
+    if parent is None:
+        yield from items
+        return
+    for i, item in enumerate(items, start):
+        # Not made current: a generator must not leave its span in the
+        # caller's context if the loop is abandoned
+        page = Span("page", parent.trace_id, parent.span_id, parent.sink,
+                    attributes={"parser": parser, "page": i + 1})
+        try:
+            yield item
+        finally:
+            page.finish()
+
+
+def _value(v: Any) -> dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _otlp_span(name: str, trace_id: str, span_id: str, parent_id: Optional[str], kind: int,
+               start_ns: int, end_ns: int, attributes: dict[str, Any]) -> dict[str, Any]:
+    out: dict[str, Any] = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [{"key": k, "value": _value(v)} for k, v in attributes.items() if v is not None],
+    }
+    if parent_id:
+        out["parentSpanId"] = parent_id
+    return out
+
+
+def _ms(s: dict[str, Any]) -> float:
+    return (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+
+
+def server_timing(root: Span) -> str:
+    """Server-Timing header value: the stages recorded so far and the total."""
+    totals: dict[str, float] = {}
+    for s in root.sink:
+        if s["name"] in TIMED_STAGES:
+            totals[s["name"]] = totals.get(s["name"], 0.0) + _ms(s)
+    parts = [f"{name};dur={totals[name]:.1f}" for name in TIMED_STAGES if name in totals]
+    parts.append(f"total;dur={(time.time_ns() - root.start_ns) / 1e6:.1f}")
+    return ", ".join(parts)
+
+
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def export(spans: list[dict]) -> None:
+    """Append one trace to the span log as an OTLP/JSON line."""
+    global _log_file
+    if not settings.TRACE_LOG or not spans:
+        return
+    line = json.dumps({"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}},
+        ]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}, ensure_ascii=False)
+    with _log_lock:
+        if _log_file is None:
+            _log_file = sys.stdout if settings.TRACE_LOG == "-" else open(
+                settings.TRACE_LOG, "a", encoding="utf-8", buffering=1
+            )
+        _log_file.write(line + "\n")
+        _log_file.flush()
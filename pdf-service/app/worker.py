@@ -0,0 +1,113 @@
+"""Parse jobs executed in the scheduler's worker processes."""
+
+import os
+from typing import Any, Optional, Union
+
+from . import tracing
+from .categorize import compile_rules
+from .metrics import metrics
+from .parsers import EXPORT_PARSERS, PARSERS, SECTIONS, memo, validation
+from .parsers.pages import DateWindow
+from .parsers.records import TransactionBatch
+from .parsers.sections import AccountSection, combine
+from .spool import Spooled, attach
+from .tracing import TraceParent
+
+
+def init_worker() -> None:
+    """Process initializer: importing the parsers here warms pdfplumber.
+
+    pandas, which the API process never loads, is imported here too.
+    """
+    validation.preload()
+    metrics.drain()
+
+
+def ping() -> int:
+    """Empty job: running one starts a worker process and warms it."""
+    return os.getpid()
+
+
+def parse_job(
+    bank_code: str,
+    data: Union[bytes, Spooled],
+    rules_version: Optional[str] = None,
+    rules: Optional[list[dict[str, Any]]] = None,
+    ext: str = ".pdf",
+    window: Optional[DateWindow] = None,
+    trace: Optional[TraceParent] = None,
+    section: Optional[AccountSection] = None,
+    split: bool = False,
+) -> tuple[Any, dict[str, Any]]:
+    """Run a bank parser and return its result plus this job's metrics.
+
+    ``data`` is the document itself or a spool handle to map read-only.
+    ``ext`` selects the input format: ".pdf" for the bank's PDF parser,
+    otherwise an ``EXPORT_PARSERS`` entry. With a date window only rows
+    inside it are returned. With a rule set, the result also carries
+    ``categories``: one assignment (or None) per transaction, in order.
+    With ``trace``, the job's spans are returned in the metrics as "spans".
+
+    A PDF of several accounts (``parsers.SECTIONS``) is parsed section by
+    section and its result carries "accounts" (see ``sections.combine``).
+    With ``split`` such a document is not parsed: the result is
+    {"sections": [...]}, for the caller to run one job per ``section``.
+    """
+    with tracing.resume(trace, "parse", bank_code=bank_code, ext=ext) as root:
+        try:
+            with attach(data, mapped=(ext == ".pdf")) as source:
+                found = None
+                if ext == ".pdf" and section is None and bank_code in SECTIONS:
+                    found = SECTIONS[bank_code](source)
+                if found is not None and len(found) > 1:
+                    metrics.incr("sections.documents", bank_code=bank_code, split=str(split).lower())
+                    if split:
+                        result = {"sections": found}
+                    else:
+                        result = combine([
+                            _parse(bank_code, source, rules_version, rules, ext, window, s) for s in found
+                        ])
+                else:
+                    result = _parse(bank_code, source, rules_version, rules, ext, window, section)
+            if root is not None and isinstance(result, dict) and "transactions" in result:
+                root.set(rows=len(result["transactions"]), pages_skipped=result.get("pages_skipped", 0))
+        finally:
+            memo.flush_stats()
+            telemetry = metrics.drain()
+    if root is not None:
+        telemetry["spans"] = root.sink
+    return result, telemetry
+
+
+def _parse(
+    bank_code: str,
+    source: Any,
+    rules_version: Optional[str],
+    rules: Optional[list[dict[str, Any]]],
+    ext: str,
+    window: Optional[DateWindow],
+    section: Optional[AccountSection],
+) -> Any:
+    if ext != ".pdf":
+        result = EXPORT_PARSERS[ext](source, bank_code)
+    elif section is not None:
+        with tracing.span("section", account=section.account, start=section.start, stop=section.stop):
+            result = PARSERS[bank_code](source, window=window, section=section)
+    else:
+        result = PARSERS[bank_code](source, window=window)
+    if isinstance(result, dict):
+        # Columnar pickling for the trip back to the parent process
+        rows = result.get("transactions", [])
+        if window:
+            rows = [tx for tx in rows if window.contains(tx.date)]
+            if result.get("validation") is not None:
+                # The parser validated every row it read, to pick between
+                # its table and text rows; report on the rows returned
+                report = validation.validate(rows)
+                result["validation"] = report.to_dict() if report else None
+        result["transactions"] = TransactionBatch(rows)
+        if rules is not None:
+            with tracing.span("categorize", rules=len(rules)):
+                ruleset = compile_rules(rules_version, rules)
+                result["categories"] = ruleset.categorize(result["transactions"])
+    return result
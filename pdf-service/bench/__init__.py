@@ -0,0 +1 @@
+"""Benchmarks and load tools for the PDF service (not shipped in the image)."""
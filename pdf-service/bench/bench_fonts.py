@@ -0,0 +1,76 @@
+"""Open and first-page cost with a cold and a warm font cache.
+
+For each document: the time to open it and lay out its first page's
+chars, median of ``--repeat`` runs. Cold: the font cache is emptied
+before each run. Warm: another document of the same layout (the next
+seed) has been parsed first, as in a worker that has already seen the
+bank. ``--files`` adds real statements; each one is warmed by itself.
+
+    python -m bench.bench_fonts [--layouts sber,tbank] [--files a.pdf,b.pdf] [--repeat 7]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from app import settings
+from app.parsers import fonts
+from app.parsers.utils import open_pdf
+
+from .fixtures import statement_pdf
+
+
+def _first_page(data: bytes) -> float:
+    started = time.perf_counter()
+    with open_pdf(data) as pdf:
+        pdf.pages[0].chars
+    return time.perf_counter() - started
+
+
+def _measure(data: bytes, warm_with: bytes, repeat: int) -> tuple[float, float, float]:
+    """(no cache, cold, warm) median seconds."""
+    size = settings.FONT_CACHE_SIZE
+    settings.FONT_CACHE_SIZE = 0
+    off = statistics.median(_first_page(data) for _ in range(repeat))
+    settings.FONT_CACHE_SIZE = size
+    cold = []
+    for _ in range(repeat):
+        fonts.clear()
+        cold.append(_first_page(data))
+    warm = []
+    for _ in range(repeat):
+        fonts.clear()
+        _first_page(warm_with)
+        warm.append(_first_page(data))
+    return off, statistics.median(cold), statistics.median(warm)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--layouts", default="sber,sber_personal,tbank,tbank_deposit,ozon")
+    ap.add_argument("--files", default="", help="comma-separated PDF paths")
+    ap.add_argument("--repeat", type=int, default=7)
+    args = ap.parse_args()
+
+    cases = []
+    for layout in filter(None, args.layouts.split(",")):
+        cases.append((layout, statement_pdf(layout, 1, seed=1), statement_pdf(layout, 1, seed=2)))
+    for path in filter(None, args.files.split(",")):
+        with open(path, "rb") as f:
+            data = f.read()
+        cases.append((os.path.basename(path)[:24], data, data))
+
+    print(" | ".join(f"{c:>24}" if i == 0 else f"{c:>9}"
+                     for i, c in enumerate(["document", "no cache", "cold", "warm", "saved"])))
+    for name, data, warm_with in cases:
+        off, cold, warm = _measure(data, warm_with, args.repeat)
+        print(" | ".join([
+            f"{name:>24}",
+            *(f"{v * 1000:>6.1f} ms" for v in (off, cold, warm)),
+            f"{(cold - warm) * 1000:>6.1f} ms",
+        ]))
+
+
+if __name__ == "__main__":
+    main()
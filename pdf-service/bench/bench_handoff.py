@@ -0,0 +1,82 @@
+"""Cost of handing a document to a worker process, per MB.
+
+Compares pickling the bytes through the pool's pipe with the spool hand-off
+(tmpfs file, mapped read-only in the worker). The job reads the whole
+document in 64 KB chunks, roughly like pdfminer does, so both paths pay
+for the reads they would really make.
+
+- ms: round trip of one job, best of ``--repeat``
+- ms/MB: the same, less an empty job's round trip, per MB of document
+- anon MB: the worker's anonymous memory while the document is open
+  (Linux smaps_rollup); the pages of a mapped spool file belong to the
+  page cache and do not count
+
+    python -m bench.bench_handoff [--sizes 0.1,1,5,10]
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from app import settings
+from app.spool import attach, spooled
+
+_CHUNK = 64 * 1024
+
+
+def _anonymous_bytes() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Anonymous:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _read_all(data) -> int:
+    """Read the document through; returns anonymous memory at the end."""
+    with attach(data) as source:
+        stream = BytesIO(source) if isinstance(source, bytes) else source
+        while stream.read(_CHUNK):
+            pass
+        return _anonymous_bytes()
+
+
+def _run(kind: str, size: int, repeat: int) -> tuple[float, float, int]:
+    """Best round trip, empty-job round trip and anonymous memory of a job."""
+    data = bytes(range(256)) * (size // 256)
+    settings.SPOOL_MIN_BYTES = 0 if kind == "spool" else size + 1
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pool.submit(_read_all, b"").result()  # start the worker
+
+        def once(payload: bytes) -> tuple[float, int]:
+            t0 = time.perf_counter()
+            with spooled(payload) as handle:
+                anon = pool.submit(_read_all, handle).result()
+            return time.perf_counter() - t0, anon
+
+        empty = min(once(b"")[0] for _ in range(repeat))
+        runs = [once(data) for _ in range(repeat)]
+    return min(t for t, _ in runs), empty, max(p for _, p in runs)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="0.1,1,5,10", help="document sizes in MB")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"spool dir: {settings.SPOOL_DIR}")
+    cols = ["MB", "hand-off", "ms", "ms/MB", "anon MB"]
+    print(" | ".join(f"{c:>10}" for c in cols))
+    for mb in (float(s) for s in args.sizes.split(",")):
+        size = int(mb * 2**20)
+        for kind in ("pickle", "spool"):
+            best, empty, anon = _run(kind, size, args.repeat)
+            line = [mb, kind, best * 1000, (best - empty) * 1000 / mb, anon / 2**20]
+            print(" | ".join(f"{v:>10}" if isinstance(v, str) else f"{v:>10.2f}" for v in line))
+
+
+if __name__ == "__main__":
+    main()
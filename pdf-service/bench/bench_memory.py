@@ -0,0 +1,60 @@
+"""Peak parse memory against ``preflight.estimate_memory``.
+
+Each statement is parsed in a fresh worker process, for every
+``PAGES_IN_MEMORY`` setting given. The table shows the parse's peak RSS
+above the process's RSS before it, next to the estimate the memory budget
+reserves for it. An estimate below the measurement means the budget
+under-counts that layout; ``preflight._BYTES_PER_CHAR`` and the other
+constants of the model come from this table.
+
+    python -m bench.bench_memory [--layouts sber,tbank_text] [--pages 10,40] [--windows 1,8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+from concurrent.futures import ProcessPoolExecutor
+
+from .fixtures import parser_code, statement_pdf
+
+
+def _measure(layout: str, pages: int, window: int) -> tuple[float, float, int]:
+    """(peak RSS growth MB, estimate MB, rows) of one parse, in this process."""
+    os.environ["PDF_PAGES_IN_MEMORY"] = str(window)
+    from app.parsers import PARSERS
+    from app.preflight import estimate_memory, read_structure
+
+    data = statement_pdf(layout, pages, seed=pages)
+    structure = read_structure(data)
+    estimate = estimate_memory(structure.size, structure.chars_per_page)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rows = len(PARSERS[parser_code(layout)](data)["transactions"])
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak - before) / 1024, estimate / 2**20, rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--layouts", default="sber,sber_personal,tbank,tbank_text,tbank_deposit,ozon")
+    ap.add_argument("--pages", default="10,40")
+    ap.add_argument("--windows", default="1,8,16")
+    args = ap.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(" | ".join(f"{c:>13}" for c in ["layout", "pages", "window", "peak MB", "estimate MB", "rows"]))
+    for layout in args.layouts.split(","):
+        for pages in (int(p) for p in args.pages.split(",")):
+            for window in (int(w) for w in args.windows.split(",")):
+                # A fresh process per parse: ru_maxrss only ever grows
+                with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                    peak, estimate, rows = pool.submit(_measure, layout, pages, window).result()
+                flag = "" if estimate >= peak else "  under"
+                print(" | ".join([
+                    f"{layout:>13}", f"{pages:>13}", f"{window:>13}",
+                    f"{peak:>13.1f}", f"{estimate:>13.1f}", f"{rows:>13}",
+                ]) + flag)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Parse time and rows with the page prefilter off and on.
+
+Each layout is generated plain and with fake bold (every glyph drawn
+twice); Sber layouts also with their e-signature block and QR code
+stamped on every page, alone and with fake bold. Each variant is parsed
+with ``PDF_PREFILTER`` 0 and 1:
+
+- ms/page: parse time per page, best of ``--repeat``
+- rows: transactions returned (fake bold breaks header matching when the
+  duplicates are kept)
+- dup/page, trailer/page: objects the prefilter removed per page
+
+    python -m bench.bench_prefilter [--layouts sber,tbank] [--pages 5] [--repeat 3]
+"""
+
+import argparse
+import time
+
+from app import settings
+from app.metrics import metrics
+from app.parsers import PARSERS
+
+from .fixtures import parser_code, statement_pdf
+
+VARIANTS = [
+    ("plain", {}),
+    ("bold", {"bold": True}),
+    ("signed", {"signed": True}),
+    ("bold+signed", {"bold": True, "signed": True}),
+]
+
+
+def _removed(observations: dict[str, list[float]], kind: str) -> float:
+    per_page = [v for key, values in observations.items()
+                if key.startswith("prefilter.removed{") and f"kind={kind}" in key for v in values]
+    return sum(per_page) / len(per_page) if per_page else 0.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--layouts", default="sber,sber_personal,tbank,tbank_deposit,ozon")
+    ap.add_argument("--pages", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cols = ["layout", "variant", "prefilter", "ms/page", "rows", "dup/page", "trailer/page"]
+    print(" | ".join(f"{c:>13}" for c in cols))
+    for layout in args.layouts.split(","):
+        parser = PARSERS[parser_code(layout)]
+        for variant, kwargs in VARIANTS:
+            if kwargs.get("signed") and parser_code(layout) != "sber":
+                continue
+            data = statement_pdf(layout, args.pages, seed=args.pages, **kwargs)
+            for enabled in (0, 1):
+                settings.PREFILTER = enabled
+                best = float("inf")
+                for _ in range(args.repeat):
+                    metrics.drain()
+                    started = time.perf_counter()
+                    rows = len(parser(data)["transactions"])
+                    best = min(best, time.perf_counter() - started)
+                observations = metrics.drain()["observations"]
+                print(" | ".join([
+                    f"{layout:>13}", f"{variant:>13}", f"{'on' if enabled else 'off':>13}",
+                    f"{best * 1000 / args.pages:>13.0f}", f"{rows:>13}",
+                    f"{_removed(observations, 'duplicate'):>13.0f}",
+                    f"{_removed(observations, 'trailer'):>13.0f}",
+                ]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Memory and time of parser row representations at large row counts.
+
+Compares the per-row 7-key dict the parsers used to build (amounts and
+dates converted to strings up front) with the slots ``Transaction``
+record (native values, converted at the edge):
+
+- build: constructing the rows from parsed values
+- memory: bytes retained by the rows (tracemalloc)
+- pickle: the worker → parent hand-off, size and round-trip time
+- edge: the record path's extra ``to_wire`` conversion in main
+
+    python -m bench.bench_records [--sizes 1000,10000,50000,200000]
+"""
+
+import argparse
+import gc
+import pickle
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from app.parsers.records import Transaction, TransactionBatch
+
+from .fixtures import synthetic_transactions
+
+
+def _parsed_values(count: int) -> list[tuple]:
+    """What a parser holds just before building a row."""
+    return [
+        (
+            date.fromisoformat(tx["date"]),
+            tx["time"],
+            Decimal(tx["amount"]),
+            tx["direction"],
+            tx["counterparty"],
+            tx["purpose"],
+            Decimal(tx["balance"]),
+        )
+        for tx in synthetic_transactions(count)
+    ]
+
+
+def _as_dicts(values: list[tuple]) -> list[dict]:
+    return [
+        {
+            "date": dt.isoformat(),
+            "time": tm,
+            "amount": str(amount),
+            "direction": direction,
+            "counterparty": cp,
+            "purpose": purpose,
+            "balance": str(balance) if balance is not None else None,
+        }
+        for dt, tm, amount, direction, cp, purpose, balance in values
+    ]
+
+
+def _as_records(values: list[tuple]) -> TransactionBatch:
+    return TransactionBatch(
+        Transaction(
+            date=dt,
+            time=tm,
+            amount=amount,
+            direction=direction,
+            counterparty=cp,
+            purpose=purpose,
+            balance=balance,
+        )
+        for dt, tm, amount, direction, cp, purpose, balance in values
+    )
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _retained(build, values: list[tuple]) -> tuple[int, list]:
+    # Separate run: tracemalloc slows allocation-heavy code several times over
+    gc.collect()
+    tracemalloc.start()
+    rows = build(values)
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, rows
+
+
+def _roundtrip(rows: list) -> tuple[float, float]:
+    blob = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+    return _best_of(lambda: pickle.loads(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)), 3), len(blob)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,50000,200000")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cols = ["rows", "kind", "build ms", "mem MB", "pickle ms", "pickle MB", "edge ms", "total ms"]
+    print(" | ".join(f"{c:>10}" for c in cols))
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        values = _parsed_values(size)
+        for kind, build in (("dict", _as_dicts), ("record", _as_records)):
+            t_build = _best_of(lambda: build(values), args.repeat)
+            mem, rows = _retained(build, values)
+            t_pickle, blob_size = _roundtrip(rows)
+            t_edge = 0.0
+            if kind == "record":
+                t_edge = _best_of(lambda: [tx.to_wire() for tx in rows], args.repeat)
+            total = t_build + t_pickle + t_edge
+            line = [size, kind, t_build * 1000, mem / 2**20, t_pickle * 1000,
+                    blob_size / 2**20, t_edge * 1000, total * 1000]
+            print(" | ".join(
+                f"{v:>10}" if isinstance(v, (int, str)) else f"{v:>10.2f}" for v in line
+            ))
+            del rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Matching time of the parser regexes on adversarial lines.
+
+Every case is a line built to make a backtracking pattern retry: long
+runs of spaces, digits and separators with no terminator after them, as
+a crafted or broken PDF can produce. Each case is timed at growing line
+lengths, calling the parser's match exactly as the parser does (with its
+length guard, if it has one).
+
+The run fails (exit status 1) when any line takes longer than
+``--budget`` ms. Linear matching stays well under it up to the longest
+default line; a quadratic or worse pattern passes the short lines and
+blows through it on the long ones. The Sber header stays quadratic up to
+its length guard (``sber._MAX_HEADER_LEN``) and is refused above it, so
+its worst case is the line just under the guard.
+
+    python -m bench.bench_regex [--sizes 100,300,1000,4000,16000] [--budget 2]
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable
+
+from app.parsers import ozon, sber, tbank, tbank_deposit
+
+NBSP = "\u00a0"
+
+
+def _fill(prefix: str, unit: str, suffix: str) -> Callable[[int], str]:
+    """Line of about ``size`` chars: prefix, repeated unit, suffix."""
+    def line(size: int) -> str:
+        return prefix + unit * max(1, (size - len(prefix) - len(suffix)) // len(unit)) + suffix
+    return line
+
+
+# name → (match as the parser calls it, adversarial line of a given length)
+CASES: dict[str, tuple[Callable[[str], object], Callable[[int], str]]] = {
+    "sber header, digits": (sber._match_header, _fill("01.01.2026 10:00 ", "1 ", "x")),
+    "sber header, nbsp": (sber._match_header, _fill("01.01.2026 10:00 ", NBSP, "₽x")),
+    "sber header, amounts": (sber._match_header, _fill("01.01.2026 10:00 Перевод ", "1,5 ", "x")),
+    "tbank amount, spaces": (tbank._AMOUNT_RE.search, _fill("+", " ", "x")),
+    "tbank amount, digits": (tbank._AMOUNT_RE.search, _fill("+", "1 ", "x")),
+    "deposit amount, spaces": (tbank_deposit._AMOUNT_RE.search, _fill("-", " ", "x")),
+    "ozon date/time": (ozon._split_dt, _fill("", "01.01.2026 ", "")),
+}
+
+
+def _best_of(fn: Callable[[str], object], line: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(line)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default=f"100,{sber._MAX_HEADER_LEN},1000,4000,16000",
+                    help="line lengths in chars")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget", type=float, default=2.0, help="ms allowed per line")
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    print(" | ".join(f"{c:>24}" if i == 0 else f"{c:>9}" for i, c in enumerate(["case", *sizes])))
+    failures: list[str] = []
+    for name, (match, make_line) in CASES.items():
+        times = [_best_of(match, make_line(size), args.repeat) * 1000 for size in sizes]
+        print(" | ".join([f"{name:>24}", *(f"{t:>9.3f}" for t in times)]))
+        for size, t in zip(sizes, times):
+            if t > args.budget:
+                failures.append(f"{name}: {t:.2f} ms at {size} chars (budget {args.budget} ms)")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Serialization time and bytes on the wire for /parse responses.
+
+Compares the stdlib encoder that ``JSONResponse`` used with orjson, and the
+size of the body uncompressed, gzip'ed and zstd'ed, at several statement
+sizes.
+
+    python -m bench.bench_serialization [--sizes 100,1000,10000,50000]
+"""
+
+import argparse
+import json
+import time
+
+import orjson
+
+from app import settings
+from app.responses import compress, zstandard
+
+from .fixtures import synthetic_transactions
+
+
+def _stdlib_dumps(content: object) -> bytes:
+    # Same arguments as starlette.responses.JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _best_of(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="100,1000,10000,50000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    encodings = ["gzip"] + (["zstd"] if zstandard is not None else [])
+    cols = ["rows", "json ms", "orjson ms", "raw KB"]
+    for enc in encodings:
+        cols += [f"{enc} ms", f"{enc} KB"]
+    print(" | ".join(f"{c:>10}" for c in cols))
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = synthetic_transactions(size)
+        content = {
+            "bank_code": "sber",
+            "file_name": "statement.pdf",
+            "transactions": rows,
+            "count": len(rows),
+            "account_identifier": "40702810000000000001",
+        }
+        t_json, _ = _best_of(lambda: _stdlib_dumps(content), args.repeat)
+        t_orjson, body = _best_of(lambda: orjson.dumps(content), args.repeat)
+        line = [size, t_json * 1000, t_orjson * 1000, len(body) / 1024]
+        for enc in encodings:
+            t_enc, packed = _best_of(lambda: compress(body, enc), args.repeat)
+            line += [t_enc * 1000, len(packed) / 1024]
+        print(" | ".join(f"{v:>10}" if isinstance(v, int) else f"{v:>10.2f}" for v in line))
+
+    print(f"\ngzip level {settings.GZIP_LEVEL}, zstd level {settings.ZSTD_LEVEL}, "
+          f"compression threshold {settings.COMPRESS_MIN_BYTES} bytes")
+    if zstandard is None:
+        print("zstandard is not installed; zstd columns skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""Synthetic statement data for benchmarks.
+
+Everything here is generated deterministically from a seed, so benchmark
+runs are comparable and need no real customer statements.
+"""
+
+import random
+import zlib
+from datetime import date, timedelta
+from typing import Any, Optional
+
+COUNTERPARTIES = [
+    "ООО «Ромашка»",
+    "ИП Иванов Иван Иванович",
+    "АО «ТБанк»",
+    "ПАО Сбербанк",
+    "ООО «Пятёрочка Ритейл»",
+    "ООО «Яндекс.Такси»",
+    "Петров Пётр Петрович",
+]
+PURPOSES = [
+    "Оплата по счёту № {n} от {d} за поставку товара. В том числе НДС 20 % - {v} руб.",
+    "Перевод для Петров П. П. Операция по карте ****{c}",
+    "Заработная плата за {m} по реестру № {n}. НДС не облагается",
+    "Аренда нежилого помещения по договору № {n} за {m}. Без НДС",
+    "Оплата товаров и услуг. ПЯТЁРОЧКА Москва RUS. Операция по счёту ****{c}",
+    "Проценты на остаток за {m}",
+]
+MONTHS = ["январь", "февраль", "март", "апрель", "май", "июнь"]
+
+
+def synthetic_transactions(count: int, seed: int = 1) -> list[dict[str, Any]]:
+    """Transaction dicts in the /parse wire format."""
+    rnd = random.Random(seed)
+    start = date(2026, 1, 1)
+    balance = 1_000_000.0
+    rows: list[dict[str, Any]] = []
+    for i in range(count):
+        dt = start + timedelta(days=i * 180 // max(count, 1))
+        amount = round(rnd.uniform(10, 250_000), 2)
+        income = rnd.random() < 0.3
+        balance += amount if income else -amount
+        purpose = rnd.choice(PURPOSES).format(
+            n=rnd.randint(1, 99999),
+            d=dt.strftime("%d.%m.%Y"),
+            v=round(amount / 6, 2),
+            c=rnd.randint(1000, 9999),
+            m=rnd.choice(MONTHS),
+        )
+        rows.append({
+            "date": dt.isoformat(),
+            "time": f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}",
+            "amount": str(amount),
+            "direction": "income" if income else "expense",
+            "counterparty": rnd.choice(COUNTERPARTIES),
+            "purpose": purpose,
+            "balance": str(round(balance, 2)),
+        })
+    return rows
+
+
+# ========== Synthetic statement PDFs ==========
+#
+# A tiny PDF writer: one simple font with a cp1251-style byte encoding and a
+# ToUnicode CMap, ruled or borderless tables, FlateDecode content streams.
+# Layouts follow what the parsers in app/parsers expect for each bank.
+
+PAGE_W, PAGE_H = 595, 842
+FONT_SIZE = 7
+CHAR_W = 0.5 * FONT_SIZE  # every glyph is 500/1000 em wide
+LINE_H = 9
+ROW_H = 2 * LINE_H + 4
+
+# Byte codes for characters outside ASCII: Cyrillic at cp1251 positions
+_EXTRA = {chr(0x0410 + i): 0xC0 + i for i in range(64)}
+_EXTRA.update({"Ё": 0xA8, "ё": 0xB8, "№": 0xB9, "₽": 0x81, "«": 0xAB, "»": 0xBB, "\u00a0": 0xA0})
+_CODE_TO_CHAR = {code: ch for ch, code in _EXTRA.items()}
+
+
+def _encode(text: str) -> bytes:
+    out = bytearray()
+    for ch in text:
+        if ch in _EXTRA:
+            out.append(_EXTRA[ch])
+        elif 32 <= ord(ch) < 127:
+            out.append(ord(ch))
+        else:
+            out.append(ord("?"))
+    return bytes(out)
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = _encode(text)
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _to_unicode_cmap() -> bytes:
+    entries = [(c, c) for c in range(32, 127)]
+    entries += [(code, ord(ch)) for code, ch in sorted(_CODE_TO_CHAR.items())]
+    lines = [
+        b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+        b"/CMapName /FixtureCyr def /CMapType 2 def",
+        b"1 begincodespacerange <00> <FF> endcodespacerange",
+    ]
+    for i in range(0, len(entries), 100):
+        chunk = entries[i:i + 100]
+        lines.append(b"%d beginbfchar" % len(chunk))
+        lines += [b"<%02X> <%04X>" % (code, uni) for code, uni in chunk]
+        lines.append(b"endbfchar")
+    lines.append(b"endcmap CMapName currentdict /CMap defineresource pop end end")
+    return b"\n".join(lines)
+
+
+class _Canvas:
+    def __init__(self) -> None:
+        self.ops: list[bytes] = []
+
+    def text(self, x: float, y: float, s: str) -> None:
+        self.ops.append(b"BT /F1 %d Tf %.2f %.2f Td %s Tj ET" % (FONT_SIZE, x, y, _pdf_string(s)))
+
+    def line(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        self.ops.append(b"%.2f %.2f m %.2f %.2f l S" % (x1, y1, x2, y2))
+
+    def content(self) -> bytes:
+        return b"0.5 w\n" + b"\n".join(self.ops) + b"\n"
+
+
+def _signature_block(seed: int) -> bytes:
+    """Sber-style e-signature stamp below the table: certificate text and a QR."""
+    c = _Canvas()
+    lines = [
+        "СВЕДЕНИЯ О СЕРТИФИКАТЕ ЭП",
+        f"Сертификат: {seed:08X}A1B2C3D4E5F60718293A4B5C6D7E8F90",
+        "Владелец: ПАО Сбербанк",
+        "Действителен: с 01.01.2026 по 01.01.2027",
+        "Проверить подпись: отсканируйте QR-код",
+    ]
+    for i, text in enumerate(lines):
+        c.text(40, 78 - i * LINE_H, text)
+    rnd = random.Random(seed)
+    qr = [b"%.2f %.2f 2 2 re f" % (480 + 2 * (k % 25), 28 + 2 * (k // 25))
+          for k in range(25 * 25) if rnd.random() < 0.5]
+    return c.content() + b"\n".join(qr) + b"\n"
+
+
+def _embolden(content: bytes) -> bytes:
+    """Draw every text run twice, 0.3 pt apart: fake bold."""
+    out = []
+    for op in content.split(b"\n"):
+        out.append(op)
+        if op.startswith(b"BT "):
+            parts = op.split(b" ")
+            at = parts.index(b"Td")
+            parts[at - 2] = b"%.2f" % (float(parts[at - 2]) + 0.3)
+            out.append(b" ".join(parts))
+    return b"\n".join(out)
+
+
+def _build_pdf(pages: list[bytes]) -> bytes:
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def stream(data: bytes) -> bytes:
+        packed = zlib.compress(data)
+        return b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(packed) + packed + b"\nendstream"
+
+    cmap_id = add(stream(_to_unicode_cmap()))
+    widths = b" ".join([b"500"] * 224)
+    font_id = add(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /FixtureSans /FirstChar 32 /LastChar 255 "
+        b"/Widths [" + widths + b"] /ToUnicode %d 0 R >>" % cmap_id
+    )
+    pages_id = len(objects) + 2 * len(pages) + 1
+    kids = []
+    for content in pages:
+        stream_id = add(stream(content))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_W, PAGE_H, font_id, stream_id)
+        ))
+    add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref,
+    )
+    return bytes(out)
+
+
+def _wrap(text: str, width: float, lines: int = 2) -> list[str]:
+    per_line = max(1, int(width / CHAR_W) - 1)
+    return [text[i:i + per_line] for i in range(0, len(text), per_line)][:lines]
+
+
+def _ru_amount(value: float) -> str:
+    whole, frac = f"{value:.2f}".split(".")
+    groups = []
+    while whole:
+        groups.insert(0, whole[-3:])
+        whole = whole[:-3]
+    return " ".join(groups) + "," + frac
+
+
+def _table_pages(
+    title: list[str],
+    header: list[str],
+    widths: list[float],
+    rows: list[list[str]],
+    per_page: int,
+    subheader: Optional[list[str]] = None,
+    ruled: bool = True,
+    repeat_header: bool = True,
+) -> list[bytes]:
+    """Lay rows out as a table, with the header on every page or the first only."""
+    x0 = (PAGE_W - sum(widths)) / 2
+    xs = [x0]
+    for w in widths:
+        xs.append(xs[-1] + w)
+    head_rows = [header] + ([subheader] if subheader else [])
+    pages = []
+    for start in range(0, max(len(rows), 1), per_page):
+        c = _Canvas()
+        y = PAGE_H - 40
+        for t in title:
+            c.text(x0, y, t)
+            y -= LINE_H + 2
+        y -= 10
+        top = y
+        page_head = head_rows if start == 0 or repeat_header else []
+        for row in page_head + rows[start:start + per_page]:
+            for i, cell in enumerate(row):
+                for k, part in enumerate(_wrap(cell, widths[i])):
+                    c.text(xs[i] + 2, y - LINE_H * (k + 1), part)
+            y -= ROW_H
+            if ruled:
+                c.line(xs[0], y, xs[-1], y)
+        if ruled:
+            c.line(xs[0], top, xs[-1], top)
+            for x in xs:
+                c.line(x, top, x, y)
+        pages.append(c.content())
+    return pages
+
+
+def _text_pages(title: list[str], blocks: list[list[str]], per_page: int) -> list[bytes]:
+    """Lay out line-oriented blocks (Sber personal statements)."""
+    pages = []
+    for start in range(0, max(len(blocks), 1), per_page):
+        c = _Canvas()
+        y = PAGE_H - 40
+        if start == 0:
+            for t in title:
+                c.text(30, y, t)
+                y -= LINE_H + 2
+        for blk in blocks[start:start + per_page]:
+            for ln in blk:
+                c.text(30, y, ln)
+                y -= LINE_H + 1
+            y -= 3
+        pages.append(c.content())
+    return pages
+
+
+# Accounts of the "sber_multi" layout; "sber" is the first alone
+SBER_ACCOUNTS = ["40702810938000012345", "40702810538000067890", "40802810100000004242"]
+
+# Rows per page for each fixture layout
+ROWS_PER_PAGE = {
+    "sber": 30,
+    "sber_multi": 30,
+    "sber_personal": 30,
+    "tbank": 30,
+    "tbank_text": 30,
+    "tbank_deposit": 30,
+    "ozon": 30,
+}
+
+
+def statement_pdf(bank: str, pages: int = 1, seed: int = 1, repeat_header: bool = True,
+                  bold: bool = False, signed: bool = False) -> bytes:
+    """Generate a synthetic statement PDF with ``pages`` pages of rows.
+
+    ``bank`` is a PARSERS key, or "sber_personal" (text-based Sber layout),
+    "sber_multi" (Sber business statement of ``SBER_ACCOUNTS``, in equal
+    sections of pages) or "tbank_text" (borderless T-Bank layout parsed by
+    the text fallback).
+    Without ``repeat_header`` table layouts print the header on page 1 only.
+    ``bold`` draws every glyph twice; ``signed`` stamps every page with an
+    e-signature certificate block and QR code below the rows.
+    """
+    per_page = ROWS_PER_PAGE[bank]
+    txs = synthetic_transactions(per_page * pages, seed=seed)
+
+    def date_ru(tx: dict[str, Any]) -> str:
+        return ".".join(reversed(tx["date"].split("-")))
+
+    def amount(tx: dict[str, Any], key: str = "amount") -> str:
+        return _ru_amount(float(tx[key]))
+
+    if bank in ("sber", "sber_multi"):
+        rows = [[
+            f"{date_ru(tx)} {tx['time']}",
+            tx["counterparty"],
+            tx["purpose"],
+            amount(tx) if tx["direction"] == "expense" else "",
+            amount(tx) if tx["direction"] == "income" else "",
+            amount(tx, "balance"),
+        ] for tx in txs]
+        accounts = SBER_ACCOUNTS if bank == "sber_multi" else SBER_ACCOUNTS[:1]
+        share = -(-pages // len(accounts)) * per_page
+        content = []
+        for k, account in enumerate(accounts):
+            content += _table_pages(
+                ["ПАО Сбербанк", f"Выписка по счёту {account}"],
+                ["Дата операции", "Контрагент", "Назначение платежа", "Дебет", "Кредит", "Остаток"],
+                [62, 110, 210, 60, 60, 63], rows[k * share:(k + 1) * share], per_page,
+                repeat_header=repeat_header,
+            )
+    elif bank == "sber_personal":
+        blocks = []
+        for i, tx in enumerate(txs):
+            sign = "+" if tx["direction"] == "income" else ""
+            blocks.append([
+                f"{date_ru(tx)} {tx['time']} {100000 + i} Прочие операции "
+                f"{sign}{amount(tx)} {amount(tx, 'balance')}",
+                f"{date_ru(tx)} {tx['purpose'][:100]}",
+            ])
+        content = _text_pages(
+            ["ПАО Сбербанк", "Выписка по платёжному счёту", "Номер счёта 40817 810 6 3812 1486773"],
+            blocks, per_page,
+        )
+    elif bank in ("tbank", "tbank_text"):
+        rows = [[
+            f"{date_ru(tx)} {tx['time']}",
+            date_ru(tx),
+            f"{'+' if tx['direction'] == 'income' else '-'}{amount(tx)} ₽",
+            tx["purpose"],
+            "*1234",
+        ] for tx in txs]
+        content = _table_pages(
+            ["АО «ТБанк»", "Справка о движении средств по карте *1234"],
+            ["Дата операции", "Дата списания", "Сумма операции", "Описание операции", "Номер карты"],
+            [70, 60, 80, 290, 60], rows, per_page, ruled=(bank == "tbank"),
+            repeat_header=repeat_header,
+        )
+    elif bank == "tbank_deposit":
+        rows = [[
+            date_ru(tx),
+            tx["purpose"],
+            f"{'' if tx['direction'] == 'income' else '-'}{amount(tx)}",
+            amount(tx, "balance"),
+        ] for tx in txs]
+        content = _table_pages(
+            ["АО «ТБанк»", "Выписка по вкладу. Номер договора 8123456789"],
+            ["Дата", "Описание операции", "Сумма", "Остаток"],
+            [70, 320, 80, 80], rows, per_page,
+            repeat_header=repeat_header,
+        )
+    elif bank == "ozon":
+        rows = [[
+            f"{date_ru(tx)} {tx['time']}",
+            str(10000 + i),
+            tx["purpose"],
+            f"{'+' if tx['direction'] == 'income' else '-'}{amount(tx)}",
+        ] for i, tx in enumerate(txs)]
+        content = _table_pages(
+            ["ООО «ОЗОН Банк»", "Номер счёта 40817810500000012345"],
+            ["Дата операции", "Документ", "Назначение платежа", "Сумма операции"],
+            [80, 60, 320, 90], rows, per_page, subheader=["", "", "", "в валюте счёта"],
+            repeat_header=repeat_header,
+        )
+    else:
+        raise ValueError(f"Unknown fixture layout: {bank}")
+
+    if signed:
+        content = [page + _signature_block(seed + i) for i, page in enumerate(content)]
+    if bold:
+        content = [_embolden(page) for page in content]
+    return _build_pdf(content)
+
+
+def parser_code(bank: str) -> str:
+    """PARSERS key that handles a fixture layout."""
+    return {"sber_multi": "sber", "sber_personal": "sber", "tbank_text": "tbank"}.get(bank, bank)
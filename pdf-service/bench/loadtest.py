@@ -0,0 +1,506 @@
+"""Concurrent end-to-end load test for the PDF service.
+
+Replays a weighted mix of bank layouts and statement sizes against /parse
+at a target request rate (open loop) or concurrency (closed loop) and
+reports throughput, latency percentiles, error rate and server RSS over
+time. Runs fully offline: statements come from ``bench.fixtures``, and the
+service can be started locally with a given worker/pool configuration.
+
+Every request carries unique bytes so identical uploads are not coalesced
+into one parse by the service's single-flight layer; ``--duplicates`` sends
+that share of requests byte-identical on purpose, and the summary reports
+how many requests the service coalesced.
+
+    # start uvicorn with 2 workers, 20 req/s for 60 s
+    python -m bench.loadtest --spawn --uvicorn-workers 2 --rps 20 --duration 60
+
+    # closed loop against a running instance, save results for comparison
+    python -m bench.loadtest --url http://127.0.0.1:8080 --server-pid 1234 \\
+        --concurrency 8 --label pool4 --json pool4.json
+
+    python -m bench.loadtest --compare pool2.json pool4.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from .fixtures import parser_code, statement_pdf
+
+DEFAULT_MIX = "ozon:1:4,tbank:3:3,sber:10:2,sber_personal:5:1,tbank_text:20:1,sber:60:0.5"
+
+
+@dataclass
+class Sample:
+    layout: str
+    pages: int
+    started: float
+    latency: float
+    status: int
+    error: Optional[str] = None
+
+
+@dataclass
+class Run:
+    label: str
+    config: dict[str, Any]
+    samples: list[Sample] = field(default_factory=list)
+    rss: list[tuple[float, int]] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+    # Requests the service answered from another request's in-flight parse
+    coalesced: Optional[float] = None
+
+
+# ========== Workload ==========
+
+def parse_mix(spec: str) -> list[tuple[str, int, float]]:
+    """"layout:pages:weight,..." → [(layout, pages, weight)]."""
+    mix = []
+    for item in spec.split(","):
+        layout, pages, weight = item.strip().split(":")
+        mix.append((layout, int(pages), float(weight)))
+    return mix
+
+
+def build_corpus(mix: list[tuple[str, int, float]]) -> dict[tuple[str, int], bytes]:
+    corpus = {}
+    for layout, pages, _ in mix:
+        if (layout, pages) not in corpus:
+            corpus[(layout, pages)] = statement_pdf(layout, pages, seed=pages)
+    return corpus
+
+
+def request_bytes(pdf: bytes, duplicate: bool) -> bytes:
+    """The corpus PDF, made unique by a trailing comment unless ``duplicate``.
+
+    Readers look for ``startxref`` from the end of the file and skip
+    comments, so the trailer changes the content hash but not the parse.
+    """
+    if duplicate:
+        return pdf
+    return pdf + b"%loadtest " + uuid.uuid4().hex.encode() + b"\n"
+
+
+# ========== Minimal async HTTP client ==========
+
+def _multipart(pdf: bytes, fields: dict[str, str]) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="statement.pdf"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n".encode() + pdf + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+async def post_parse(
+    host: str, port: int, pdf: bytes, fields: dict[str, str], timeout: float,
+) -> tuple[int, bytes]:
+    body, content_type = _multipart(pdf, fields)
+    head = (
+        f"POST /parse HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\nAccept-Encoding: gzip\r\nConnection: close\r\n\r\n"
+    ).encode()
+
+    async def _roundtrip() -> tuple[int, bytes]:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(head + body)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        status_line, _, rest = raw.partition(b"\r\n")
+        return int(status_line.split()[1]), rest
+
+    return await asyncio.wait_for(_roundtrip(), timeout)
+
+
+async def get_json(host: str, port: int, path: str, timeout: float = 5.0) -> Any:
+    async def _roundtrip() -> Any:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise OSError(head.split(b"\r\n", 1)[0].decode(errors="replace"))
+        return json.loads(body)
+
+    return await asyncio.wait_for(_roundtrip(), timeout)
+
+
+async def coalesced_count(host: str, port: int) -> Optional[float]:
+    """The service's ``singleflight.coalesced`` counter, None if unavailable.
+
+    With several uvicorn workers this is the count of whichever worker
+    answers, so it is a lower bound.
+    """
+    try:
+        snapshot = await get_json(host, port, "/metrics")
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return None
+    return sum(
+        v for k, v in snapshot.get("counters", {}).items()
+        if k.startswith("singleflight.coalesced")
+    )
+
+
+# ========== Server process ==========
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(uvicorn_workers: int, env: dict[str, str]) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(uvicorn_workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(
+        cmd,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, **env},
+        start_new_session=True,
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(host: str, port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            raw = await reader.read()
+            writer.close()
+            if raw.startswith(b"HTTP/1.1 200"):
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("PDF service did not become ready")
+
+
+def _process_tree(pid: int) -> list[int]:
+    """pid and all of its descendants (Linux /proc)."""
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        tree.append(p)
+        stack.extend(children.get(p, []))
+    return tree
+
+
+def tree_rss(pid: int) -> int:
+    """Resident set size of a process tree in bytes."""
+    page = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for p in _process_tree(pid):
+        try:
+            with open(f"/proc/{p}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+async def sample_rss(run: Run, pid: int, interval: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        run.rss.append((time.monotonic() - run.started, tree_rss(pid)))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ========== Load generation ==========
+
+async def one_request(
+    run: Run,
+    host: str,
+    port: int,
+    layout: str,
+    pages: int,
+    pdf: bytes,
+    tenants: int,
+    timeout: float,
+    duplicate: bool = False,
+) -> None:
+    pdf = request_bytes(pdf, duplicate)
+    fields = {"bank_code": parser_code(layout)}
+    if tenants:
+        fields["tenant_id"] = f"tenant-{random.randrange(tenants)}"
+    t0 = time.monotonic()
+    try:
+        status, _ = await post_parse(host, port, pdf, fields, timeout)
+        error = None if status == 200 else f"HTTP {status}"
+    except (OSError, asyncio.TimeoutError) as e:
+        status, error = 0, type(e).__name__
+    run.samples.append(Sample(layout, pages, t0 - run.started, time.monotonic() - t0, status, error))
+
+
+async def generate(
+    run: Run,
+    url: str,
+    corpus: dict[tuple[str, int], bytes],
+    mix: list[tuple[str, int, float]],
+    rps: Optional[float],
+    concurrency: Optional[int],
+    duration: float,
+    tenants: int,
+    timeout: float,
+    burst: Optional[tuple[float, float, float]] = None,
+    duplicates: float = 0.0,
+) -> None:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    choices = [(layout, pages) for layout, pages, _ in mix]
+    weights = [w for _, _, w in mix]
+    rnd = random.Random(42)
+    deadline = run.started + duration
+
+    def pick() -> tuple[str, int]:
+        return rnd.choices(choices, weights)[0]
+
+    def duplicate() -> bool:
+        return duplicates > 0 and rnd.random() < duplicates
+
+    if concurrency:
+        async def worker() -> None:
+            while time.monotonic() < deadline:
+                layout, pages = pick()
+                await one_request(run, host, port, layout, pages, corpus[(layout, pages)],
+                                  tenants, timeout, duplicate())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return
+
+    tasks = []
+    assert rps
+    while (now := time.monotonic()) < deadline:
+        rate = rps
+        if burst:
+            period, duty, factor = burst
+            if (now - run.started) % period < period * duty:
+                rate = rps * factor
+        layout, pages = pick()
+        tasks.append(asyncio.create_task(
+            one_request(run, host, port, layout, pages, corpus[(layout, pages)],
+                        tenants, timeout, duplicate())
+        ))
+        await asyncio.sleep(rnd.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+
+# ========== Reporting ==========
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(run: Run) -> dict[str, Any]:
+    elapsed = max(run.finished - run.started, 1e-9)
+    ok = [s.latency for s in run.samples if s.error is None]
+    errors = [s for s in run.samples if s.error is not None]
+    by_layout: dict[str, dict[str, Any]] = {}
+    for key in sorted({f"{s.layout}:{s.pages}" for s in run.samples}):
+        lat = [s.latency for s in run.samples if f"{s.layout}:{s.pages}" == key and s.error is None]
+        n = sum(1 for s in run.samples if f"{s.layout}:{s.pages}" == key)
+        by_layout[key] = {
+            "requests": n,
+            "errors": n - len(lat),
+            "p50": _pct(lat, 0.50),
+            "p99": _pct(lat, 0.99),
+        }
+    rss = [r for _, r in run.rss]
+    return {
+        "label": run.label,
+        "config": run.config,
+        "requests": len(run.samples),
+        "throughput_rps": len(ok) / elapsed,
+        "error_rate": len(errors) / max(len(run.samples), 1),
+        "errors": sorted({s.error for s in errors if s.error}),
+        "latency_s": {
+            "p50": _pct(ok, 0.50),
+            "p95": _pct(ok, 0.95),
+            "p99": _pct(ok, 0.99),
+            "max": max(ok, default=0.0),
+        },
+        "coalesced": run.coalesced,
+        "by_layout": by_layout,
+        "rss_mb": {
+            "min": min(rss, default=0) / 2**20,
+            "max": max(rss, default=0) / 2**20,
+            "timeline": [(round(t, 1), round(r / 2**20, 1)) for t, r in run.rss],
+        },
+    }
+
+
+def print_summary(summary: dict[str, Any]) -> None:
+    lat = summary["latency_s"]
+    print(f"== {summary['label']} {json.dumps(summary['config'], ensure_ascii=False)}")
+    print(f"requests {summary['requests']}  throughput {summary['throughput_rps']:.2f} req/s  "
+          f"errors {summary['error_rate']:.1%} {', '.join(summary['errors'])}")
+    print(f"latency p50 {lat['p50'] * 1000:.0f} ms  p95 {lat['p95'] * 1000:.0f} ms  "
+          f"p99 {lat['p99'] * 1000:.0f} ms  max {lat['max'] * 1000:.0f} ms")
+    if summary.get("coalesced") is not None:
+        print(f"coalesced by single-flight {summary['coalesced']:.0f} "
+              f"of {summary['requests']} requests")
+    for key, row in summary["by_layout"].items():
+        print(f"  {key:<20} n={row['requests']:<5} err={row['errors']:<4} "
+              f"p50 {row['p50'] * 1000:>7.0f} ms  p99 {row['p99'] * 1000:>7.0f} ms")
+    rss = summary["rss_mb"]
+    if rss["timeline"]:
+        print(f"server RSS {rss['min']:.0f}–{rss['max']:.0f} MB")
+        step = max(1, len(rss["timeline"]) // 20)
+        print("  " + "  ".join(f"{t:.0f}s:{r:.0f}" for t, r in rss["timeline"][::step]))
+
+
+def print_comparison(summaries: list[dict[str, Any]]) -> None:
+    cols = ["label", "req/s", "err", "p50 ms", "p95 ms", "p99 ms", "RSS max MB", "coalesced"]
+    print(" | ".join(f"{c:>12}" for c in cols))
+    for s in summaries:
+        lat = s["latency_s"]
+        print(" | ".join(f"{v:>12}" for v in [
+            s["label"][:12],
+            f"{s['throughput_rps']:.2f}",
+            f"{s['error_rate']:.1%}",
+            f"{lat['p50'] * 1000:.0f}",
+            f"{lat['p95'] * 1000:.0f}",
+            f"{lat['p99'] * 1000:.0f}",
+            f"{s['rss_mb']['max']:.0f}",
+            "-" if s.get("coalesced") is None else f"{s['coalesced']:.0f}",
+        ]))
+
+
+# ========== Entry point ==========
+
+async def run_load(args: argparse.Namespace) -> dict[str, Any]:
+    env = dict(kv.split("=", 1) for kv in args.env)
+    mix = parse_mix(args.mix)
+    corpus = build_corpus(mix)
+    burst = tuple(float(x) for x in args.burst.split(":")) if args.burst else None
+
+    proc = None
+    url, server_pid = args.url, args.server_pid
+    if args.spawn:
+        proc, url = spawn_server(args.uvicorn_workers, env)
+        server_pid = proc.pid
+    parts = urlsplit(url)
+
+    run = Run(label=args.label, config={
+        "mix": args.mix, "rps": args.rps, "concurrency": args.concurrency,
+        "burst": args.burst, "uvicorn_workers": args.uvicorn_workers if args.spawn else None,
+        "tenants": args.tenants, "duplicates": args.duplicates, "env": env,
+    })
+    stop = asyncio.Event()
+    try:
+        host, port = parts.hostname or "127.0.0.1", parts.port or 80
+        await wait_ready(host, port)
+        coalesced_before = await coalesced_count(host, port)
+        run.started = time.monotonic()
+        sampler = (
+            asyncio.create_task(sample_rss(run, server_pid, args.rss_interval, stop))
+            if server_pid else None
+        )
+        await generate(run, url, corpus, mix, args.rps, args.concurrency,
+                       args.duration, args.tenants, args.timeout, burst, args.duplicates)
+        run.finished = time.monotonic()
+        coalesced_after = await coalesced_count(host, port)
+        if coalesced_before is not None and coalesced_after is not None:
+            run.coalesced = coalesced_after - coalesced_before
+        stop.set()
+        if sampler:
+            await sampler
+    finally:
+        if proc is not None:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=30)
+    return summarize(run)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = ap.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8080", help="running service to test")
+    target.add_argument("--spawn", action="store_true", help="start a local uvicorn for the run")
+    ap.add_argument("--server-pid", type=int, help="pid to sample RSS from when using --url")
+    ap.add_argument("--uvicorn-workers", type=int, default=1)
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="environment for the spawned service (pool settings etc.)")
+    load = ap.add_mutually_exclusive_group()
+    load.add_argument("--rps", type=float, help="open-loop Poisson arrival rate")
+    load.add_argument("--concurrency", type=int, help="closed-loop number of clients")
+    ap.add_argument("--burst", metavar="PERIOD:DUTY:FACTOR",
+                    help="with --rps: multiply the rate by FACTOR for DUTY of every PERIOD seconds")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="layout:pages:weight,...")
+    ap.add_argument("--duplicates", type=float, default=0.0, metavar="SHARE",
+                    help="share of requests (0-1) sent byte-identical to coalesce in the service")
+    ap.add_argument("--tenants", type=int, default=0, help="spread requests over N tenant ids")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--rss-interval", type=float, default=1.0)
+    ap.add_argument("--label", default="run")
+    ap.add_argument("--json", help="write the summary to this file")
+    ap.add_argument("--compare", nargs="+", metavar="JSON", help="compare saved summaries and exit")
+    args = ap.parse_args()
+
+    if args.compare:
+        summaries = []
+        for path in args.compare:
+            with open(path) as f:
+                summaries.append(json.load(f))
+        print_comparison(summaries)
+        return
+
+    if not args.rps and not args.concurrency:
+        args.concurrency = 4
+
+    summary = asyncio.run(run_load(args))
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+from app.parsers.onec import parse_onec
+
+OWN = "40702810000000000001"
+OTHER = "40702810900000000777"
+
+
+def _export(*documents: str) -> bytes:
+    header = f"1CClientBankExchange\nКодировка=Windows\nРасчСчет={OWN}\n"
+    return (header + "".join(documents) + "КонецФайла\n").encode("cp1251")
+
+
+def _document(payer: str, payee: str, **dates: str) -> str:
+    lines = [
+        "СекцияДокумент=Платежное поручение",
+        "Дата=03.02.2026",
+        "Сумма=1500.00",
+        f"ПлательщикСчет={payer}",
+        f"Плательщик1={'ИП Мы' if payer == OWN else 'ООО «Ромашка»'}",
+        f"ПолучательСчет={payee}",
+        f"Получатель1={'ИП Мы' if payee == OWN else 'ООО «Ромашка»'}",
+        "НазначениеПлатежа=Оплата по счёту 12",
+        *(f"{key}={value}" for key, value in dates.items()),
+        "КонецДокумента",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def test_incoming_payment_with_both_dates_is_income():
+    doc = _document(OTHER, OWN, ДатаСписано="04.02.2026", ДатаПоступило="05.02.2026")
+    [tx] = parse_onec(_export(doc))["transactions"]
+    assert tx.direction == "income"
+    assert tx.counterparty == "ООО «Ромашка»"
+    assert tx.date == date(2026, 2, 5)
+    assert tx.amount == Decimal("1500.00")
+
+
+def test_outgoing_payment_with_both_dates_is_expense():
+    doc = _document(OWN, OTHER, ДатаСписано="04.02.2026", ДатаПоступило="05.02.2026")
+    [tx] = parse_onec(_export(doc))["transactions"]
+    assert tx.direction == "expense"
+    assert tx.counterparty == "ООО «Ромашка»"
+    assert tx.date == date(2026, 2, 4)
+
+
+def test_dates_decide_when_no_account_is_ours():
+    doc = _document(OTHER, "40702810900000000888", ДатаПоступило="05.02.2026")
+    [tx] = parse_onec(_export(doc))["transactions"]
+    assert tx.direction == "income"
@@ -0,0 +1,50 @@
+import io
+from datetime import datetime
+
+import openpyxl
+
+from app.parsers import parse_sber, parse_xlsx
+from bench.fixtures import SBER_ACCOUNTS, statement_pdf, synthetic_transactions
+
+PAGES = 2
+
+
+def _number(raw: str):
+    # Whole amounts are stored as integers, the rest as floats, as Excel does
+    value = float(raw)
+    return int(value) if value.is_integer() else value
+
+
+def _sber_xlsx() -> bytes:
+    """The rows of ``statement_pdf("sber", PAGES)`` as an XLSX export with numeric cells."""
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append(["ПАО Сбербанк"])
+    sheet.append([f"Выписка по счёту {SBER_ACCOUNTS[0]}"])
+    sheet.append(["Дата операции", "Контрагент", "Назначение платежа", "Дебет", "Кредит", "Остаток"])
+    for tx in synthetic_transactions(30 * PAGES, seed=1):
+        amount = _number(tx["amount"])
+        sheet.append([
+            datetime.fromisoformat(f"{tx['date']}T{tx['time']}"),
+            tx["counterparty"],
+            tx["purpose"],
+            amount if tx["direction"] == "expense" else None,
+            amount if tx["direction"] == "income" else None,
+            _number(tx["balance"]),
+        ])
+    out = io.BytesIO()
+    book.save(out)
+    return out.getvalue()
+
+
+def test_xlsx_export_matches_pdf_statement():
+    from_pdf = parse_sber(statement_pdf("sber", PAGES, seed=1))
+    from_xlsx = parse_xlsx(_sber_xlsx(), "sber")
+
+    assert from_xlsx["account_identifier"] == from_pdf["account_identifier"]
+    pdf_rows = [tx.to_wire() for tx in from_pdf["transactions"]]
+    xlsx_rows = [tx.to_wire() for tx in from_xlsx["transactions"]]
+    assert len(xlsx_rows) == len(pdf_rows) == 30 * PAGES
+    for pdf_row, xlsx_row in zip(pdf_rows, xlsx_rows):
+        for key in ("date", "time", "amount", "direction", "balance"):
+            assert xlsx_row[key] == pdf_row[key], key
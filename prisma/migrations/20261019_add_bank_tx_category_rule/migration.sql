@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "BankTransaction" ADD COLUMN "categoryRuleId" TEXT;
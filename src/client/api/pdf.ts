@@ -9,7 +9,12 @@ export interface ParsedTransaction {
   counterparty: string | null;
   purpose: string | null;
   balance: string | null;
-  dedupeKey: string;
+  accountIdentifier: string | null;
+  // null: a statement account not mapped to one of the entity's accounts
+  accountId: string | null;
+  dedupeKey?: string;
+  ddsArticle?: string | null;
+  categoryRuleId?: string | null;
   isDuplicate: boolean;
 }
 
@@ -21,11 +26,15 @@ export interface UploadResult {
   totalCount: number;
   duplicateCount: number;
   accountIdentifier: string | null;
+  accounts: Array<{ accountIdentifier: string | null; accountId: string | null; count: number }>;
+  pagesSkipped?: number;
 }
 
 export interface ConfirmResult {
   saved: number;
   skipped: number;
+  unmapped: number;
+  categorized: number;
   total: number;
 }
 
@@ -73,11 +82,18 @@ export interface TransactionFilters {
 }
 
 export const pdfApi = {
-  upload: async (file: File, accountId: string, bankCode: string): Promise<UploadResult> => {
+  upload: async (
+    file: File,
+    accountId: string,
+    bankCode: string,
+    period?: { from?: string; to?: string },
+  ): Promise<UploadResult> => {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("accountId", accountId);
     formData.append("bankCode", bankCode);
+    if (period?.from) formData.append("dateFrom", period.from);
+    if (period?.to) formData.append("dateTo", period.to);
 
     const token = getAccessToken();
     const res = await fetch("/api/pdf/upload", {
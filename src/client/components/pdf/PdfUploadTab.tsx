@@ -3,10 +3,11 @@ import { useTranslation } from "react-i18next";
 import { Upload, FileText, Check, AlertTriangle } from "lucide-react";
 import { entitiesApi } from "../../api/entities.js";
 import { accountsApi } from "../../api/accounts.js";
-import { pdfApi, type ParsedTransaction, type UploadResult } from "../../api/pdf.js";
+import { pdfApi, type ConfirmResult, type UploadResult } from "../../api/pdf.js";
 import { useAuthStore } from "../../stores/auth.js";
 import { Button, Select } from "../ui/index.js";
 import type { Entity, Account } from "@shared/types.js";
+import UnmappedAccounts, { applyMapping, type AccountMapping } from "./UnmappedAccounts.js";
 
 const ALL_BANK_CODES = [
   { value: "sber", label: "Сбер" },
@@ -33,8 +34,9 @@ export default function PdfUploadTab() {
   // Preview state
   const [uploadResult, setUploadResult] = useState<UploadResult | null>(null);
   const [selected, setSelected] = useState<Set<number>>(new Set());
+  const [mapping, setMapping] = useState<AccountMapping>({});
   const [confirming, setConfirming] = useState(false);
-  const [confirmResult, setConfirmResult] = useState<{ saved: number; skipped: number } | null>(null);
+  const [confirmResult, setConfirmResult] = useState<ConfirmResult | null>(null);
 
   useEffect(() => {
     entitiesApi.list().then((data) => {
@@ -84,6 +86,7 @@ export default function PdfUploadTab() {
     try {
       const result = await pdfApi.upload(file, selectedAccount, bankCode);
       setUploadResult(result);
+      setMapping({});
 
       // Pre-select non-duplicate transactions
       const nonDupIndices = new Set<number>();
@@ -125,7 +128,7 @@ export default function PdfUploadTab() {
     setError("");
 
     try {
-      const selectedTxs = uploadResult.transactions.filter((_, i) => selected.has(i));
+      const selectedTxs = applyMapping(uploadResult.transactions.filter((_, i) => selected.has(i)), mapping);
       const result = await pdfApi.confirm(uploadResult.pdfUploadId, selectedTxs);
       setConfirmResult(result);
       setStep("done");
@@ -140,6 +143,7 @@ export default function PdfUploadTab() {
     setStep("select");
     setUploadResult(null);
     setSelected(new Set());
+    setMapping({});
     setConfirmResult(null);
     setError("");
   }
@@ -243,6 +247,8 @@ export default function PdfUploadTab() {
             </div>
           </div>
 
+          <UnmappedAccounts result={uploadResult} accounts={accounts} mapping={mapping} onChange={setMapping} />
+
           <div className="table-wrap">
             <table className="table">
               <thead>
@@ -309,6 +315,7 @@ export default function PdfUploadTab() {
           <Check size={48} className="pdf-done-icon" />
           <h3>{t("pdf.success")}</h3>
           <p>{t("pdf.savedCount", { saved: confirmResult.saved, skipped: confirmResult.skipped })}</p>
+          {confirmResult.unmapped > 0 && <p>{t("pdf.unmappedCount", { count: confirmResult.unmapped })}</p>}
           <Button onClick={reset}>{t("pdf.uploadAnother")}</Button>
         </div>
       )}
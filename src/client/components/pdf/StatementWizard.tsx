@@ -3,10 +3,11 @@ import { useTranslation } from "react-i18next";
 import { X, ArrowLeft, Upload, FileText, Check, AlertTriangle, CreditCard, Landmark } from "lucide-react";
 import { entitiesApi } from "../../api/entities.js";
 import { accountsApi } from "../../api/accounts.js";
-import { pdfApi, type UploadResult } from "../../api/pdf.js";
+import { pdfApi, type ConfirmResult, type UploadResult } from "../../api/pdf.js";
 import { useAuthStore } from "../../stores/auth.js";
 import { Button } from "../ui/index.js";
 import type { Entity, Account } from "@shared/types.js";
+import UnmappedAccounts, { applyMapping, type AccountMapping } from "./UnmappedAccounts.js";
 
 type Step = "bank" | "upload" | "uploading" | "preview" | "done";
 
@@ -47,8 +48,13 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
 
   const [uploadResult, setUploadResult] = useState<UploadResult | null>(null);
   const [selected, setSelected] = useState<Set<number>>(new Set());
+  const [mapping, setMapping] = useState<AccountMapping>({});
   const [confirming, setConfirming] = useState(false);
-  const [confirmResult, setConfirmResult] = useState<{ saved: number; skipped: number } | null>(null);
+  const [confirmResult, setConfirmResult] = useState<ConfirmResult | null>(null);
+
+  // Unmatched statement accounts can go to any account of the upload's entity
+  const entityId = allAccounts.find((a) => a.id === accountId)?.entityId;
+  const entityAccounts = useMemo(() => allAccounts.filter((a) => a.entityId === entityId), [allAccounts, entityId]);
 
   // Load all accounts for user's entities on open
   useEffect(() => {
@@ -90,6 +96,7 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
     setError("");
     setUploadResult(null);
     setSelected(new Set());
+    setMapping({});
     setConfirmResult(null);
   }
 
@@ -115,6 +122,7 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
     try {
       const result = await pdfApi.upload(file, accountId, bank);
       setUploadResult(result);
+      setMapping({});
       const nonDup = new Set<number>();
       result.transactions.forEach((tx, i) => { if (!tx.isDuplicate) nonDup.add(i); });
       setSelected(nonDup);
@@ -159,7 +167,7 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
     setConfirming(true);
     setError("");
     try {
-      const selectedTxs = uploadResult.transactions.filter((_, i) => selected.has(i));
+      const selectedTxs = applyMapping(uploadResult.transactions.filter((_, i) => selected.has(i)), mapping);
       const result = await pdfApi.confirm(uploadResult.pdfUploadId, selectedTxs);
       setConfirmResult(result);
       setStep("done");
@@ -278,6 +286,7 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
                   </span>
                 </div>
               </div>
+              <UnmappedAccounts result={uploadResult} accounts={entityAccounts} mapping={mapping} onChange={setMapping} />
               <div className="table-wrap">
                 <table className="table">
                   <thead>
@@ -340,6 +349,7 @@ export default function StatementWizard({ open, onClose, onDone, initialFile, in
               <Check size={48} className="pdf-done-icon" />
               <h3>{t("pdf.success")}</h3>
               <p>{t("pdf.savedCount", { saved: confirmResult.saved, skipped: confirmResult.skipped })}</p>
+              {confirmResult.unmapped > 0 && <p>{t("pdf.unmappedCount", { count: confirmResult.unmapped })}</p>}
             </div>
           )}
         </div>
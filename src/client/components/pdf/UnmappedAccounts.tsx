@@ -0,0 +1,63 @@
+import { useTranslation } from "react-i18next";
+import { AlertTriangle } from "lucide-react";
+import type { ParsedTransaction, UploadResult } from "../../api/pdf.js";
+import { Select } from "../ui/index.js";
+import type { Account } from "@shared/types.js";
+
+// Account picked for each unmatched statement account, by its identifier
+export type AccountMapping = Record<string, string>;
+
+interface Props {
+  result: UploadResult;
+  accounts: Account[];
+  mapping: AccountMapping;
+  onChange: (mapping: AccountMapping) => void;
+}
+
+// Statement accounts of a multi-account upload that match none of the entity's accounts
+export function unmappedAccounts(result: UploadResult) {
+  return result.accounts.filter((a) => a.accountId === null);
+}
+
+// Rows of unmatched statement accounts get the account picked for them;
+// the ones left without an account are not saved by /confirm
+export function applyMapping(transactions: ParsedTransaction[], mapping: AccountMapping): ParsedTransaction[] {
+  return transactions.map((tx) => {
+    const picked = tx.accountId === null ? mapping[tx.accountIdentifier ?? ""] : undefined;
+    return picked ? { ...tx, accountId: picked } : tx;
+  });
+}
+
+export default function UnmappedAccounts({ result, accounts, mapping, onChange }: Props) {
+  const { t } = useTranslation();
+  const unmapped = unmappedAccounts(result);
+  if (unmapped.length === 0) return null;
+
+  const options = [
+    { value: "", label: t("pdf.unmappedSkip") },
+    ...accounts.map((a) => ({ value: a.id, label: a.name })),
+  ];
+
+  return (
+    <div className="pdf-unmapped">
+      <p className="pdf-unmapped__hint">
+        <AlertTriangle size={14} />
+        {t("pdf.unmappedHint")}
+      </p>
+      <div className="pdf-upload__fields">
+        {unmapped.map((a) => {
+          const key = a.accountIdentifier ?? "";
+          return (
+            <Select
+              key={key}
+              label={t("pdf.unmappedAccount", { identifier: a.accountIdentifier ?? "—", count: a.count })}
+              options={options}
+              value={mapping[key] ?? ""}
+              onChange={(e) => onChange({ ...mapping, [key]: e.target.value })}
+            />
+          );
+        })}
+      </div>
+    </div>
+  );
+}
@@ -215,6 +215,10 @@ export default {
     success: "Done!",
     savedCount: "Saved: {{saved}}, skipped duplicates: {{skipped}}",
     uploadAnother: "Upload Another",
+    unmappedHint: "The statement has accounts that match none of the entity's accounts. Pick where to save their transactions.",
+    unmappedAccount: "Statement account {{identifier}} ({{count}})",
+    unmappedSkip: "Don't save",
+    unmappedCount: "Not saved, no account picked: {{count}}",
     counterparty: "Counterparty",
     purpose: "Purpose",
     balance: "Balance",
@@ -215,6 +215,10 @@ export default {
     success: "Готово!",
     savedCount: "Сохранено: {{saved}}, пропущено дубликатов: {{skipped}}",
     uploadAnother: "Загрузить ещё",
+    unmappedHint: "В выписке есть счета, которых нет среди счетов ИП. Выберите, куда сохранить их операции.",
+    unmappedAccount: "Счёт в выписке {{identifier}} ({{count}})",
+    unmappedSkip: "Не сохранять",
+    unmappedCount: "Не сохранено, счёт не выбран: {{count}}",
     counterparty: "Контрагент",
     purpose: "Назначение",
     balance: "Остаток",
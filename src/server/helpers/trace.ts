@@ -0,0 +1,85 @@
+import crypto from "crypto";
+import { performance } from "perf_hooks";
+import type { Request, Response, NextFunction } from "express";
+
+// Stage timings of one statement upload, end to end. The W3C traceparent
+// sent to the PDF service makes its spans children of this upload; its
+// Server-Timing header reports its stages back, and the difference to the
+// fetch's wall time is the HTTP hop.
+
+const TRACEPARENT_RE = /^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$/;
+
+export interface UploadTrace {
+  traceId: string;
+  spanId: string;
+  // Stage → milliseconds, in the order recorded
+  stages: Map<string, number>;
+}
+
+// Express middleware: stamp the request's arrival before multer reads the body
+export function markReceived(_req: Request, res: Response, next: NextFunction) {
+  res.locals.receivedAt = performance.now();
+  next();
+}
+
+// Start the trace of an upload, continuing the caller's if it sent a valid
+// traceparent; the time since markReceived is the body upload (multer)
+export function startUploadTrace(req: Request, res: Response): UploadTrace {
+  const m = TRACEPARENT_RE.exec((req.header("traceparent") ?? "").trim().toLowerCase());
+  const trace: UploadTrace = {
+    traceId: m ? m[1] : crypto.randomBytes(16).toString("hex"),
+    spanId: crypto.randomBytes(8).toString("hex"),
+    stages: new Map(),
+  };
+  if (typeof res.locals.receivedAt === "number") {
+    trace.stages.set("upload", performance.now() - res.locals.receivedAt);
+  }
+  return trace;
+}
+
+export function traceparentOf(trace: UploadTrace): string {
+  return `00-${trace.traceId}-${trace.spanId}-01`;
+}
+
+// Run a stage and record its duration
+export async function timed<T>(trace: UploadTrace, stage: string, fn: () => Promise<T>): Promise<T> {
+  const started = performance.now();
+  try {
+    return await fn();
+  } finally {
+    trace.stages.set(stage, performance.now() - started);
+  }
+}
+
+// "queue;dur=3.1, parse;dur=812.4" → { queue: 3.1, parse: 812.4 }
+export function parseServerTiming(header: string | null): Record<string, number> {
+  const out: Record<string, number> = {};
+  for (const entry of (header ?? "").split(",")) {
+    const [name, ...params] = entry.trim().split(";");
+    const dur = params.map((p) => p.trim()).find((p) => p.startsWith("dur="));
+    if (name && dur) out[name] = Number(dur.slice(4));
+  }
+  return out;
+}
+
+// Record the PDF service's stages (pdf_*) and the HTTP hop: the call's wall
+// time ("stage") less the service's own total
+export function addUpstreamTiming(trace: UploadTrace, stage: string, header: string | null) {
+  const upstream = parseServerTiming(header);
+  for (const [name, dur] of Object.entries(upstream)) trace.stages.set(`pdf_${name}`, dur);
+  const wall = trace.stages.get(stage);
+  if (wall !== undefined && upstream.total !== undefined) {
+    trace.stages.set("hop", Math.max(0, wall - upstream.total));
+  }
+}
+
+// Server-Timing for the client and one JSON log line for the upload
+export function finishUploadTrace(trace: UploadTrace, res: Response, attributes: Record<string, unknown>) {
+  const stages = Object.fromEntries([...trace.stages].map(([k, v]) => [k, Math.round(v * 10) / 10]));
+  res.setHeader(
+    "Server-Timing",
+    Object.entries(stages).map(([k, v]) => `${k};dur=${v}`).join(", "),
+  );
+  res.setHeader("traceparent", traceparentOf(trace));
+  console.info(JSON.stringify({ trace: trace.traceId, span: trace.spanId, stages, ...attributes }));
+}
@@ -1,4 +1,5 @@
 import { Router, Request, Response } from "express";
+import crypto from "crypto";
 import multer from "multer";
 import { prisma } from "../prisma.js";
 import { authMiddleware } from "../middleware/auth.js";
@@ -8,28 +9,66 @@ import { config } from "../config.js";
 import { Prisma } from "@prisma/client";
 import { buildEntityFilter } from "../helpers/entityAccess.js";
 import { applyCategorizationRules } from "../helpers/categorize.js";
+import {
+  addUpstreamTiming, finishUploadTrace, markReceived, startUploadTrace, timed, traceparentOf,
+} from "../helpers/trace.js";
 
 const router = Router();
 router.use(authMiddleware);
 
+const BUSY_MESSAGE = "PDF service is busy, please retry shortly";
+
+// How long one readiness answer is reused across uploads
+const READY_CACHE_MS = 3000;
+
+// Retry-After (seconds) while the PDF service reports itself not ready
+// (saturated or still warming up), null when it is ready. An unreachable
+// or slow readiness probe does not block the upload: /parse decides.
+async function probeReadiness(): Promise<string | null> {
+  try {
+    const ready = await fetch(`${config.PDF_SERVICE_URL}/health/ready`, {
+      signal: AbortSignal.timeout(1000),
+    });
+    return ready.status === 503 ? ready.headers.get("retry-after") ?? "5" : null;
+  } catch {
+    return null;
+  }
+}
+
+// The service is probed at most once per READY_CACHE_MS: uploads in
+// between share the last answer, or the probe still in flight, instead of
+// each paying a round trip that /parse's own 503 already covers
+let readyProbe: { at: number; result: Promise<string | null> } | null = null;
+
+function pdfServiceBusy(): Promise<string | null> {
+  const now = Date.now();
+  if (!readyProbe || now - readyProbe.at > READY_CACHE_MS) {
+    readyProbe = { at: now, result: probeReadiness() };
+  }
+  return readyProbe.result;
+}
+
 const upload = multer({
   storage: multer.memoryStorage(),
   limits: { fileSize: 10 * 1024 * 1024 }, // 10MB
   fileFilter: (_req, file, cb) => {
-    if (file.mimetype === "application/pdf") {
+    // PDF statements, or the bank's 1C (.txt), CSV and XLSX exports of them
+    if (file.mimetype === "application/pdf" || /\.(txt|csv|xlsx)$/i.test(file.originalname)) {
       cb(null, true);
     } else {
-      cb(new Error("Only PDF files are allowed"));
+      cb(new Error("Only PDF statements or 1C/CSV/XLSX exports are allowed"));
     }
   },
 });
 
 // POST /api/pdf/upload — upload PDF, parse via Python service, return preview
-router.post("/upload", upload.single("file"), async (req: Request, res: Response) => {
+router.post("/upload", markReceived, upload.single("file"), async (req: Request, res: Response) => {
+  const trace = startUploadTrace(req, res);
   try {
     const userId = req.user!.userId;
     const accountId = req.body.accountId;
     const bankCode = req.body.bankCode;
+    const { dateFrom, dateTo } = req.body as { dateFrom?: string; dateTo?: string };
 
     if (!accountId || !bankCode) {
       res.status(400).json({ message: "accountId and bankCode are required" });
@@ -37,7 +76,7 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
     }
 
     if (!req.file) {
-      res.status(400).json({ message: "PDF file is required" });
+      res.status(400).json({ message: "Statement file is required" });
       return;
     }
 
@@ -64,15 +103,58 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
       if (decoded !== fileName && !decoded.includes('\ufffd')) fileName = decoded;
     } catch {}
 
+    // Shed the upload before sending it to a saturated PDF service
+    const busyRetryAfter = await timed(trace, "ready_check", pdfServiceBusy);
+    if (busyRetryAfter) {
+      res.setHeader("Retry-After", busyRetryAfter);
+      res.status(503).json({ message: BUSY_MESSAGE });
+      return;
+    }
+
     // Send to Python PDF service
     const formData = new FormData();
-    formData.append("file", new Blob([req.file.buffer], { type: "application/pdf" }), fileName);
+    formData.append("file", new Blob([req.file.buffer], { type: req.file.mimetype }), fileName);
     formData.append("bank_code", bankCode);
+    // Tenant for fair scheduling in the PDF service: the company, or the entity if it has none
+    formData.append("tenant_id", account.entity.companyId ?? account.entityId);
+    // Optional period (YYYY-MM-DD): the service skips statement pages outside it
+    if (dateFrom) formData.append("date_from", dateFrom);
+    if (dateTo) formData.append("date_to", dateTo);
+
+    // Company category rules, matched in the PDF service in one pass; the
+    // version lets the service reuse its compiled matcher across uploads
+    if (account.entity.companyId) {
+      const rules = await prisma.categoryRule.findMany({
+        where: { companyId: account.entity.companyId },
+        orderBy: { priority: "desc" },
+        select: {
+          id: true, pattern: true, matchField: true, direction: true, priority: true,
+          expenseTypeName: true, expenseArticleName: true, directionName: true,
+        },
+      });
+      if (rules.length > 0) {
+        const rulesJson = JSON.stringify(rules);
+        formData.append("rules", rulesJson);
+        formData.append("rules_version", crypto.createHash("sha256").update(rulesJson).digest("hex").slice(0, 16));
+      }
+    }
 
-    const pdfResponse = await fetch(`${config.PDF_SERVICE_URL}/parse`, {
-      method: "POST",
-      body: formData,
-    });
+    // The service continues this trace and reports its stages in Server-Timing
+    const pdfResponse = await timed(trace, "pdf_service", () =>
+      fetch(`${config.PDF_SERVICE_URL}/parse`, {
+        method: "POST",
+        body: formData,
+        headers: { traceparent: traceparentOf(trace) },
+      }),
+    );
+    addUpstreamTiming(trace, "pdf_service", pdfResponse.headers.get("server-timing"));
+
+    if (pdfResponse.status === 503) {
+      // Admission deferred the document: its lane queue is full
+      res.setHeader("Retry-After", pdfResponse.headers.get("retry-after") ?? "30");
+      res.status(503).json({ message: BUSY_MESSAGE });
+      return;
+    }
 
     if (!pdfResponse.ok) {
       const errBody = await pdfResponse.json().catch(() => ({ detail: "PDF service error" }));
@@ -83,6 +165,7 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
     const parseResult = await pdfResponse.json();
 
     const extractedId: string | null = parseResult.account_identifier ?? null;
+    const categories = (parseResult.categories ?? []) as Array<{ rule_id: string; label: string } | null>;
 
     // Create PdfUpload record
     const pdfUpload = await prisma.pdfUpload.create({
@@ -95,8 +178,7 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
       },
     });
 
-    // Check for duplicates
-    const transactions = parseResult.transactions as Array<{
+    type ParsedRow = {
       date: string;
       time: string | null;
       amount: string;
@@ -104,25 +186,69 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
       counterparty: string | null;
       purpose: string | null;
       balance: string | null;
-    }>;
+    };
+    // A statement of several accounts comes back as per-account groups;
+    // categories follow the rows of all groups in order
+    const groups = (parseResult.accounts ?? [
+      { account_identifier: extractedId, transactions: parseResult.transactions },
+    ]) as Array<{ account_identifier: string | null; transactions: ParsedRow[] }>;
+
+    // Each statement account goes to the entity's account with that number.
+    // A single-account statement falls back to the selected account; the
+    // unmatched accounts of a multi-account one stay unmapped (accountId
+    // null) until the user gives an account that number or picks one per row.
+    const identifiers = groups.map((g) => g.account_identifier).filter((id): id is string => !!id);
+    const numbered = identifiers.length > 0
+      ? await prisma.account.findMany({
+        where: { entityId: account.entityId, accountNumber: { in: identifiers } },
+        select: { id: true, accountNumber: true },
+      })
+      : [];
+    const byNumber = new Map(numbered.map((a) => [a.accountNumber, a.id]));
+    const resolveAccount = (identifier: string | null): string | null =>
+      (identifier && byNumber.get(identifier)) || (groups.length === 1 ? accountId : null);
+
+    // Check for duplicates
+    const transactions = groups.flatMap((group) => {
+      const groupAccountId = resolveAccount(group.account_identifier);
+      return group.transactions.map((tx) => ({
+        ...tx,
+        accountIdentifier: group.account_identifier,
+        accountId: groupAccountId,
+      }));
+    });
+
+    // Rows the service matched carry their category (null: no rule matched)
+    // through /confirm; without rules they leave it unset for /confirm to fill
+    const matched = parseResult.categories != null;
 
     // Build dedupeKeys with time + sequence to distinguish same-day same-amount ops
     const keyCountMap = new Map<string, number>();
-    const txsWithKeys = transactions.map((tx) => {
-      const baseKey = `${accountId}|${tx.date}|${tx.time || ""}|${tx.amount}|${tx.direction}`;
+    const txsWithKeys = transactions.map((tx, i) => {
+      // Unmapped rows get their key at /confirm, once they have an account
+      const baseKey = `${tx.accountId}|${tx.date}|${tx.time || ""}|${tx.amount}|${tx.direction}`;
       const seq = (keyCountMap.get(baseKey) || 0) + 1;
       keyCountMap.set(baseKey, seq);
-      return { ...tx, dedupeKey: `${baseKey}|${seq}` };
+      return {
+        ...tx,
+        dedupeKey: tx.accountId ? `${baseKey}|${seq}` : undefined,
+        ...(matched ? {
+          ddsArticle: categories[i]?.label ?? null,
+          categoryRuleId: categories[i]?.rule_id ?? null,
+        } : {}),
+      };
     });
 
-    const enriched = await Promise.all(
+    const enriched = await timed(trace, "dedupe", () => Promise.all(
       txsWithKeys.map(async (tx) => {
-        const existing = await prisma.bankTransaction.findFirst({
+        const existing = tx.dedupeKey && await prisma.bankTransaction.findFirst({
           where: { dedupeKey: tx.dedupeKey },
         });
         return { ...tx, isDuplicate: !!existing };
       }),
-    );
+    ));
+
+    finishUploadTrace(trace, res, { route: "pdf.upload", bankCode, transactions: enriched.length });
 
     res.json({
       pdfUploadId: pdfUpload.id,
@@ -132,6 +258,12 @@ router.post("/upload", upload.single("file"), async (req: Request, res: Response
       totalCount: enriched.length,
       duplicateCount: enriched.filter((t) => t.isDuplicate).length,
       accountIdentifier: extractedId,
+      accounts: groups.map((group) => ({
+        accountIdentifier: group.account_identifier,
+        accountId: resolveAccount(group.account_identifier),
+        count: group.transactions.length,
+      })),
+      pagesSkipped: parseResult.pages_skipped ?? 0,
     });
   } catch (error) {
     console.error("PDF upload error:", error);
@@ -154,13 +286,51 @@ router.post("/confirm", validate(confirmSchema), async (req: Request, res: Respo
       return;
     }
 
+    // Rows may name their own account (multi-account statements); it must
+    // belong to the same entity as the account the upload was made for
+    const uploadAccount = await prisma.account.findUnique({
+      where: { id: pdfUpload.accountId },
+      select: { entityId: true },
+    });
+    if (!uploadAccount) {
+      res.status(404).json({ message: "Account not found" });
+      return;
+    }
+    const rowAccountIds = [...new Set(
+      transactions.map((tx: { accountId?: string | null }) => tx.accountId).filter(Boolean),
+    )] as string[];
+    if (rowAccountIds.length > 0) {
+      const allowed = await prisma.account.count({
+        where: { id: { in: rowAccountIds }, entityId: uploadAccount.entityId },
+      });
+      if (allowed !== rowAccountIds.length) {
+        res.status(403).json({ message: "Access denied" });
+        return;
+      }
+    }
+
     let saved = 0;
     let skipped = 0;
+    let unmapped = 0;
+    let categorized = 0;
+    const keyCountMap = new Map<string, number>();
+    // Saved rows the PDF service did not run through the company rules
+    const unmatched: Array<{ id: string; direction: string; counterparty: string | null; purpose: string | null }> = [];
 
     for (const tx of transactions) {
+      // Rows of an older client have no accountId: they are the upload's.
+      // A statement account left unmapped (null) is not saved.
+      const txAccountId: string | null = tx.accountId === undefined ? pdfUpload.accountId : tx.accountId;
+      if (!txAccountId) {
+        unmapped++;
+        continue;
+      }
+
       // Use dedupeKey from frontend (computed during upload with time+seq)
-      const dedupeKey = tx.dedupeKey ||
-        `${pdfUpload.accountId}|${tx.date}|${tx.time || ""}|${tx.amount}|${tx.direction}|1`;
+      const baseKey = `${txAccountId}|${tx.date}|${tx.time || ""}|${tx.amount}|${tx.direction}`;
+      const seq = (keyCountMap.get(baseKey) || 0) + 1;
+      keyCountMap.set(baseKey, seq);
+      const dedupeKey = tx.dedupeKey || `${baseKey}|${seq}`;
 
       // Check for duplicate
       const existing = await prisma.bankTransaction.findFirst({
@@ -172,7 +342,7 @@ router.post("/confirm", validate(confirmSchema), async (req: Request, res: Respo
         continue;
       }
 
-      await prisma.bankTransaction.create({
+      const created = await prisma.bankTransaction.create({
         data: {
           date: new Date(tx.date),
           time: tx.time ?? null,
@@ -181,12 +351,16 @@ router.post("/confirm", validate(confirmSchema), async (req: Request, res: Respo
           counterparty: tx.counterparty ?? null,
           purpose: tx.purpose ?? null,
           balance: tx.balance ? new Prisma.Decimal(tx.balance) : null,
-          accountId: pdfUpload.accountId,
+          ddsArticle: tx.ddsArticle ?? null,
+          categoryRuleId: tx.categoryRuleId ?? null,
+          accountId: txAccountId,
           pdfUploadId: pdfUpload.id,
           dedupeKey,
         },
       });
       saved++;
+      if (tx.ddsArticle) categorized++;
+      else if (tx.ddsArticle === undefined) unmatched.push(created);
     }
 
     // Update upload status
@@ -196,52 +370,46 @@ router.post("/confirm", validate(confirmSchema), async (req: Request, res: Respo
     });
 
     // Auto-match: link new bank transactions to existing DDS operations
-    let categorized = 0;
     if (saved > 0) {
       try {
-        const account = await prisma.account.findUnique({ where: { id: pdfUpload.accountId }, select: { entityId: true } });
-        if (account) {
-          const newBankTxs = await prisma.bankTransaction.findMany({
-            where: { pdfUploadId: pdfUpload.id, linkedDdsOp: { is: null } },
-            select: { id: true, date: true, amount: true, direction: true },
-          });
-          const unlinkedDds = await prisma.ddsOperation.findMany({
-            where: {
-              linkedBankTxId: null,
-              entityId: account.entityId,
-              operationType: { in: ["income", "expense"] },
-            },
-            select: { id: true, operationType: true, amount: true, createdAt: true, fromAccountId: true, toAccountId: true },
-          });
+        const newBankTxs = await prisma.bankTransaction.findMany({
+          where: { pdfUploadId: pdfUpload.id, linkedDdsOp: { is: null } },
+          select: { id: true, date: true, amount: true, direction: true },
+        });
+        const unlinkedDds = await prisma.ddsOperation.findMany({
+          where: {
+            linkedBankTxId: null,
+            entityId: uploadAccount.entityId,
+            operationType: { in: ["income", "expense"] },
+          },
+          select: { id: true, operationType: true, amount: true, createdAt: true, fromAccountId: true, toAccountId: true },
+        });
 
-          for (const bt of newBankTxs) {
-            const btDate = new Date(bt.date); btDate.setHours(0, 0, 0, 0);
-            const match = unlinkedDds.find((d) => {
-              if (d.operationType !== bt.direction) return false;
-              if (Math.abs(Number(d.amount) - Number(bt.amount)) > 0.01) return false;
-              const dDate = new Date(d.createdAt); dDate.setHours(0, 0, 0, 0);
-              return Math.abs(btDate.getTime() - dDate.getTime()) <= 86400000;
-            });
-            if (match) {
-              await prisma.ddsOperation.update({ where: { id: match.id }, data: { linkedBankTxId: bt.id } });
-              unlinkedDds.splice(unlinkedDds.indexOf(match), 1);
-            }
+        for (const bt of newBankTxs) {
+          const btDate = new Date(bt.date); btDate.setHours(0, 0, 0, 0);
+          const match = unlinkedDds.find((d) => {
+            if (d.operationType !== bt.direction) return false;
+            if (Math.abs(Number(d.amount) - Number(bt.amount)) > 0.01) return false;
+            const dDate = new Date(d.createdAt); dDate.setHours(0, 0, 0, 0);
+            return Math.abs(btDate.getTime() - dDate.getTime()) <= 86400000;
+          });
+          if (match) {
+            await prisma.ddsOperation.update({ where: { id: match.id }, data: { linkedBankTxId: bt.id } });
+            unlinkedDds.splice(unlinkedDds.indexOf(match), 1);
           }
+        }
 
-          // Auto-categorize uncategorized transactions
-          const entity = await prisma.entity.findUnique({ where: { id: account.entityId }, select: { companyId: true } });
+        // Auto-categorize only the rows the PDF service did not match
+        if (unmatched.length > 0) {
+          const entity = await prisma.entity.findUnique({ where: { id: uploadAccount.entityId }, select: { companyId: true } });
           if (entity?.companyId) {
-            const uncategorized = await prisma.bankTransaction.findMany({
-              where: { pdfUploadId: pdfUpload.id, ddsArticle: null },
-              select: { id: true, direction: true, counterparty: true, purpose: true },
-            });
-            categorized = await applyCategorizationRules(entity.companyId, uncategorized);
+            categorized += await applyCategorizationRules(entity.companyId, unmatched);
           }
         }
       } catch (e) { console.error("Auto-match after confirm:", e); }
     }
 
-    res.json({ saved, skipped, categorized, total: transactions.length });
+    res.json({ saved, skipped, unmapped, categorized, total: transactions.length });
   } catch (error) {
     console.error("Confirm error:", error);
     res.status(500).json({ message: "Internal server error" });
@@ -17,6 +17,13 @@ export const confirmSchema = z.object({
       purpose: z.string().nullable().optional(),
       balance: z.string().nullable().optional(),
       dedupeKey: z.string().optional(),
+      // Account of the row's statement account; null while unmapped,
+      // absent for the account the upload was made for
+      accountId: z.string().uuid().nullable().optional(),
+      // Category suggested by the PDF service at upload; absent when the
+      // rows were not matched there (null means no rule matched)
+      ddsArticle: z.string().nullable().optional(),
+      categoryRuleId: z.string().uuid().nullable().optional(),
     }),
   ),
 });
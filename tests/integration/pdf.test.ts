@@ -152,6 +152,8 @@ describe("PDF Upload lifecycle (manual)", () => {
             direction: "income",
             counterparty: "ООО Новый",
             purpose: "Новая оплата",
+            ddsArticle: "Выручка > Услуги",
+            categoryRuleId: null,
           },
         ],
       });
@@ -159,6 +161,11 @@ describe("PDF Upload lifecycle (manual)", () => {
     expect(res.status).toBe(200);
     expect(res.body.saved).toBe(1);
     expect(res.body.skipped).toBe(1);
+    expect(res.body.categorized).toBe(1);
+
+    // The category suggested at upload is stored with the row
+    const saved = await prisma.bankTransaction.findFirst({ where: { pdfUploadId: upload2.id } });
+    expect(saved!.ddsArticle).toBe("Выручка > Услуги");
   });
 });
 
@@ -214,3 +221,35 @@ describe("GET /api/pdf/transactions", () => {
     expect(res.body.data[0].account.name).toBe("Расчётный Сбер");
   });
 });
+
+describe("POST /api/pdf/confirm with per-row accounts", () => {
+  it("should save rows to their own account and skip unmapped ones", async () => {
+    const second = await request(app)
+      .post(`/api/entities/${entityId}/accounts`)
+      .set("Authorization", `Bearer ${token}`)
+      .send({ name: "Второй счёт Сбер", type: "checking", bank: "sber", accountNumber: "40702810538000067890" });
+
+    const user = await prisma.user.findUnique({ where: { email } });
+    const upload = await prisma.pdfUpload.create({
+      data: { fileName: "multi.pdf", bankCode: "sber", accountId, status: "pending", userId: user!.id },
+    });
+
+    const res = await request(app)
+      .post("/api/pdf/confirm")
+      .set("Authorization", `Bearer ${token}`)
+      .send({
+        pdfUploadId: upload.id,
+        transactions: [
+          { date: "2025-02-01", amount: "100", direction: "income", accountId: second.body.id },
+          { date: "2025-02-02", amount: "200", direction: "expense", accountId: null },
+        ],
+      });
+
+    expect(res.status).toBe(200);
+    expect(res.body.saved).toBe(1);
+    expect(res.body.unmapped).toBe(1);
+
+    const saved = await prisma.bankTransaction.findFirst({ where: { pdfUploadId: upload.id } });
+    expect(saved!.accountId).toBe(second.body.id);
+  });
+});